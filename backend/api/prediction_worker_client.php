@@ -0,0 +1,48 @@
+<?php
+// prediction_worker_client.php
+// Sends prediction requests to the long-lived Python worker (prediction/prediction_worker.py --socket)
+// so each request does not have to start a new interpreter. Returns null when the worker is not
+// running or fails, so callers can fall back to running teacher_retention.py directly.
+
+function prediction_worker_socket_path() {
+    $path = getenv('PREDICTION_WORKER_SOCKET');
+    if ($path) {
+        return $path;
+    }
+    return rtrim(sys_get_temp_dir(), '/\\') . DIRECTORY_SEPARATOR . 'teacher_retention_worker.sock';
+}
+
+function request_prediction_worker($rows, $timeout = 300) {
+    $socketPath = prediction_worker_socket_path();
+    if (!file_exists($socketPath)) {
+        return null;
+    }
+
+    $fp = @stream_socket_client("unix://$socketPath", $errno, $errstr, 2);
+    if (!$fp) {
+        error_log("Prediction worker unavailable: $errstr ($errno)");
+        return null;
+    }
+    stream_set_timeout($fp, $timeout);
+
+    $requestId = uniqid('php', true);
+    fwrite($fp, json_encode(['id' => $requestId, 'rows' => $rows]) . "\n");
+    // Signal end of requests so the worker closes the connection after responding
+    stream_socket_shutdown($fp, STREAM_SHUT_WR);
+
+    $line = fgets($fp);
+    fclose($fp);
+
+    if ($line === false) {
+        error_log("Prediction worker returned no response");
+        return null;
+    }
+
+    $response = json_decode($line, true);
+    if (!is_array($response) || ($response['id'] ?? null) !== $requestId || isset($response['error'])) {
+        error_log("Prediction worker error: " . ($response['error'] ?? 'invalid response'));
+        return null;
+    }
+    return $response['result'];
+}
+?>
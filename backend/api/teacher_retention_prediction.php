@@ -8,6 +8,8 @@ header("Access-Control-Allow-Methods: GET, OPTIONS");
 header("Access-Control-Allow-Headers: Content-Type");
 header("Content-Type: application/json");
 
+require_once __DIR__ . '/prediction_worker_client.php';
+
 function send_response($data, $code = 200) {
     http_response_code($code);
     echo json_encode($data);
@@ -43,6 +45,12 @@ try {
         send_response(['error' => 'No data found'], 404);
     }
 
+    // Prefer the warm prediction worker; fall back to spawning the script below
+    $workerResults = request_prediction_worker($data);
+    if ($workerResults !== null) {
+        send_response($workerResults);
+    }
+
     // Prepare JSON input for Python script
     $inputJson = json_encode($data);
 
@@ -2,6 +2,8 @@
 header("Access-Control-Allow-Origin: *");
 header("Content-Type: application/json");
 
+require_once __DIR__ . '/prediction_worker_client.php';
+
 function send_response($data, $code = 200) {
     http_response_code($code);
     echo json_encode($data);
@@ -42,6 +44,12 @@ try {
         send_response(['error' => 'No data found'], 404);
     }
 
+    // Prefer the warm prediction worker; fall back to spawning the script below
+    $workerResults = request_prediction_worker($data);
+    if ($workerResults !== null) {
+        send_response(['recommendations' => $workerResults['recommendations'] ?? []]);
+    }
+
     // Prepare JSON input for Python script
     $inputJson = json_encode($data);
 
@@ -1,7 +1,8 @@
 <?php
 // workload_distribution.php
-// This script fetches teacher, class, constraints, preferences, and availability data from the database,
-// writes them to temporary JSON files, and calls the Python workload distribution script.
+// This script fetches teacher, class, constraints, preferences, and availability data from the database
+// and posts them to the Flask API, which runs the workload distribution in-process. If the API is not
+// reachable it falls back to writing temporary JSON files and running the Python script.
 // It returns the workload assignments as JSON response.
 
 header('Content-Type: application/json');
@@ -20,6 +21,36 @@ if ($resource !== 'teacher_workload') {
     exit;
 }
 
+// Run the workload distribution through the Flask API without temp files.
+// Returns the raw JSON response, or null if the API is unavailable or fails.
+function requestWorkloadDistribution($teachers, $classes, $preferences, $timeout = 60) {
+    $url = getenv('WORKLOAD_API_URL') ?: 'http://localhost:5000/api/workload_distribution';
+    $context = stream_context_create([
+        'http' => [
+            'method' => 'POST',
+            'header' => "Content-Type: application/json\r\n",
+            'content' => json_encode([
+                'teachers' => $teachers,
+                'classes' => $classes,
+                'preferences' => $preferences,
+            ]),
+            'timeout' => $timeout,
+            'ignore_errors' => true,
+        ],
+    ]);
+    $response = @file_get_contents($url, false, $context);
+    if ($response === false) {
+        error_log("Workload distribution API unavailable at $url");
+        return null;
+    }
+    $statusLine = $http_response_header[0] ?? '';
+    if (!preg_match('#^HTTP/\S+\s+200#', $statusLine)) {
+        error_log("Workload distribution API failed ($statusLine): $response");
+        return null;
+    }
+    return $response;
+}
+
 function fetchData($pdo, $query) {
     $stmt = $pdo->prepare($query);
     $stmt->execute();
@@ -43,7 +74,15 @@ try {
                COALESCE(w.teaching_hours, 0) AS teaching_hours,
                COALESCE(w.admin_hours, 0) AS admin_hours,
                COALESCE(w.extracurricular_hours, 0) AS extracurricular_hours,
-               COALESCE(w.max_allowed_hours, 40) AS max_hours_per_week
+               COALESCE(w.max_allowed_hours, 40) AS max_hours_per_week,
+               (SELECT GROUP_CONCAT(DISTINCT sa.subject)
+                FROM teacher_subject_expertise tse
+                JOIN subject_areas sa ON tse.subject_id = sa.subject_id
+                WHERE tse.teacher_id = t.teacher_id) AS subjects_expertise,
+               (SELECT GROUP_CONCAT(DISTINCT ct.certification)
+                FROM teacher_certifications tc
+                JOIN certification_types ct ON tc.cert_id = ct.cert_id
+                WHERE tc.teacher_id = t.teacher_id) AS teaching_certifications
         FROM teachers t
         LEFT JOIN teacher_workload w ON t.teacher_id = w.teacher_id
     ";
@@ -112,52 +151,56 @@ try {
     $constraints = [];
     $preferences = [];
 
-    // Prepare temp directory for input JSON files
-    $tempDir = __DIR__ . '/temp';
-    if (!is_dir($tempDir)) {
-        mkdir($tempDir, 0777, true);
-    }
+    // Run in-process through the Flask API; fall back to the temp-file pipeline if it is down
+    $output = requestWorkloadDistribution($teachers, $classes, $preferences);
+    if ($output === null) {
+        // Prepare temp directory for input JSON files
+        $tempDir = __DIR__ . '/temp';
+        if (!is_dir($tempDir)) {
+            mkdir($tempDir, 0777, true);
+        }
 
-    // Write input JSON files for Python script
-    file_put_contents($tempDir . '/teachers_input.json', json_encode($teachers));
-    file_put_contents($tempDir . '/classes_input.json', json_encode($classes));
-    file_put_contents($tempDir . '/constraints_input.json', json_encode($constraints));
-    file_put_contents($tempDir . '/preferences_input.json', json_encode($preferences));
-
-    // Call the Python script and capture only stdout, redirect stderr to a log file for debugging
-    $tempOutputFile = $tempDir . '/output.json';
-    $errorLogFile = $tempDir . '/python_error.log';
-    $command = "python ../ml_models/combined_workload_skill_matching.py > " . escapeshellarg($tempOutputFile) . " 2> " . escapeshellarg($errorLogFile);
-    $return_var = null;
-    $output_shell = [];
-    exec($command, $output_shell, $return_var);
-
-    error_log("Python script exec return code: " . $return_var);
-    error_log("Python script exec output: " . implode("\n", $output_shell));
-
-    if ($return_var !== 0) {
-        error_log("Workload distribution script failed to execute. See python_error.log for details.");
-        http_response_code(500);
-        echo json_encode(['error' => 'Failed to execute workload distribution']);
-        exit;
-    }
+        // Write input JSON files for Python script
+        file_put_contents($tempDir . '/teachers_input.json', json_encode($teachers));
+        file_put_contents($tempDir . '/classes_input.json', json_encode($classes));
+        file_put_contents($tempDir . '/constraints_input.json', json_encode($constraints));
+        file_put_contents($tempDir . '/preferences_input.json', json_encode($preferences));
+
+        // Call the Python script and capture only stdout, redirect stderr to a log file for debugging
+        $tempOutputFile = $tempDir . '/output.json';
+        $errorLogFile = $tempDir . '/python_error.log';
+        $command = "python ../ml_models/combined_workload_skill_matching.py > " . escapeshellarg($tempOutputFile) . " 2> " . escapeshellarg($errorLogFile);
+        $return_var = null;
+        $output_shell = [];
+        exec($command, $output_shell, $return_var);
+
+        error_log("Python script exec return code: " . $return_var);
+        error_log("Python script exec output: " . implode("\n", $output_shell));
+
+        if ($return_var !== 0) {
+            error_log("Workload distribution script failed to execute. See python_error.log for details.");
+            http_response_code(500);
+            echo json_encode(['error' => 'Failed to execute workload distribution']);
+            exit;
+        }
 
-    if (!file_exists($tempOutputFile)) {
-        error_log("Output file not found after Python script execution.");
-        http_response_code(500);
-        echo json_encode(['error' => 'Output file missing']);
-        exit;
-    }
+        if (!file_exists($tempOutputFile)) {
+            error_log("Output file not found after Python script execution.");
+            http_response_code(500);
+            echo json_encode(['error' => 'Output file missing']);
+            exit;
+        }
 
-    $output = file_get_contents($tempOutputFile);
-    if ($output === false) {
-        error_log("Failed to read output file from workload distribution script.");
-        http_response_code(500);
-        echo json_encode(['error' => 'Failed to read output file']);
-        exit;
-    }
+        $output = file_get_contents($tempOutputFile);
+        if ($output === false) {
+            error_log("Failed to read output file from workload distribution script.");
+            http_response_code(500);
+            echo json_encode(['error' => 'Failed to read output file']);
+            exit;
+        }
 
-    error_log("Output file content: " . $output);
+        error_log("Output file content: " . $output);
+    }
 
     // Try to decode output to check if valid JSON
     $json = json_decode($output, true);
@@ -1,19 +1,25 @@
 import sys
 import os
+import time
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
 import logging
 from flask_cors import CORS
-import mysql.connector
 from mysql.connector import Error
-from prediction.teacher_retention import predict_teacher_retention
 from recommendations import generate_enrollment_recommendations, generate_trend_recommendations
 #from recommendations_debug import generate_trend_recommendations_debug
-from combined_workload_skill_matching import combined_workload_skill_matching
+from combined_workload_skill_matching import combined_workload_skill_matching, SOLVERS, DEFAULT_SOLVER
+import db_pool
+from response_cache import ResponseCache
+from single_flight import SingleFlight, computation_key
+from jobs import JobManager
+from risk_assessment_weighted_step_by_step import risk_score_history
+from risk_assessment_predict_from_db import risk_sensitivity
+import teacher_risk_scores
 
 app = Flask(__name__)
-CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000"}})
+CORS(app, resources={r"/api/*": {"origins": "http://localhost:3000", "expose_headers": ["ETag"]}})
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -23,20 +29,28 @@ import os
 import json
 from flask import send_from_directory
 
-# Database connection function
+# Database connection function; connections come from the shared pool and close() returns them
 def get_db_connection():
     try:
-        connection = mysql.connector.connect(
-            host='localhost',
-            database='workforce',
-            user='root',
-            password='Omamam@010101'
-        )
-        return connection
+        return db_pool.get_connection()
     except Error as e:
         logger.error(f"Error connecting to MySQL: {e}")
         return None
 
+def predict_teacher_retention(rows):
+    # Imported on first use: the forecasting stack is heavy and most endpoints never need it
+    from prediction.teacher_retention import predict_teacher_retention as predict
+    return predict(rows)
+
+# Analytics responses are reused until one of their source tables changes
+response_cache = ResponseCache(get_db_connection)
+
+# Concurrent forecasts over the same rows share one in-flight computation
+forecast_flight = SingleFlight()
+# Per-teacher risk scores, rescored when risk_assessment changes
+teacher_risk_index = teacher_risk_scores.TeacherRiskIndex()
+teacher_risk_flight = SingleFlight()
+
 # New endpoint to serve workload distribution output.json
 @app.route('/api/workload_distribution', methods=['GET'])
 def get_workload_distribution():
@@ -48,6 +62,43 @@ def get_workload_distribution():
         data = json.load(f)
     return jsonify(data)
 
+def _stream_json(data, chunk_size=65536):
+    # Encode incrementally and send in chunks instead of building the whole body first
+    buffer = []
+    size = 0
+    for part in json.JSONEncoder().iterencode(data):
+        buffer.append(part)
+        size += len(part)
+        if size >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer)
+
+@app.route('/api/workload_distribution', methods=['POST'])
+def run_workload_distribution():
+    """
+    Run the combined workload and skill matching on the posted teachers and
+    classes in-process and stream the result back, without temp files.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get('teachers'), list) or not isinstance(data.get('classes'), list):
+        return jsonify({'error': 'Request body must be a JSON object with teachers and classes lists'}), 400
+    solver = data.get('solver', DEFAULT_SOLVER)
+    if solver not in SOLVERS:
+        return jsonify({'error': f"solver must be one of: {', '.join(SOLVERS)}"}), 400
+    try:
+        output = combined_workload_skill_matching(
+            data['teachers'], data['classes'], data.get('preferences', []),
+            data.get('teacher_name_col', 'name'), data.get('class_name_col', 'subject'),
+            solver=solver
+        )
+    except Exception as e:
+        logger.error(f"Error in workload distribution: {str(e)}")
+        return jsonify({'error': f"Error in workload distribution: {str(e)}"}), 500
+    return Response(_stream_json(output), mimetype='application/json')
+
 # Existing endpoints for enrollment data and forecasting
 @app.route('/api/enrollment_data', methods=['GET'])
 def get_enrollment_data():
@@ -62,59 +113,75 @@ def get_enrollment_data():
         connection.close()
         return jsonify(rows)
     except Error as e:
+        connection.close()
         logger.error(f"Error fetching enrollment data: {e}")
         return jsonify({'error': 'Failed to fetch enrollment data'}), 500
 
+def compute_forecast(progress=None):
+    """
+    Run the teacher retention forecast on the stored enrollment data.
+    Returns (body, status_code); shared by the endpoint and background jobs.
+    """
+    progress = progress or (lambda fraction, message=None: None)
+    connection = get_db_connection()
+    if connection is None:
+        logger.error("Database connection failed.")
+        return {'error': 'Database connection failed'}, 500
+    cursor = connection.cursor(dictionary=True)
+    cursor.execute("SELECT * FROM teacher_retention_data ORDER BY year ASC")
+    rows = cursor.fetchall()
+    cursor.close()
+    connection.close()
+
+    if not rows:
+        logger.info("No enrollment data found in database.")
+        return {'error': 'No enrollment data found in database.'}, 404
+    progress(0.1, 'Loaded enrollment data')
+
+    # Call updated predict_teacher_retention with multi-year forecast
+    key = computation_key('predict_teacher_retention', rows)
+    result, shared = forecast_flight.do(key, lambda: predict_teacher_retention(rows))
+    if shared:
+        logger.info("Reused an in-flight forecast for identical data.")
+    progress(0.9, 'Forecast complete')
+
+    # Multiply resignation and retention rates by current teachers to get counts
+    current_teachers = {}
+    for strand in ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']:
+        # Get last year's teacher count for each strand
+        current_teachers[strand] = rows[-1].get(f'teachers_{strand}', 0)
+
+    import numpy as np
+
+    resignations_forecast_counts = {}
+    retentions_forecast_counts = {}
+
+    for strand in result['resignations_forecast']:
+        resignations_forecast_counts[strand] = (np.array(result['resignations_forecast'][strand]) * current_teachers.get(strand, 0)).tolist()
+        retentions_forecast_counts[strand] = (np.array(result['retentions_forecast'][strand]) * current_teachers.get(strand, 0)).tolist()
+
+    hires_forecast = result.get('hires_needed', {})
+
+    # Return the detailed forecast counts per strand as expected by frontend
+    transformed_result = {
+        'resignations_count': resignations_forecast_counts,
+        'retentions_count': retentions_forecast_counts,
+        'resignations_forecast': result.get('resignations_forecast', {}),
+        'retentions_forecast': result.get('retentions_forecast', {}),
+        'hires_needed': hires_forecast,
+        'last_year': int(rows[-1]['year']) if rows else None,
+        'warnings': result.get('warnings', [])
+    }
+
+    logger.info("Predictions generated successfully for all strands.")
+    return transformed_result, 200
+
 @app.route('/api/data_forecasting', methods=['POST'])
+@response_cache.cached('teacher_retention_data')
 def forecast_enrollment():
     try:
-        connection = get_db_connection()
-        if connection is None:
-            logger.error("Database connection failed.")
-            return jsonify({'error': 'Database connection failed'}), 500
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT * FROM teacher_retention_data ORDER BY year ASC")
-        rows = cursor.fetchall()
-        cursor.close()
-        connection.close()
-
-        if not rows:
-            logger.info("No enrollment data found in database.")
-            return jsonify({'error': 'No enrollment data found in database.'}), 404
-
-        # Call updated predict_teacher_retention with multi-year forecast
-        result = predict_teacher_retention(rows)
-
-        # Multiply resignation and retention rates by current teachers to get counts
-        current_teachers = {}
-        for strand in ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']:
-            # Get last year's teacher count for each strand
-            current_teachers[strand] = rows[-1].get(f'teachers_{strand}', 0)
-
-        import numpy as np
-
-        resignations_forecast_counts = {}
-        retentions_forecast_counts = {}
-
-        for strand in result['resignations_forecast']:
-            resignations_forecast_counts[strand] = (np.array(result['resignations_forecast'][strand]) * current_teachers.get(strand, 0)).tolist()
-            retentions_forecast_counts[strand] = (np.array(result['retentions_forecast'][strand]) * current_teachers.get(strand, 0)).tolist()
-
-        hires_forecast = result.get('hires_needed', {})
-
-        # Return the detailed forecast counts per strand as expected by frontend
-        transformed_result = {
-            'resignations_count': resignations_forecast_counts,
-            'retentions_count': retentions_forecast_counts,
-            'resignations_forecast': result.get('resignations_forecast', {}),
-            'retentions_forecast': result.get('retentions_forecast', {}),
-            'hires_needed': hires_forecast,
-            'last_year': int(rows[-1]['year']) if rows else None,
-            'warnings': result.get('warnings', [])
-        }
-
-        logger.info("Predictions generated successfully for all strands.")
-        return jsonify(transformed_result)
+        body, status = compute_forecast()
+        return jsonify(body), status
 
     except Exception as e:
         logger.error(f"Error during prediction: {str(e)}")
@@ -141,135 +208,150 @@ def delete_all_enrollment_data():
         connection.commit()
         cursor.close()
         connection.close()
+        response_cache.invalidate('teacher_retention_data')
         return jsonify({'message': 'All enrollment data deleted successfully.'}), 200
     except Error as e:
+        connection.close()
         logger.error(f"Error deleting enrollment data: {e}")
         return jsonify({'error': 'Failed to delete enrollment data'}), 500
 
-# New endpoint for skill based matching
-@app.route('/api/skill_based_matching', methods=['GET'])
-def skill_based_matching_api():
-    try:
-        connection = get_db_connection()
-        if connection is None:
-            logger.error("Database connection failed.")
-            return jsonify({'error': 'Database connection failed'}), 500
-        cursor = connection.cursor(dictionary=True)
-
-        # Fetch teachers with expertise and certifications
-        cursor.execute("""
-            SELECT t.teacher_id AS id, t.name AS full_name, t.hire_date, t.employment_status, t.photo,
-                   w.teaching_hours,
-                   w.admin_hours,
-                   w.extracurricular_hours,
-                   w.max_allowed_hours AS max_hours_per_week,
-                   (SELECT GROUP_CONCAT(DISTINCT sa.subject)
-                    FROM teacher_subject_expertise tse
-                    JOIN subject_areas sa ON tse.subject_id = sa.subject_id
-                    WHERE tse.teacher_id = t.teacher_id) AS subjects_expertise,
-                   (SELECT GROUP_CONCAT(DISTINCT ct.certification)
-                    FROM teacher_certifications tc
-                    JOIN certification_types ct ON tc.cert_id = ct.cert_id
-                    WHERE tc.teacher_id = t.teacher_id) AS teaching_certifications
-            FROM teachers t
-            LEFT JOIN teacher_workload w ON t.teacher_id = w.teacher_id
-        """)
-        teachers_raw = cursor.fetchall()
-
-        # Process teachers to convert comma-separated strings to lists
-        teachers = []
-        for t in teachers_raw:
-            t['subjects_expertise'] = t['subjects_expertise'].split(',') if t['subjects_expertise'] else []
-            t['teaching_certifications'] = t['teaching_certifications'].split(',') if t['teaching_certifications'] else []
-            teachers.append(t)
-
-        # Fix teacher dict keys to match skill_based_matching expectations
-        for t in teachers:
-            if 'name' not in t and 'full_name' in t:
-                t['name'] = t['full_name']
-
-        # Fetch classes data from subject_areas joined with strands
-        cursor.execute("""
-            SELECT sa.subject_id AS id, sa.subject, sa.strand_id, s.strand_name,
-                   1 AS hours_per_week,
-                   '' AS skill_certification_requirements,
-                   '' AS class_time, '' AS class_day,
-                   '' AS shift, '' AS class_end_time, 0 AS is_critical
-            FROM subject_areas sa
-            LEFT JOIN strands s ON sa.strand_id = s.strand_id
-        """)
-        classes_raw = cursor.fetchall()
-
-        # Process classes to set skill_certification_requirements based on subject or strand
-        classes = []
-        for c in classes_raw:
+def compute_skill_matching(progress=None):
+    """
+    Match teachers to classes from the database.
+    Returns (body, status_code); shared by the endpoint and background jobs.
+    """
+    progress = progress or (lambda fraction, message=None: None)
+    connection = get_db_connection()
+    if connection is None:
+        logger.error("Database connection failed.")
+        return {'error': 'Database connection failed'}, 500
+    cursor = connection.cursor(dictionary=True)
+
+    # Fetch teachers with expertise and certifications
+    cursor.execute("""
+        SELECT t.teacher_id AS id, t.name AS full_name, t.hire_date, t.employment_status, t.photo,
+               w.teaching_hours,
+               w.admin_hours,
+               w.extracurricular_hours,
+               w.max_allowed_hours AS max_hours_per_week,
+               (SELECT GROUP_CONCAT(DISTINCT sa.subject)
+                FROM teacher_subject_expertise tse
+                JOIN subject_areas sa ON tse.subject_id = sa.subject_id
+                WHERE tse.teacher_id = t.teacher_id) AS subjects_expertise,
+               (SELECT GROUP_CONCAT(DISTINCT ct.certification)
+                FROM teacher_certifications tc
+                JOIN certification_types ct ON tc.cert_id = ct.cert_id
+                WHERE tc.teacher_id = t.teacher_id) AS teaching_certifications
+        FROM teachers t
+        LEFT JOIN teacher_workload w ON t.teacher_id = w.teacher_id
+    """)
+    teachers_raw = cursor.fetchall()
+
+    # Process teachers to convert comma-separated strings to lists
+    teachers = []
+    for t in teachers_raw:
+        t['subjects_expertise'] = t['subjects_expertise'].split(',') if t['subjects_expertise'] else []
+        t['teaching_certifications'] = t['teaching_certifications'].split(',') if t['teaching_certifications'] else []
+        teachers.append(t)
+
+    # Fix teacher dict keys to match skill_based_matching expectations
+    for t in teachers:
+        if 'name' not in t and 'full_name' in t:
+            t['name'] = t['full_name']
+
+    # Fetch classes data from subject_areas joined with strands
+    cursor.execute("""
+        SELECT sa.subject_id AS id, sa.subject, sa.strand_id, s.strand_name,
+               1 AS hours_per_week,
+               '' AS skill_certification_requirements,
+               '' AS class_time, '' AS class_day,
+               '' AS shift, '' AS class_end_time, 0 AS is_critical
+        FROM subject_areas sa
+        LEFT JOIN strands s ON sa.strand_id = s.strand_id
+    """)
+    classes_raw = cursor.fetchall()
+
+    # Process classes to set skill_certification_requirements based on subject or strand
+    classes = []
+    for c in classes_raw:
+        required_skills = []
+        subject = c.get('subject', '').lower()
+        strand_raw = c.get('strand_name', '')
+        strand = strand_raw.strip().upper() if strand_raw else ''
+
+        # Normalize strand and assign required skills
+        if strand == 'STEM':
+            required_skills = ['Mathematics', 'Science']
+        elif strand == 'ABM':
+            required_skills = ['Accounting', 'Business']
+        elif strand == 'GAS':
+            # More specific skills for GAS strand
+            required_skills = ['General Studies', 'Social Science']
+        elif strand == 'HUMMS':
+            required_skills = ['Humanities', 'Social Studies']
+        elif strand == 'ICT':
+            required_skills = ['Information Technology', 'Computer Science']
+        else:
+            # Handle unknown strands gracefully
             required_skills = []
-            subject = c.get('subject', '').lower()
-            strand_raw = c.get('strand_name', '')
-            strand = strand_raw.strip().upper() if strand_raw else ''
-
-            # Normalize strand and assign required skills
-            if strand == 'STEM':
-                required_skills = ['Mathematics', 'Science']
-            elif strand == 'ABM':
-                required_skills = ['Accounting', 'Business']
-            elif strand == 'GAS':
-                # More specific skills for GAS strand
-                required_skills = ['General Studies', 'Social Science']
-            elif strand == 'HUMMS':
-                required_skills = ['Humanities', 'Social Studies']
-            elif strand == 'ICT':
-                required_skills = ['Information Technology', 'Computer Science']
-            else:
-                # Handle unknown strands gracefully
-                required_skills = []
-                # Assign empty string instead of 'UNKNOWN' for unknown strands
-                strand = strand_raw.strip() if strand_raw else ''
-
-            # Add additional skills based on subject keywords
-            if 'math' in subject:
-                required_skills.append('Mathematics')
-            if 'science' in subject:
-                required_skills.append('Science')
-            if 'accounting' in subject:
-                required_skills.append('Accounting')
-            if 'business' in subject:
-                required_skills.append('Business')
-            if 'it' in subject or 'computer' in subject:
-                required_skills.append('Information Technology')
-
-            required_skills = list(set(required_skills))
-            c['skill_certification_requirements'] = required_skills
-            # Keep original subject name separate, assign strand to a new key
-            c['strand'] = strand
-            classes.append(c)
-
-        preferences = []
-
-        cursor.close()
-        connection.close()
-
-        teacher_name_col = 'name'
-        class_name_col = 'subject'
-
-        output = combined_workload_skill_matching(teachers, classes, preferences, teacher_name_col, class_name_col)
+            # Assign empty string instead of 'UNKNOWN' for unknown strands
+            strand = strand_raw.strip() if strand_raw else ''
+
+        # Add additional skills based on subject keywords
+        if 'math' in subject:
+            required_skills.append('Mathematics')
+        if 'science' in subject:
+            required_skills.append('Science')
+        if 'accounting' in subject:
+            required_skills.append('Accounting')
+        if 'business' in subject:
+            required_skills.append('Business')
+        if 'it' in subject or 'computer' in subject:
+            required_skills.append('Information Technology')
+
+        required_skills = list(set(required_skills))
+        c['skill_certification_requirements'] = required_skills
+        # Keep original subject name separate, assign strand to a new key
+        c['strand'] = strand
+        classes.append(c)
+
+    preferences = []
+
+    cursor.close()
+    connection.close()
+    progress(0.2, 'Loaded teachers and classes')
+
+    teacher_name_col = 'name'
+    class_name_col = 'subject'
+
+    output = combined_workload_skill_matching(teachers, classes, preferences, teacher_name_col, class_name_col)
+    progress(0.9, 'Matching complete')
+
+    # Filter out teachers with no assigned strands
+    filtered_teacher_workload = [
+        teacher for teacher in output.get('teacher_workload_summary', [])
+        if teacher.get('assigned_strands') and len(teacher.get('assigned_strands')) > 0
+    ]
 
-        # Filter out teachers with no assigned strands
-        filtered_teacher_workload = [
-            teacher for teacher in output.get('teacher_workload_summary', [])
-            if teacher.get('assigned_strands') and len(teacher.get('assigned_strands')) > 0
-        ]
+    # Deduplicate teachers by name
+    unique_teachers = {}
+    for teacher in filtered_teacher_workload:
+        name = teacher.get('teacher')
+        if name not in unique_teachers:
+            unique_teachers[name] = teacher
 
-        # Deduplicate teachers by name
-        unique_teachers = {}
-        for teacher in filtered_teacher_workload:
-            name = teacher.get('teacher')
-            if name not in unique_teachers:
-                unique_teachers[name] = teacher
+    output['teacher_workload_summary'] = list(unique_teachers.values())
 
-        output['teacher_workload_summary'] = list(unique_teachers.values())
+    return output, 200
 
-        return jsonify(output)
+# New endpoint for skill based matching
+@app.route('/api/skill_based_matching', methods=['GET'])
+@response_cache.cached('teachers', 'teacher_workload', 'teacher_subject_expertise', 'subject_areas',
+                       'teacher_certifications', 'certification_types', 'strands')
+def skill_based_matching_api():
+    try:
+        body, status = compute_skill_matching()
+        return jsonify(body), status
 
     except Exception as e:
         logger.error(f"Error in skill_based_matching_api: {str(e)}")
@@ -280,6 +362,7 @@ import subprocess
 import json
 
 @app.route('/api/trend_identification', methods=['GET'])
+@response_cache.cached('trend_identification')
 def trend_identification():
     try:
         connection = get_db_connection()
@@ -373,6 +456,141 @@ def trend_identification():
         logger.error(f"Error in trend_identification endpoint: {str(e)}")
         return jsonify({'error': f"Error in trend_identification endpoint: {str(e)}"}), 500
 
+@app.route('/api/risk_scores', methods=['GET'])
+@response_cache.cached('risk_assessment')
+def risk_scores():
+    """
+    Weighted risk scores and levels for every year x strand in an optional
+    start_year/end_year range, computed in one batch.
+    """
+    start_year = request.args.get('start_year', type=int)
+    end_year = request.args.get('end_year', type=int)
+    if start_year is not None and end_year is not None and start_year > end_year:
+        return jsonify({'error': 'start_year must not be after end_year'}), 400
+    try:
+        return jsonify(risk_score_history(start_year, end_year))
+    except Error as e:
+        logger.error(f"Error computing risk scores: {e}")
+        return jsonify({'error': 'Failed to compute risk scores'}), 500
+
+@app.route('/api/risk_sensitivity', methods=['GET'])
+@response_cache.cached('risk_assessment')
+def risk_sensitivity_analysis():
+    """
+    What-if analysis: for every strand, how each single change of a risk
+    factor would shift the Risk Level distribution, largest shift first
+    (?top= limits the changes listed per strand).
+    """
+    top = request.args.get('top', type=int)
+    if top is not None and top < 1:
+        return jsonify({'error': 'top must be a positive integer'}), 400
+    try:
+        return jsonify(risk_sensitivity(top))
+    except Error as e:
+        logger.error(f"Error computing risk sensitivity: {e}")
+        return jsonify({'error': 'Failed to compute risk sensitivity'}), 500
+
+@app.route('/api/teacher_risk/top', methods=['GET'])
+@response_cache.cached('risk_assessment')
+def top_teacher_risk():
+    """
+    Highest-risk teachers from the per-teacher index (?k=50&strand=).
+    The index is rescored first if risk_assessment changed since.
+    """
+    k = request.args.get('k', 50, type=int)
+    strand = request.args.get('strand')
+    if k < 1:
+        return jsonify({'error': 'k must be a positive integer'}), 400
+    try:
+        version = response_cache.data_version(['risk_assessment'])
+        # Concurrent requests after a change share one rescoring pass
+        teacher_risk_flight.do(computation_key('teacher_risk_refresh', version),
+                               lambda: teacher_risk_scores.refresh_if_stale(teacher_risk_index, version))
+    except Error as e:
+        logger.error(f"Error scoring teacher risk: {e}")
+        return jsonify({'error': 'Failed to score teacher risk'}), 500
+    return jsonify({'teachers': teacher_risk_index.top(k, strand), 'total': len(teacher_risk_index)})
+
+@app.route('/api/teacher_risk/refresh', methods=['POST'])
+def refresh_teacher_risk():
+    """
+    Rescore after risk_assessment changes. With {"teacher_id": ...} only that
+    teacher is rescored; otherwise everyone is.
+    """
+    data = request.get_json(silent=True) or {}
+    teacher = data.get('teacher_id')
+    try:
+        if teacher is None:
+            version = response_cache.data_version(['risk_assessment'])
+            count = teacher_risk_scores.refresh_all(teacher_risk_index)
+            teacher_risk_index.version = version
+            return jsonify({'scored': count})
+        # The index keeps its version: other rows may have changed too. The next
+        # stale check compares row checksums, so it rescores only those teachers
+        entry = teacher_risk_scores.refresh_teacher(teacher_risk_index, teacher)
+    except Error as e:
+        logger.error(f"Error scoring teacher risk: {e}")
+        return jsonify({'error': 'Failed to score teacher risk'}), 500
+    return jsonify({'teacher': teacher_risk_scores.teacher_key(teacher), 'score': entry})
+
+def _job_handler(compute):
+    # Background jobs fail with the same error message the synchronous endpoint would return
+    def handler(params, progress):
+        body, status = compute(progress)
+        if status != 200:
+            raise RuntimeError(body.get('error', f"Request failed with status {status}"))
+        return body
+    return handler
+
+# Long-running computations can be queued instead of holding the request open
+job_manager = JobManager()
+job_manager.register('data_forecasting', _job_handler(compute_forecast))
+job_manager.register('skill_based_matching', _job_handler(compute_skill_matching))
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    data = request.get_json(silent=True) or {}
+    try:
+        job_id = job_manager.submit(data.get('type'), data.get('params'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify({'job_id': job_id, 'status': 'queued', 'status_url': f"/api/jobs/{job_id}"}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    job = job_manager.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found or expired'}), 404
+    return jsonify(job)
+
+@app.route('/api/ready', methods=['GET'])
+def ready():
+    """
+    Readiness probe. With ?prewarm=1 the forecasting libraries and models
+    code are imported before answering, so the first real request is not slow.
+    """
+    prewarmed = False
+    if request.args.get('prewarm') == '1':
+        start = time.perf_counter()
+        from prediction.teacher_retention import warm_up
+        warm_up()
+        prewarmed = True
+        logger.info(f"Prewarmed forecasting libraries in {time.perf_counter() - start:.2f}s")
+    return jsonify({'ready': True, 'prewarmed': prewarmed,
+                    'forecasting_loaded': 'prediction.teacher_retention' in sys.modules})
+
+@app.route('/api/db_pool_stats', methods=['GET'])
+def db_pool_stats():
+    stats = db_pool.pool_metrics()
+    if request.args.get('check') == '1':
+        stats['healthy'] = db_pool.default_pool.health_check()
+    return jsonify(stats)
+
+@app.route('/api/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({'response_cache': response_cache.stats(), 'forecast_coalescing': forecast_flight.stats(),
+                    'jobs': job_manager.stats()})
+
 @app.route('/api/features', methods=['GET'])
 def list_features():
     features = [
@@ -384,6 +602,16 @@ def list_features():
         {"route": "/api/get_prediction_data", "method": "GET", "description": "Get prediction data (proxied to PHP)"},
         {"route": "/api/trend_identification", "method": "GET", "description": "Get trend identification data"},
         {"route": "/api/workload_distribution", "method": "GET", "description": "Get workload distribution data"},
+        {"route": "/api/workload_distribution", "method": "POST", "description": "Run workload distribution on posted teachers and classes (solver: greedy, strand_optimal or optimal)"},
+        {"route": "/api/risk_scores", "method": "GET", "description": "Year x strand weighted risk scores (?start_year=&end_year=)"},
+        {"route": "/api/risk_sensitivity", "method": "GET", "description": "Ranked what-if risk shifts per strand (?top=)"},
+        {"route": "/api/teacher_risk/top", "method": "GET", "description": "Highest-risk teachers (?k=50&strand=)"},
+        {"route": "/api/teacher_risk/refresh", "method": "POST", "description": "Rescore all teachers or one (teacher_id)"},
+        {"route": "/api/jobs", "method": "POST", "description": "Queue a data_forecasting or skill_based_matching job"},
+        {"route": "/api/jobs/<job_id>", "method": "GET", "description": "Job status, progress and result"},
+        {"route": "/api/ready", "method": "GET", "description": "Readiness probe (?prewarm=1 loads the forecasting libraries)"},
+        {"route": "/api/cache_stats", "method": "GET", "description": "Response cache and request coalescing statistics"},
+        {"route": "/api/db_pool_stats", "method": "GET", "description": "Database connection pool metrics (?check=1 runs a health check)"},
         # Add more routes here if needed
     ]
     return jsonify(features)
@@ -0,0 +1,99 @@
+"""
+Benchmark the Risk Level CPD backends of ImprovedRiskAssessmentBayesianNetwork.
+
+Each backend is measured in a fresh interpreter so construction time and RSS
+are not skewed by the other backend's imports and allocations. Reports
+construction time, resident memory growth, per-query latency, and the
+largest absolute difference between the backends' posteriors.
+
+Usage: python benchmark_risk_cpd.py [--queries 200]
+"""
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+def rss_mb():
+    # Current resident set size from /proc (Linux); falls back to peak RSS elsewhere
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+def sample_evidence(n, seed=0):
+    from risk_assessment_improved import PARENT_PRIORS
+    rng = random.Random(seed)
+    samples = []
+    for _ in range(n):
+        # Observe a random subset of the parents so marginalization is exercised too
+        observed = rng.sample(list(PARENT_PRIORS), rng.randint(1, len(PARENT_PRIORS)))
+        samples.append({var: rng.choice(PARENT_PRIORS[var][0]) for var in observed})
+    return samples
+
+def run_backend(backend, n_queries):
+    # Import the libraries the backend needs before measuring, so only construction is timed
+    from risk_assessment_improved import ImprovedRiskAssessmentBayesianNetwork
+    if backend == 'dense':
+        import pgmpy.models, pgmpy.inference  # noqa: F401
+    evidence = sample_evidence(n_queries)
+
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    network = ImprovedRiskAssessmentBayesianNetwork(cpd_backend=backend)
+    construction = time.perf_counter() - start
+    rss_after = rss_mb()
+
+    latencies = []
+    posteriors = []
+    for ev in evidence:
+        start = time.perf_counter()
+        posteriors.append(np.asarray(network.predict_risk(ev)).tolist())
+        latencies.append(time.perf_counter() - start)
+
+    return {
+        'backend': backend,
+        'construction_s': construction,
+        'rss_growth_mb': rss_after - rss_before,
+        'query_mean_ms': 1000 * float(np.mean(latencies)),
+        'query_p95_ms': 1000 * float(np.percentile(latencies, 95)),
+        'posteriors': posteriors
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--queries', type=int, default=200)
+    parser.add_argument('--backend', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(run_backend(args.backend, args.queries)))
+        return
+
+    results = {}
+    for backend in ('dense', 'noisy_max'):
+        proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--backend', backend,
+                               '--queries', str(args.queries)],
+                              cwd=os.path.dirname(os.path.abspath(__file__)),
+                              capture_output=True, text=True, check=True)
+        results[backend] = json.loads(proc.stdout.strip().splitlines()[-1])
+
+    print(f"{'backend':<10} {'construct (s)':>14} {'RSS growth (MB)':>16} {'query mean (ms)':>16} {'query p95 (ms)':>15}")
+    for backend, r in results.items():
+        print(f"{backend:<10} {r['construction_s']:>14.3f} {r['rss_growth_mb']:>16.1f} "
+              f"{r['query_mean_ms']:>16.3f} {r['query_p95_ms']:>15.3f}")
+
+    diff = np.abs(np.array(results['dense']['posteriors']) - np.array(results['noisy_max']['posteriors'])).max()
+    print(f"Max absolute posterior difference over {args.queries} queries: {diff:.2e}")
+
+if __name__ == "__main__":
+    main()
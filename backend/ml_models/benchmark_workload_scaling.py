@@ -0,0 +1,65 @@
+"""
+Benchmark how combined_workload_skill_matching scales with roster size.
+
+Synthetic rosters of increasing size get random subjects of expertise,
+certifications and weekly hour caps; each size is timed over a few repeats
+(best run reported, starting from an empty strand score matrix). Time per
+teacher should stay roughly flat and the fitted exponent close to 1 for
+linear scaling.
+
+Usage: python benchmark_workload_scaling.py [--sizes 100 1000 10000] [--solver greedy]
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+
+import combined_workload_skill_matching as workload
+from teacher_strand_scores import StrandScoreMatrix
+
+def synthetic_roster(n, seed=0):
+    rng = random.Random(seed)
+    subjects = sorted({subject for params in workload.STRAND_PARAMETERS.values()
+                       for subject in params['core_subjects'] + params['specialized_subjects']})
+    certifications = ['', 'STEM Teaching Certificate', 'ICT NC II', 'HUMSS Specialist', 'Business Mathematics']
+    return [{
+        'full_name': f"Teacher {i}",
+        'max_hours_per_week': rng.choice([20, 30, 40, 48]),
+        'subjects_expertise': ','.join(rng.sample(subjects, rng.randint(1, 6))),
+        'teaching_certifications': rng.choice(certifications)
+    } for i in range(n)]
+
+def run(n, solver, repeats):
+    teachers = synthetic_roster(n)
+    best = None
+    for _ in range(repeats):
+        workload.strand_score_matrix = StrandScoreMatrix(workload.STRAND_PARAMETERS)
+        start = time.perf_counter()
+        workload.combined_workload_skill_matching(teachers, [], [], 'name', 'subject', solver=solver)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 300, 1000, 3000, 10000])
+    parser.add_argument('--solver', choices=workload.SOLVERS, default='greedy')
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    # Warm up imports (scipy for the optimal solvers) outside the timings
+    run(10, args.solver, 1)
+    timings = []
+    print(f"{'teachers':>9} {'total (s)':>10} {'per teacher (us)':>17}")
+    for n in args.sizes:
+        elapsed = run(n, args.solver, args.repeats)
+        timings.append(elapsed)
+        print(f"{n:>9} {elapsed:>10.3f} {1e6 * elapsed / n:>17.1f}")
+
+    if len(args.sizes) > 1:
+        exponent = np.polyfit(np.log(args.sizes), np.log(timings), 1)[0]
+        print(f"Fitted scaling exponent ({args.solver}): {exponent:.2f} (1.0 = linear)")
+
+if __name__ == "__main__":
+    main()
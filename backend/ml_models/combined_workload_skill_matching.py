@@ -1,7 +1,12 @@
+import argparse
 import json
 import os
 from collections import defaultdict
 
+import numpy as np
+
+from teacher_strand_scores import StrandScoreMatrix, has_skill_data, skill_profile
+
 STRAND_PARAMETERS = {
     "STEM": {
         "core_subjects": [
@@ -99,7 +104,7 @@ STRAND_PARAMETERS = {
     }
 }
 
-# Provided skill-based matching scores per strand
+# Provided skill-based matching scores per strand, used when the roster carries no skill data
 SKILL_BASED_MATCHING_SCORES = {
     "STEM": {
         "Alice Johnson": 3.00,
@@ -151,23 +156,177 @@ SKILL_BASED_MATCHING_SCORES = {
     }
 }
 
-def combined_workload_skill_matching(teachers, classes, preferences, teacher_name_col, class_name_col, prediction_data=None):
+# Scores computed from the teachers' expertise; kept across calls so only changed teachers are rescored
+strand_score_matrix = StrandScoreMatrix(STRAND_PARAMETERS)
+
+def strand_matching_scores(teachers):
+    """
+    {strand: {teacher name: score}} for the roster: computed from the
+    teachers' subjects_expertise, proficiency and certifications when any
+    are given, otherwise the provided SKILL_BASED_MATCHING_SCORES.
+    """
+    if not has_skill_data(teachers):
+        return SKILL_BASED_MATCHING_SCORES
+    return strand_score_matrix.update(teachers)
+
+# 'greedy' hands out specialized subjects first-come in score order; 'strand_optimal' solves each
+# strand as its own assignment problem, in strand order, so it is optimal per strand but not across
+# strands; 'optimal' solves all strands at once within every teacher's hours
+SOLVERS = ('greedy', 'strand_optimal', 'optimal')
+DEFAULT_SOLVER = os.environ.get('WORKLOAD_SOLVER', 'greedy')
+
+def strand_optimal_specialized_subjects(teacher_scores, specialized_subjects, teacher_skills_map):
+    """
+    Within one strand, give each teacher at most one specialized subject they
+    are skilled in and each subject at most one teacher, covering as many
+    subjects as possible and preferring higher-scored teachers among equally
+    large assignments.
+    teacher_scores lists (teacher name, score). Returns {teacher name: subject}.
+    """
+    skilled = np.array([[subject.lower() in teacher_skills_map.get(name, set()) for subject in specialized_subjects]
+                        for name, _ in teacher_scores], dtype=bool).reshape(len(teacher_scores), len(specialized_subjects))
+    # Only teachers who can take some subject take part
+    rows = np.flatnonzero(skilled.any(axis=1))
+    if not len(rows):
+        return {}
+    from scipy.optimize import linear_sum_assignment
+
+    scores = np.array([teacher_scores[i][1] for i in rows], dtype=float)
+    # Each covered subject outweighs any difference in scores
+    coverage_weight = np.abs(scores).sum() + 1
+    weights = np.where(skilled[rows], coverage_weight + scores[:, None], 0.0)
+    assigned_rows, assigned_cols = linear_sum_assignment(weights, maximize=True)
+    return {teacher_scores[rows[r]][0]: specialized_subjects[c]
+            for r, c in zip(assigned_rows, assigned_cols) if skilled[rows[r], c]}
+
+def optimal_specialized_subjects(candidates, max_hours):
+    """
+    Across all strands, give each teacher at most one specialized subject per
+    strand and each subject of a strand at most one teacher, keeping every
+    teacher's blocks within their max hours, covering as many subjects as
+    possible and preferring higher-scored teachers among equally large
+    assignments.
+    candidates lists (strand, teacher name, score, block hours, specialized
+    subjects the teacher can take); max_hours maps teacher names to the hours
+    their blocks may use. Returns {(strand, teacher name): subject}.
+    """
+    # One 0/1 variable per (candidate, subject)
+    variables = [(i, subject) for i, candidate in enumerate(candidates) for subject in candidate[4]]
+    if not variables:
+        return {}
+    from scipy.optimize import Bounds, LinearConstraint, milp
+    from scipy.sparse import coo_matrix
+
+    scores = np.array([candidates[i][2] for i, _ in variables], dtype=float)
+    # Each covered subject outweighs any difference in scores
+    weights = np.abs(scores).sum() + 1 + scores
+    # One row per (teacher, strand) block and per strand subject, both at most 1, and per teacher's hours
+    row_limits = {}
+    rows, cols, coefficients = [], [], []
+    for v, (i, subject) in enumerate(variables):
+        strand, teacher_name, _, hours, _ = candidates[i]
+        for key, coefficient, limit in ((('block', i), 1.0, 1.0),
+                                        (('subject', strand, subject), 1.0, 1.0),
+                                        (('hours', teacher_name), hours, max_hours[teacher_name])):
+            rows.append(row_limits.setdefault(key, (len(row_limits), limit))[0])
+            cols.append(v)
+            coefficients.append(coefficient)
+    upper = [limit for _, limit in sorted(row_limits.values())]
+    constraint = LinearConstraint(coo_matrix((coefficients, (rows, cols)), shape=(len(upper), len(variables))), -np.inf, upper)
+    result = milp(-weights, constraints=constraint, integrality=np.ones(len(variables)), bounds=Bounds(0, 1))
+    if result.x is None:
+        raise RuntimeError(f"Workload assignment could not be solved: {result.message}")
+    return {candidates[variables[v][0]][:2]: variables[v][1] for v in np.flatnonzero(result.x > 0.5)}
+
+class AssignmentState:
+    """
+    Indexes for the assignment loops: the first teacher and the first output
+    entries of each name, and the subjects taken per strand across the
+    teacher_workload_summary entries, kept up to date as entries change so
+    nothing is rescanned per teacher.
+    """
+
+    def __init__(self, teachers):
+        self.teacher_by_name = {}
+        for teacher in teachers:
+            self.teacher_by_name.setdefault(teacher.get('name') or teacher.get('full_name'), teacher)
+        self.frontend_output = []
+        self.all_teachers_output = []
+        self._frontend_by_name = {}
+        self._all_teachers_by_name = {}
+        # Entries of a teacher share one assigned_strands list; their subjects follow its strands
+        self._subject_lists = defaultdict(list)
+        self.strand_subjects = defaultdict(set)
+
+    def teacher(self, name):
+        return self.teacher_by_name.get(name)
+
+    def frontend_entry(self, name):
+        return self._frontend_by_name.get(name)
+
+    def all_teachers_entry(self, name):
+        return self._all_teachers_by_name.get(name)
+
+    def add_frontend_entry(self, entry):
+        self.frontend_output.append(entry)
+        self._frontend_by_name.setdefault(entry['teacher'], entry)
+        self._subject_lists[id(entry['assigned_strands'])].append(entry['subjects'])
+        for strand in entry['assigned_strands']:
+            self.strand_subjects[strand].update(sub['subject'] for sub in entry['subjects'])
+
+    def add_all_teachers_entry(self, entry):
+        self.all_teachers_output.append(entry)
+        self._all_teachers_by_name.setdefault(entry['teacher'], entry)
+
+    def add_strand(self, entry, strand):
+        """
+        Add strand to a teacher_workload_summary entry's assigned_strands.
+        """
+        if strand in entry['assigned_strands']:
+            return
+        entry['assigned_strands'].append(strand)
+        for subjects in self._subject_lists[id(entry['assigned_strands'])]:
+            self.strand_subjects[strand].update(sub['subject'] for sub in subjects)
+
+    def add_subject(self, entry, subject):
+        """
+        Append a subject ({'subject', 'hours_per_week'}) to a teacher_workload_summary entry.
+        """
+        entry['subjects'].append(subject)
+        for strand in entry['assigned_strands']:
+            self.strand_subjects[strand].add(subject['subject'])
+
+def combined_workload_skill_matching(teachers, classes, preferences, teacher_name_col, class_name_col, prediction_data=None,
+                                     output_file=None, solver=DEFAULT_SOLVER):
     """
     Assign teachers to strands based on provided skill-based matching scores,
     assign at least one specialized subject per teacher per strand,
     ensuring no subject is assigned to multiple teachers in the same strand.
+    With solver='strand_optimal' the specialized subjects of each strand are
+    matched to its teachers (those within their max hours) as an assignment
+    problem, so no subject is left uncovered that some teacher could take
+    with the hours left after the earlier strands. Strands are still solved
+    one after another, so hours spent in an earlier strand are not traded
+    off against a later one. solver='optimal' matches the subjects of all
+    strands at once within every teacher's max hours; teachers get blocks
+    without a specialized subject only from the hours the matching leaves.
+    Returns the output data; it is also written to output_file when one is given.
     """
+    if solver not in SOLVERS:
+        raise ValueError(f"Unknown solver '{solver}'. Expected one of: {', '.join(SOLVERS)}")
     hours_per_subject = 4
 
-    frontend_output = []
-    all_teachers_output = []
+    state = AssignmentState(teachers)
+    frontend_output = state.frontend_output
+    all_teachers_output = state.all_teachers_output
 
     teacher_assigned_hours = defaultdict(float)
-    strand_assigned_subjects = defaultdict(set)
 
-    # Build teacher to strands mapping from SKILL_BASED_MATCHING_SCORES
+    # Build teacher to strands mapping from the skill-based matching scores
+    matching_scores = strand_matching_scores(teachers)
+    data_driven = matching_scores is not SKILL_BASED_MATCHING_SCORES
     teacher_to_strands = defaultdict(list)
-    for strand, teacher_scores in SKILL_BASED_MATCHING_SCORES.items():
+    for strand, teacher_scores in matching_scores.items():
         for teacher_name in teacher_scores.keys():
             teacher_to_strands[teacher_name].append(strand)
 
@@ -177,18 +336,45 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
         subjects = set(params.get('core_subjects', []) + params.get('specialized_subjects', []))
         strand_to_subjects[strand] = subjects
 
-    # Infer teacher skills from assigned strands
+    # Teacher skills are their subjects of expertise, or inferred from assigned strands without skill data
     teacher_skills_map = {}
     for teacher in teachers:
         teacher_name = teacher.get('name') or teacher.get('full_name')
+        if data_driven:
+            teacher_skills_map[teacher_name] = set(skill_profile(teacher)['subjects'])
+            continue
         assigned_strands = teacher_to_strands.get(teacher_name, [])
         skills = set()
         for strand in assigned_strands:
             skills.update(sub.lower() for sub in strand_to_subjects.get(strand, []))
         teacher_skills_map[teacher_name] = skills
 
+    def block_hours(teacher_name, strand_params):
+        # One specialized subject plus the teacher's core subjects of the strand
+        teacher_skills = teacher_skills_map.get(teacher_name, set())
+        return hours_per_subject * (1 + sum(1 for core_subj in strand_params['core_subjects']
+                                            if core_subj.lower() in teacher_skills))
+
+    if solver == 'optimal':
+        candidates = []
+        for strand, teacher_scores in matching_scores.items():
+            strand_params = STRAND_PARAMETERS.get(strand)
+            if strand_params is None:
+                continue
+            for teacher_name, score in teacher_scores.items():
+                teacher_skills = teacher_skills_map.get(teacher_name, set())
+                skilled = [subject for subject in strand_params['specialized_subjects'] if subject.lower() in teacher_skills]
+                if state.teacher(teacher_name) and skilled:
+                    candidates.append((strand, teacher_name, score, block_hours(teacher_name, strand_params), skilled))
+        global_choice = optimal_specialized_subjects(
+            candidates, {name: teacher.get('max_hours_per_week', 40) for name, teacher in state.teacher_by_name.items()})
+        # Hours of the chosen blocks not yet handed out, kept free for them
+        planned_hours = defaultdict(float)
+        for strand, teacher_name in global_choice:
+            planned_hours[teacher_name] += block_hours(teacher_name, STRAND_PARAMETERS[strand])
+
     # Assign specialized subjects uniquely per strand
-    for strand, teacher_scores in SKILL_BASED_MATCHING_SCORES.items():
+    for strand, teacher_scores in matching_scores.items():
         strand_params = STRAND_PARAMETERS.get(strand, None)
         if strand_params is None:
             continue
@@ -196,20 +382,37 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
         assigned_subjects = set()
         # Sort teachers by score descending
         sorted_teachers = sorted(teacher_scores.items(), key=lambda x: x[1], reverse=True)
+        if solver == 'strand_optimal':
+            # Teachers whose hours allow this strand's block (one specialized plus their core subjects)
+            eligible = []
+            for teacher_name, score in sorted_teachers:
+                teacher = state.teacher(teacher_name)
+                if not teacher:
+                    continue
+                if teacher_assigned_hours[teacher_name] + block_hours(teacher_name, strand_params) <= teacher.get('max_hours_per_week', 40):
+                    eligible.append((teacher_name, score))
+            specialized_choice = strand_optimal_specialized_subjects(eligible, specialized_subjects, teacher_skills_map)
         for teacher_name, score in sorted_teachers:
-            teacher = next((t for t in teachers if (t.get('name') or t.get('full_name')) == teacher_name), None)
+            teacher = state.teacher(teacher_name)
             if not teacher:
                 continue
             teacher_skills = teacher_skills_map.get(teacher_name, set())
             subjects_hours = {}
-            # Assign one specialized subject not yet assigned
-            for subject in specialized_subjects:
-                if subject in assigned_subjects:
-                    continue
-                if subject.lower() in teacher_skills:
-                    subjects_hours[subject] = hours_per_subject
-                    assigned_subjects.add(subject)
-                    break
+            if solver == 'strand_optimal':
+                if teacher_name in specialized_choice:
+                    subjects_hours[specialized_choice[teacher_name]] = hours_per_subject
+            elif solver == 'optimal':
+                if (strand, teacher_name) in global_choice:
+                    subjects_hours[global_choice[(strand, teacher_name)]] = hours_per_subject
+            else:
+                # Assign one specialized subject not yet assigned
+                for subject in specialized_subjects:
+                    if subject in assigned_subjects:
+                        continue
+                    if subject.lower() in teacher_skills:
+                        subjects_hours[subject] = hours_per_subject
+                        assigned_subjects.add(subject)
+                        break
             # If no specialized subject assigned, assign default
             if not subjects_hours:
                 subjects_hours["No assigned specialized subject"] = hours_per_subject
@@ -220,9 +423,14 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
                 if core_subj.lower() in teacher_skills:
                     subjects_hours[core_subj] = hours_per_subject
             total_hours = sum(subjects_hours.values())
+            reserved_hours = 0
+            if solver == 'optimal':
+                if (strand, teacher_name) in global_choice:
+                    planned_hours[teacher_name] -= total_hours
+                reserved_hours = planned_hours[teacher_name]
             # Enforce max hours per week cap
             max_hours_per_week = teacher.get('max_hours_per_week', 40)
-            if teacher_assigned_hours[teacher_name] + total_hours > max_hours_per_week:
+            if teacher_assigned_hours[teacher_name] + total_hours + reserved_hours > max_hours_per_week:
                 total_hours = max_hours_per_week - teacher_assigned_hours[teacher_name]
                 # Adjust subjects_hours proportionally or remove some subjects (simplified here by skipping assignment)
                 # For simplicity, skip assignment if it exceeds max hours
@@ -230,13 +438,13 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
             teacher_assigned_hours[teacher_name] += total_hours
             subjects_list = [{'subject': sub, 'hours_per_week': hrs} for sub, hrs in subjects_hours.items()]
             assigned_strands = teacher_to_strands.get(teacher_name, [])
-            frontend_output.append({
+            state.add_frontend_entry({
                 'teacher': teacher_name,
                 'assigned_strands': assigned_strands,
                 'subjects': subjects_list,
                 'total_hours_per_day': round(teacher_assigned_hours[teacher_name] / 5, 2)
             })
-            all_teachers_output.append({
+            state.add_all_teachers_entry({
                 'teacher': teacher_name,
                 'assigned_strands': assigned_strands,
                 'subjects': subjects_list,
@@ -246,25 +454,50 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
 
     # Workload balancing: assign additional subjects to teachers with less than max hours
     max_hours_per_week = 40
+
+    def assign_extra_subject(teacher_name, frontend_entry, strand, subject, hours_to_add):
+        # Record one more subject for the teacher in both outputs; returns the (possibly new) summary entry
+        if not frontend_entry:
+            frontend_entry = {
+                'teacher': teacher_name,
+                'assigned_strands': [],
+                'subjects': [],
+                'total_hours_per_day': 0
+            }
+            state.add_frontend_entry(frontend_entry)
+        state.add_strand(frontend_entry, strand)
+        state.add_subject(frontend_entry, {'subject': subject, 'hours_per_week': hours_to_add})
+        frontend_entry['total_hours_per_day'] = round((teacher_assigned_hours[teacher_name] + hours_to_add) / 5, 2)
+        all_teachers_entry = state.all_teachers_entry(teacher_name)
+        if not all_teachers_entry:
+            all_teachers_entry = {
+                'teacher': teacher_name,
+                'assigned_strands': [],
+                'subjects': [],
+                'total_hours_per_week': 0,
+                'fully_loaded': False
+            }
+            state.add_all_teachers_entry(all_teachers_entry)
+        if strand not in all_teachers_entry['assigned_strands']:
+            all_teachers_entry['assigned_strands'].append(strand)
+        all_teachers_entry['subjects'].append({'subject': subject, 'hours_per_week': hours_to_add})
+        all_teachers_entry['total_hours_per_week'] = teacher_assigned_hours[teacher_name] + hours_to_add
+        all_teachers_entry['fully_loaded'] = all_teachers_entry['total_hours_per_week'] >= max_hours_per_week
+        teacher_assigned_hours[teacher_name] += hours_to_add
+        return frontend_entry
+
     for teacher_name, assigned_hours in teacher_assigned_hours.items():
         if assigned_hours >= max_hours_per_week:
             continue
-        teacher = next((t for t in teachers if (t.get('name') or t.get('full_name')) == teacher_name), None)
+        teacher = state.teacher(teacher_name)
         if not teacher:
             continue
         teacher_skills = teacher_skills_map.get(teacher_name, set())
-        # Find strands not yet assigned to this teacher
-        assigned_strands = set(teacher_to_strands.get(teacher_name, []))
-        unassigned_strands = set(STRAND_PARAMETERS.keys()) - assigned_strands
         # Track subjects already assigned to this teacher to avoid duplicates
-        frontend_entry = next((e for e in frontend_output if e['teacher'] == teacher_name), None)
+        frontend_entry = state.frontend_entry(teacher_name)
         assigned_subjects = set(sub['subject'] for sub in frontend_entry['subjects']) if frontend_entry else set()
-        # Track subjects assigned in strands to avoid duplicates across teachers
-        strand_assigned_subjects = defaultdict(set)
-        for entry in frontend_output:
-            for strand in entry['assigned_strands']:
-                for subj in entry['subjects']:
-                    strand_assigned_subjects[strand].add(subj['subject'])
+        # Track subjects assigned in strands to avoid duplicates across teachers, as of this teacher's turn
+        strand_assigned_subjects = defaultdict(set, {strand: set(subjects) for strand, subjects in state.strand_subjects.items()})
         assigned_new_subject = True
         while assigned_new_subject and teacher_assigned_hours[teacher_name] < max_hours_per_week:
             assigned_new_subject = False
@@ -276,89 +509,21 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
                     continue
                 specialized_subjects = strand_params['specialized_subjects']
                 core_subjects = strand_params['core_subjects']
-                # Try to assign specialized subjects first
-                for subject in specialized_subjects:
-                    if subject.lower() in teacher_skills and subject not in assigned_subjects and subject not in strand_assigned_subjects[strand]:
-                        hours_to_add = hours_per_subject
-                        if teacher_assigned_hours[teacher_name] + hours_to_add > max_hours_per_week:
-                            continue
-                        # Assign subject
-                        if not frontend_entry:
-                            frontend_entry = {
-                                'teacher': teacher_name,
-                                'assigned_strands': [],
-                                'subjects': [],
-                                'total_hours_per_day': 0
-                            }
-                            frontend_output.append(frontend_entry)
-                        if strand not in frontend_entry['assigned_strands']:
-                            frontend_entry['assigned_strands'].append(strand)
-                        frontend_entry['subjects'].append({'subject': subject, 'hours_per_week': hours_to_add})
-                        frontend_entry['total_hours_per_day'] = round((teacher_assigned_hours[teacher_name] + hours_to_add) / 5, 2)
-                        all_teachers_entry = next((e for e in all_teachers_output if e['teacher'] == teacher_name), None)
-                        if not all_teachers_entry:
-                            all_teachers_entry = {
-                                'teacher': teacher_name,
-                                'assigned_strands': [],
-                                'subjects': [],
-                                'total_hours_per_week': 0,
-                                'fully_loaded': False
-                            }
-                            all_teachers_output.append(all_teachers_entry)
-                        if strand not in all_teachers_entry['assigned_strands']:
-                            all_teachers_entry['assigned_strands'].append(strand)
-                        all_teachers_entry['subjects'].append({'subject': subject, 'hours_per_week': hours_to_add})
-                        all_teachers_entry['total_hours_per_week'] = teacher_assigned_hours[teacher_name] + hours_to_add
-                        all_teachers_entry['fully_loaded'] = all_teachers_entry['total_hours_per_week'] >= max_hours_per_week
-                        teacher_assigned_hours[teacher_name] += hours_to_add
-                        assigned_subjects.add(subject)
-                        strand_assigned_subjects[strand].add(subject)
-                        assigned_new_subject = True
-                        teacher_to_strands[teacher_name] = list(assigned_strands.union({strand}))
-                        break
-                if assigned_new_subject:
-                    continue
-                # Try to assign core subjects if no specialized assigned
-                for subject in core_subjects:
-                    if subject.lower() in teacher_skills and subject not in assigned_subjects and subject not in strand_assigned_subjects[strand]:
-                        hours_to_add = hours_per_subject
-                        if teacher_assigned_hours[teacher_name] + hours_to_add > max_hours_per_week:
-                            continue
-                        if not frontend_entry:
-                            frontend_entry = {
-                                'teacher': teacher_name,
-                                'assigned_strands': [],
-                                'subjects': [],
-                                'total_hours_per_day': 0
-                            }
-                            frontend_output.append(frontend_entry)
-                        if strand not in frontend_entry['assigned_strands']:
-                            frontend_entry['assigned_strands'].append(strand)
-                        frontend_entry['subjects'].append({'subject': subject, 'hours_per_week': hours_to_add})
-                        frontend_entry['total_hours_per_day'] = round((teacher_assigned_hours[teacher_name] + hours_to_add) / 5, 2)
-                        all_teachers_entry = next((e for e in all_teachers_output if e['teacher'] == teacher_name), None)
-                        if not all_teachers_entry:
-                            all_teachers_entry = {
-                                'teacher': teacher_name,
-                                'assigned_strands': [],
-                                'subjects': [],
-                                'total_hours_per_week': 0,
-                                'fully_loaded': False
-                            }
-                            all_teachers_output.append(all_teachers_entry)
-                        if strand not in all_teachers_entry['assigned_strands']:
-                            all_teachers_entry['assigned_strands'].append(strand)
-                        all_teachers_entry['subjects'].append({'subject': subject, 'hours_per_week': hours_to_add})
-                        all_teachers_entry['total_hours_per_week'] = teacher_assigned_hours[teacher_name] + hours_to_add
-                        all_teachers_entry['fully_loaded'] = all_teachers_entry['total_hours_per_week'] >= max_hours_per_week
-                        teacher_assigned_hours[teacher_name] += hours_to_add
-                        assigned_subjects.add(subject)
-                        strand_assigned_subjects[strand].add(subject)
-                        assigned_new_subject = True
-                        teacher_to_strands[teacher_name] = list(assigned_strands.union({strand}))
+                # Try to assign specialized subjects first, then core subjects if none was assigned yet
+                for candidates in (specialized_subjects, core_subjects):
+                    for subject in candidates:
+                        if subject.lower() in teacher_skills and subject not in assigned_subjects and subject not in strand_assigned_subjects[strand]:
+                            hours_to_add = hours_per_subject
+                            if teacher_assigned_hours[teacher_name] + hours_to_add > max_hours_per_week:
+                                continue
+                            frontend_entry = assign_extra_subject(teacher_name, frontend_entry, strand, subject, hours_to_add)
+                            assigned_subjects.add(subject)
+                            strand_assigned_subjects[strand].add(subject)
+                            assigned_new_subject = True
+                            teacher_to_strands[teacher_name] = list(assigned_strands.union({strand}))
+                            break
+                    if assigned_new_subject:
                         break
-                if assigned_new_subject:
-                    continue
 
     # Add teachers not assigned in the above loop
     assigned_teacher_names = set(t['teacher'] for t in frontend_output)
@@ -404,11 +569,6 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
         'strand_to_teachers': strand_to_teachers_str
     }
 
-    temp_dir = os.path.join(os.path.dirname(__file__), 'temp')
-    if not os.path.exists(temp_dir):
-        os.makedirs(temp_dir)
-    output_file = os.path.join(temp_dir, 'output.json')
-
     output_data = {
         'teacher_workload_summary': frontend_output,
         'all_teachers_status': all_teachers_output,
@@ -416,10 +576,17 @@ def combined_workload_skill_matching(teachers, classes, preferences, teacher_nam
         'analysis_report': analysis_report
     }
 
-    with open(output_file, 'w') as f:
-        json.dump(output_data, f, indent=2)
+    if output_file:
+        with open(output_file, 'w') as f:
+            json.dump(output_data, f, indent=2)
+
+    return output_data
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Combined workload distribution and skill-based matching')
+    parser.add_argument('--solver', choices=SOLVERS, default=DEFAULT_SOLVER)
+    args = parser.parse_args()
+
     temp_dir = os.path.join(os.path.dirname(__file__), 'temp')
     teachers_file = os.path.join(temp_dir, 'teachers_input.json')
     classes_file = os.path.join(temp_dir, 'classes_input.json')
@@ -435,4 +602,8 @@ if __name__ == "__main__":
     with open(preferences_file, 'r') as f:
         preferences = json.load(f)
 
-    combined_workload_skill_matching(teachers, classes, preferences, 'name', 'subject')
+    # output.json is still written for GET /api/workload_distribution; stdout carries the result to callers
+    output_data = combined_workload_skill_matching(teachers, classes, preferences, 'name', 'subject',
+                                                   output_file=os.path.join(temp_dir, 'output.json'),
+                                                   solver=args.solver)
+    print(json.dumps(output_data))
@@ -0,0 +1,103 @@
+import numpy as np
+
+
+class CompiledInference:
+    """
+    Exact inference over the CPDs of a discrete Bayesian network, compiled
+    once per model and reused across queries.
+
+    P(query | evidence) is the product of all CPD factors with the evidence
+    axes sliced out, summed over the remaining variables. Everything except
+    the evidence values depends only on which variables are observed, so per
+    evidence pattern a plan is built once and cached: factors that involve no
+    evidence are contracted ahead of time into one tensor, and the
+    contraction order (elimination order) for the rest comes from
+    np.einsum_path. A query then only slices the evidence factors and runs
+    the planned contraction. For the risk networks, where one CPD family
+    spans every variable, this is what a calibrated clique tree reduces to.
+    """
+
+    def __init__(self, cpds, max_patterns=1024):
+        self.factors = []
+        self.state_index = {}
+        for cpd in cpds:
+            variables = list(cpd.variables)
+            self.factors.append((variables, np.asarray(cpd.values, dtype=np.float64)))
+            for var in variables:
+                self.state_index.setdefault(var, {state: i for i, state in enumerate(cpd.state_names[var])})
+        self.variables = list(self.state_index)
+        # einsum subscripts are single letters, one per variable
+        letters = 'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+        if len(self.variables) > len(letters):
+            raise ValueError(f"Too many variables for compiled inference: {len(self.variables)}")
+        self.letters = dict(zip(self.variables, letters))
+        self.max_patterns = max_patterns
+        self._plans = {}
+
+    def _subscript(self, variables, observed=frozenset()):
+        return ''.join(self.letters[var] for var in variables if var not in observed)
+
+    def _plan(self, query_variable, observed):
+        key = (query_variable, observed)
+        plan = self._plans.get(key)
+        if plan is not None:
+            return plan
+
+        # Fully observed factors only scale the result, which is normalized anyway
+        evidence_factors = [i for i, (variables, _) in enumerate(self.factors)
+                            if observed.intersection(variables) and not observed.issuperset(variables)]
+        constant_factors = [i for i, (variables, _) in enumerate(self.factors) if not observed.intersection(variables)]
+        inputs = [self._subscript(self.factors[i][0], observed) for i in evidence_factors]
+        operands = [self.factors[i][1][tuple(0 if var in observed else slice(None) for var in self.factors[i][0])]
+                    for i in evidence_factors]
+
+        # Contract the evidence-independent factors once, keeping only the variables still needed
+        constant = None
+        if constant_factors:
+            needed = set(''.join(inputs)) | {self.letters[query_variable]}
+            keep = ''.join(self.letters[var] for var in self.variables
+                           if self.letters[var] in needed
+                           and any(var in self.factors[i][0] for i in constant_factors))
+            constant = np.einsum(','.join(self._subscript(self.factors[i][0]) for i in constant_factors) + '->' + keep,
+                                 *[self.factors[i][1] for i in constant_factors], optimize='greedy')
+            inputs.append(keep)
+            operands.append(constant)
+
+        subscripts = ','.join(inputs) + '->' + self.letters[query_variable]
+        # With one or two operands there is no order to choose, and skipping the path
+        # avoids einsum re-validating it on every call
+        path = False if len(operands) <= 2 else np.einsum_path(subscripts, *operands, optimize='greedy')[0]
+        if len(self._plans) >= self.max_patterns:
+            # Drop the oldest plan
+            self._plans.pop(next(iter(self._plans)), None)
+        plan = self._plans[key] = (evidence_factors, constant, subscripts, path)
+        return plan
+
+    def evidence_indices(self, evidence):
+        indices = {}
+        for var, state in evidence.items():
+            try:
+                indices[var] = self.state_index[var][state]
+            except KeyError:
+                raise ValueError(f"Unknown evidence {var}={state}")
+        return indices
+
+    def query(self, query_variable, evidence=None):
+        """
+        Return P(query_variable | evidence) in the CPD state order.
+        """
+        indices = self.evidence_indices(evidence or {})
+        if query_variable in indices:
+            raise ValueError(f"Query variable {query_variable} cannot also be evidence")
+        evidence_factors, constant, subscripts, path = self._plan(query_variable, frozenset(indices))
+        operands = []
+        for i in evidence_factors:
+            variables, values = self.factors[i]
+            operands.append(values[tuple(indices.get(var, slice(None)) for var in variables)])
+        if constant is not None:
+            operands.append(constant)
+        result = np.einsum(subscripts, *operands, optimize=path)
+        return result / result.sum()
+
+    def cached_patterns(self):
+        return len(self._plans)
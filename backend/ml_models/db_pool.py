@@ -0,0 +1,181 @@
+import logging
+import os
+import threading
+import time
+
+from mysql.connector import Error, pooling
+from mysql.connector.errors import PoolError
+
+logger = logging.getLogger(__name__)
+
+DB_CONFIG = {
+    'host': os.environ.get('DB_HOST', 'localhost'),
+    'database': os.environ.get('DB_NAME', 'workforce'),
+    'user': os.environ.get('DB_USER', 'root'),
+    'password': os.environ.get('DB_PASSWORD', 'Omamam@010101')
+}
+DEFAULT_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '5'))
+DEFAULT_CHECKOUT_TIMEOUT = float(os.environ.get('DB_POOL_CHECKOUT_TIMEOUT', '5'))
+
+
+class PooledConnection:
+    """
+    Wraps a pooled mysql.connector connection. close() (or leaving a with
+    block) hands the connection back to the pool instead of disconnecting.
+    """
+
+    def __init__(self, connection, pool):
+        self._connection = connection
+        self._pool = pool
+        self._closed = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._connection.close()
+        finally:
+            self._pool._release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        # Safety net for code paths that forget to close the connection
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Bounded MySQL connection pool shared by the Flask API and the risk scripts.
+
+    Checkouts wait up to checkout_timeout seconds for a free connection, every
+    connection is pinged (and reconnected if needed) before it is handed out,
+    and checkout metrics are available from metrics().
+    """
+
+    def __init__(self, config=None, pool_size=DEFAULT_POOL_SIZE, checkout_timeout=DEFAULT_CHECKOUT_TIMEOUT,
+                 pool_name='workforce_pool'):
+        self.config = dict(config or DB_CONFIG)
+        self.pool_size = pool_size
+        self.checkout_timeout = checkout_timeout
+        self.pool_name = pool_name
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(pool_size)
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'checkouts': 0,
+            'in_use': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'timeouts': 0,
+            'failed_pings': 0
+        }
+
+    def _get_pool(self):
+        # Created on first use so importing this module never opens connections
+        if self._pool is None:
+            with self._pool_lock:
+                if self._pool is None:
+                    self._pool = pooling.MySQLConnectionPool(
+                        pool_name=self.pool_name,
+                        pool_size=self.pool_size,
+                        pool_reset_session=True,
+                        **self.config
+                    )
+        return self._pool
+
+    def get_connection(self, timeout=None):
+        """
+        Check out a live connection. Raises PoolError if none frees up in time.
+        """
+        timeout = self.checkout_timeout if timeout is None else timeout
+        start = time.monotonic()
+        waited = False
+        if not self._slots.acquire(blocking=False):
+            waited = True
+            if not self._slots.acquire(timeout=timeout):
+                with self._metrics_lock:
+                    self._metrics['waits'] += 1
+                    self._metrics['timeouts'] += 1
+                raise PoolError(f"Timed out after {timeout}s waiting for a database connection")
+        wait_time = time.monotonic() - start
+
+        try:
+            connection = self._get_pool().get_connection()
+            self._pre_ping(connection)
+        except Exception:
+            self._slots.release()
+            raise
+
+        with self._metrics_lock:
+            self._metrics['checkouts'] += 1
+            self._metrics['in_use'] += 1
+            if waited:
+                self._metrics['waits'] += 1
+                self._metrics['wait_time_total'] += wait_time
+                self._metrics['wait_time_max'] = max(self._metrics['wait_time_max'], wait_time)
+        return PooledConnection(connection, self)
+
+    def _pre_ping(self, connection):
+        try:
+            connection.ping(reconnect=True, attempts=2, delay=0)
+        except Error:
+            with self._metrics_lock:
+                self._metrics['failed_pings'] += 1
+            connection.close()
+            raise
+
+    def _release(self):
+        with self._metrics_lock:
+            self._metrics['in_use'] -= 1
+        self._slots.release()
+
+    def health_check(self):
+        """
+        Return True if a connection can be checked out and answers SELECT 1.
+        """
+        try:
+            with self.get_connection() as connection:
+                cursor = connection.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchall()
+                cursor.close()
+            return True
+        except Error as e:
+            logger.error(f"Database health check failed: {e}")
+            return False
+
+    def metrics(self):
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['pool_size'] = self.pool_size
+        metrics['available'] = self.pool_size - metrics['in_use']
+        metrics['wait_time_avg'] = metrics['wait_time_total'] / metrics['waits'] if metrics['waits'] else 0.0
+        return metrics
+
+
+default_pool = ConnectionPool()
+
+
+def get_connection(timeout=None):
+    """
+    Check out a connection from the shared pool. Call close() to return it.
+    """
+    return default_pool.get_connection(timeout)
+
+
+def pool_metrics():
+    return default_pool.metrics()
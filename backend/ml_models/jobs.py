@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+DEFAULT_RESULT_TTL = float(os.environ.get('JOB_RESULT_TTL', '3600'))
+# Set JOB_DB_PATH to keep job records in SQLite so they survive a restart
+DEFAULT_DB_PATH = os.environ.get('JOB_DB_PATH') or None
+
+FINISHED_STATES = ('succeeded', 'failed')
+
+
+class JobManager:
+    """
+    Runs long computations in a local thread pool so API requests can return
+    immediately with a job id.
+
+    Handlers are registered per job type as fn(params, progress), where
+    progress(fraction, message=None) reports how far along the job is.
+    Finished jobs are kept for ttl seconds. With db_path set, job records are
+    also written to SQLite; jobs still queued when the process stopped are
+    queued again on startup, and jobs that were running are marked failed.
+    """
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, ttl=DEFAULT_RESULT_TTL, db_path=DEFAULT_DB_PATH):
+        self.ttl = ttl
+        self.db_path = db_path
+        self._handlers = {}
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self._pending_restore = []
+        if db_path:
+            self._init_db()
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=10)
+
+    def _init_db(self):
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, record TEXT NOT NULL, "
+                         "finished_at REAL)")
+            rows = conn.execute("SELECT record FROM jobs").fetchall()
+        for (record,) in rows:
+            job = json.loads(record)
+            if job['status'] == 'running':
+                job.update(status='failed', error='Interrupted by a server restart', finished_at=time.time())
+                self._persist(job)
+            elif job['status'] == 'queued':
+                self._pending_restore.append(job['id'])
+            self._jobs[job['id']] = job
+
+    def _persist(self, job):
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute("INSERT OR REPLACE INTO jobs (id, record, finished_at) VALUES (?, ?, ?)",
+                             (job['id'], json.dumps(job, default=str), job.get('finished_at')))
+        except sqlite3.Error as e:
+            logger.warning(f"Could not persist job {job['id']}: {e}")
+
+    def register(self, job_type, handler):
+        self._handlers[job_type] = handler
+        # Jobs restored from SQLite can only run once their handler is known
+        for job_id in [j for j in self._pending_restore if self._jobs[j]['type'] == job_type]:
+            self._pending_restore.remove(job_id)
+            logger.info(f"Re-queueing job {job_id} ({job_type}) after restart")
+            self._executor.submit(self._run, job_id)
+
+    @property
+    def job_types(self):
+        return sorted(self._handlers)
+
+    def submit(self, job_type, params=None):
+        """
+        Queue a job and return its id. Raises ValueError for an unknown type.
+        """
+        if job_type not in self._handlers:
+            raise ValueError(f"Unknown job type '{job_type}'. Expected one of: {', '.join(self.job_types)}")
+        self.evict_expired()
+        job = {
+            'id': uuid.uuid4().hex,
+            'type': job_type,
+            'params': params or {},
+            'status': 'queued',
+            'progress': 0.0,
+            'message': None,
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        with self._lock:
+            self._jobs[job['id']] = job
+        self._persist(job)
+        self._executor.submit(self._run, job['id'])
+        return job['id']
+
+    def _update(self, job_id, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.update(fields)
+            snapshot = dict(job)
+        self._persist(snapshot)
+
+    def _run(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return
+        handler = self._handlers[job['type']]
+
+        def progress(fraction, message=None):
+            self._update(job_id, progress=round(min(max(float(fraction), 0.0), 1.0), 3), message=message)
+
+        self._update(job_id, status='running', started_at=time.time())
+        try:
+            result = handler(job['params'], progress)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({job['type']}) failed: {str(e)}")
+            self._update(job_id, status='failed', error=str(e), finished_at=time.time())
+            return
+        self._update(job_id, status='succeeded', progress=1.0, result=result, finished_at=time.time())
+
+    def get(self, job_id):
+        """
+        Return a copy of the job record, or None if it is unknown or expired.
+        """
+        self.evict_expired()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def evict_expired(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['status'] in FINISHED_STATES and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if self.db_path and expired:
+            try:
+                with self._connect() as conn:
+                    conn.execute("DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+            except sqlite3.Error as e:
+                logger.warning(f"Could not evict expired jobs: {e}")
+        return len(expired)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job['status']] = counts.get(job['status'], 0) + 1
+        return counts
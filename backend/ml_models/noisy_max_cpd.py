@@ -0,0 +1,86 @@
+import numpy as np
+
+
+class NoisyMaxCPD:
+    """
+    Noisy-MAX conditional distribution for a graded child variable.
+
+    Each parent independently pushes the child towards a severity level: in
+    parent state x it produces an effect Y ~ effects[parent][x] over the child
+    states, a leak term produces Y0 ~ leak, and the child takes the most
+    severe of all effects. So
+
+        P(child <= k | x) = CDF_leak(k) * prod_i CDF_i(k | x_i)
+
+    which needs only a (parent states x child states) table per parent
+    instead of one column per joint parent configuration.
+
+    child_states are ordered from least to most severe. A parent with no
+    effects entry never raises the child above its least severe state.
+    """
+
+    def __init__(self, variable, child_states, leak, parent_states, effects=None):
+        self.variable = variable
+        self.child_states = list(child_states)
+        self.leak = np.asarray(leak, dtype=np.float64)
+        self.parents = list(parent_states)
+        self.parent_states = {parent: list(states) for parent, states in parent_states.items()}
+        self.parent_index = {parent: {state: i for i, state in enumerate(states)}
+                             for parent, states in self.parent_states.items()}
+
+        # Per-parent CDF tables, shape (parent states, child states)
+        self._cdfs = {}
+        for parent, states in self.parent_states.items():
+            table = (effects or {}).get(parent)
+            if table is None:
+                table = np.zeros((len(states), len(self.child_states)))
+                table[:, 0] = 1.0
+            table = np.asarray(table, dtype=np.float64)
+            if table.shape != (len(states), len(self.child_states)):
+                raise ValueError(f"Effect table for {parent} must have shape {(len(states), len(self.child_states))}")
+            self._cdfs[parent] = np.cumsum(table, axis=1)
+        self._leak_cdf = np.cumsum(self.leak)
+
+    def query(self, evidence, parent_priors):
+        """
+        Exact P(child | evidence) for root parents with the given priors.
+        Unobserved parents are summed out in closed form, since independent
+        roots contribute the prior-weighted average of their CDF.
+        Returns probabilities in child_states order.
+        """
+        cdf = self._leak_cdf.copy()
+        for parent in self.parents:
+            table = self._cdfs[parent]
+            state = evidence.get(parent)
+            if state is None:
+                cdf *= np.asarray(parent_priors[parent]) @ table
+            else:
+                try:
+                    cdf *= table[self.parent_index[parent][state]]
+                except KeyError:
+                    raise ValueError(f"Unknown state {state!r} for {parent}")
+        return np.diff(cdf, prepend=0.0)
+
+    def query_batch(self, indices, parent_priors):
+        """
+        Vectorized query for an (n, len(parents)) array of parent state
+        indices, columns in self.parents order; -1 marks an unobserved parent.
+        Returns an (n, child states) array.
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        cdf = np.tile(self._leak_cdf, (len(indices), 1))
+        for j, parent in enumerate(self.parents):
+            table = self._cdfs[parent]
+            # Row -1 of the extended table is the prior-averaged CDF used for unobserved parents
+            extended = np.vstack([table, np.asarray(parent_priors[parent]) @ table])
+            cdf *= extended[indices[:, j]]
+        return np.diff(cdf, axis=1, prepend=0.0)
+
+    def probability(self, config):
+        """
+        P(child | all parents observed), i.e. one column of the equivalent dense table.
+        """
+        return self.query(config, parent_priors={})
+
+    def nbytes(self):
+        return self.leak.nbytes + sum(table.nbytes for table in self._cdfs.values())
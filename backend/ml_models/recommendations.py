@@ -1,11 +1,5 @@
 import json
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
-
-import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.preprocessing import StandardScaler
 
 def generate_trend_recommendations(teachers, correlation_coefficient=None, regression_slope=None):
     recommendations = []
@@ -253,6 +247,10 @@ def generate_trend_recommendations(teachers, correlation_coefficient=None, regre
                 })
         return recommendations
 
+    # sklearn is only needed for clustering, so it is imported here rather than at startup
+    from sklearn.cluster import KMeans
+    from sklearn.preprocessing import StandardScaler
+
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(features)
 
@@ -0,0 +1,181 @@
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from flask import Response, make_response, request
+from mysql.connector import Error
+
+logger = logging.getLogger(__name__)
+
+# How long to wait before probing data_versions again after it could not be read
+VERSION_TABLE_RETRY_SECONDS = float(os.environ.get('VERSION_TABLE_RETRY_SECONDS', '300'))
+
+
+class ResponseCache:
+    """
+    In-process cache of endpoint responses keyed by endpoint, request
+    parameters and a data-version token of the tables the endpoint reads.
+
+    The version token comes from the trigger-maintained data_versions table
+    (sql/create_data_versions_table.sql), which deployments are expected to
+    install. Without it a table falls back to COUNT(*), MAX(primary key) and
+    MAX(updated_at) where the table has that column; an error is logged since
+    in-place updates of tables without updated_at then go unnoticed. Writes
+    made through this API also call invalidate() so they are seen immediately. Responses carry an ETag,
+    and a matching If-None-Match gets a 304 without recomputing anything.
+    """
+
+    def __init__(self, connection_factory, max_entries=128):
+        self.connection_factory = connection_factory
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # cache key -> (etag, tables, body, mimetype)
+        self._generations = {}  # table -> local write counter
+        # monotonic time before which data_versions is not queried again
+        self._version_table_retry_at = 0.0
+        # table -> (primary key column, has updated_at) for the fallback token, looked up once
+        self._fallback_columns = {}
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'not_modified': 0, 'bypassed': 0}
+
+    def _count(self, stat):
+        with self._lock:
+            self._stats[stat] += 1
+
+    def _fallback_column_info(self, cursor, tables):
+        unknown = [t for t in tables if t not in self._fallback_columns]
+        if unknown:
+            placeholders = ', '.join(['%s'] * len(unknown))
+            cursor.execute("SELECT table_name, column_name, column_key FROM information_schema.columns "
+                           f"WHERE table_schema = DATABASE() AND table_name IN ({placeholders}) "
+                           "AND (column_key = 'PRI' OR column_name = 'updated_at') ORDER BY ordinal_position",
+                           unknown)
+            info = {t: [None, False] for t in unknown}
+            for table, column, key in cursor.fetchall():
+                if key == 'PRI' and info[table][0] is None:
+                    info[table][0] = column
+                if column == 'updated_at':
+                    info[table][1] = True
+            for table, (key, has_updated_at) in info.items():
+                if not has_updated_at:
+                    logger.error(f"Table {table} has no data_versions counter or updated_at column; cached "
+                                 f"responses miss in-place updates until sql/create_data_versions_table.sql is installed")
+                self._fallback_columns[table] = (key, has_updated_at)
+        return {t: self._fallback_columns[t] for t in tables}
+
+    def _table_versions(self, cursor, tables):
+        versions = {}
+        if time.monotonic() >= self._version_table_retry_at:
+            placeholders = ', '.join(['%s'] * len(tables))
+            try:
+                cursor.execute(f"SELECT table_name, version FROM data_versions WHERE table_name IN ({placeholders})",
+                               list(tables))
+                versions = {name: f"v{version}" for name, version in cursor.fetchall()}
+            except Error as e:
+                logger.error(f"data_versions table unavailable, using row counts for cache versions "
+                             f"for {VERSION_TABLE_RETRY_SECONDS:.0f}s: {e}")
+                self._version_table_retry_at = time.monotonic() + VERSION_TABLE_RETRY_SECONDS
+
+        missing = [t for t in tables if t not in versions]
+        if missing:
+            parts = []
+            for table, (key, has_updated_at) in self._fallback_column_info(cursor, missing).items():
+                max_key = f"MAX(`{key}`)" if key else "NULL"
+                max_updated = "MAX(`updated_at`)" if has_updated_at else "NULL"
+                parts.append(f"SELECT '{table}', COUNT(*), {max_key}, {max_updated} FROM `{table}`")
+            cursor.execute(" UNION ALL ".join(parts))
+            for name, count, max_key, max_updated in cursor.fetchall():
+                versions[name] = f"c{count}:{max_key}:{max_updated}"
+        return versions
+
+    def data_version(self, tables):
+        """
+        Return a token that changes whenever any of the tables changes.
+        """
+        connection = self.connection_factory()
+        if connection is None:
+            raise Error("Database connection failed")
+        try:
+            cursor = connection.cursor()
+            versions = self._table_versions(cursor, sorted(tables))
+            cursor.close()
+        finally:
+            connection.close()
+        with self._lock:
+            generations = {t: self._generations.get(t, 0) for t in tables}
+        return '|'.join(f"{t}={versions.get(t)}/{generations[t]}" for t in sorted(tables))
+
+    def invalidate(self, *tables):
+        """
+        Drop cached responses that depend on any of the tables.
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+            stale = [key for key, entry in self._entries.items() if set(entry[1]) & set(tables)]
+            for key in stale:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+    @staticmethod
+    def request_key():
+        """
+        Cache key for the current request: endpoint, query parameters and body.
+        """
+        body_hash = hashlib.sha256(request.get_data() or b'').hexdigest()
+        args = '&'.join(f"{k}={v}" for k, v in sorted(request.args.items(multi=True)))
+        return f"{request.method} {request.path}?{args}#{body_hash}"
+
+    def cached(self, *tables):
+        """
+        Decorator for Flask views whose output depends only on the request and
+        the contents of the given tables.
+        """
+        def decorator(view):
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                try:
+                    version = self.data_version(tables)
+                except Error as e:
+                    logger.warning(f"Could not read data version, serving {request.path} uncached: {e}")
+                    self._count('bypassed')
+                    return view(*args, **kwargs)
+
+                key = self.request_key()
+                tag = hashlib.sha256(f"{key}|{version}".encode('utf-8')).hexdigest()[:32]
+                etag = f'"{tag}"'
+
+                # The ETag only changes with the data version, so a match means the client copy is current
+                if request.if_none_match.contains(tag):
+                    self._count('not_modified')
+                    return Response(status=304, headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+                with self._lock:
+                    entry = self._entries.get(key)
+                    if entry is not None and entry[0] == etag:
+                        self._entries.move_to_end(key)
+                        self._stats['hits'] += 1
+                        return Response(entry[2], mimetype=entry[3],
+                                        headers={'ETag': etag, 'Cache-Control': 'no-cache'})
+
+                self._count('misses')
+                response = make_response(view(*args, **kwargs))
+                if response.status_code == 200 and not response.is_streamed:
+                    with self._lock:
+                        self._entries[key] = (etag, tables, response.get_data(), response.mimetype)
+                        self._entries.move_to_end(key)
+                        while len(self._entries) > self.max_entries:
+                            self._entries.popitem(last=False)
+                    response.headers['ETag'] = etag
+                    response.headers['Cache-Control'] = 'no-cache'
+                return response
+            return wrapper
+        return decorator
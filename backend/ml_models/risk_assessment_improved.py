@@ -1,143 +1,173 @@
-import mysql.connector
 from mysql.connector import Error
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
+from db_pool import get_connection
 import json
+import os
+from noisy_max_cpd import NoisyMaxCPD
+from compiled_inference import CompiledInference
+from risk_sensitivity import single_variable_changes
+from evidence_discretizer import EvidenceDiscretizer
+import numpy as np
+
+# Root variables of the network: (states, prior probabilities), each with its least risky state first
+# (simplified example, should be refined with real data)
+PARENT_PRIORS = {
+    'Performance': (['High', 'Medium', 'Low'], [0.7, 0.2, 0.1]),
+    'Hours per Week': (['Low', 'Medium', 'High'], [0.6, 0.3, 0.1]),
+    'Teacher Satisfaction': (['High', 'Medium', 'Low'], [0.7, 0.2, 0.1]),
+    'Student Satisfaction': (['High', 'Medium', 'Low'], [0.7, 0.2, 0.1]),
+    'Teachers Count': (['Low', 'Medium', 'High'], [0.6, 0.3, 0.1]),
+    'Students Count': (['Low', 'Medium', 'High'], [0.6, 0.3, 0.1]),
+    'Salary Ratio': (['High', 'Medium', 'Low'], [0.7, 0.2, 0.1]),
+    'Professional Dev Hours': (['High', 'Medium', 'Low'], [0.7, 0.2, 0.1]),
+    'Historical Resignations': (['Low', 'Medium', 'High'], [0.1, 0.3, 0.6]),
+    'Historical Retentions': (['High', 'Medium', 'Low'], [0.6, 0.3, 0.1]),
+    'Workload Per Teacher': (['Low', 'Medium', 'High'], [0.6, 0.3, 0.1])
+}
+
+RISK_LEVEL_STATES = ['High', 'Medium', 'Low']
+# Risk Level distribution that does not depend on the parents (the current simplified table)
+RISK_LEVEL_BASE = [0.33, 0.33, 0.34]
+
+# 'noisy_max' needs one small table per parent; 'dense' builds the full 3 x 3^11 pgmpy table
+CPD_BACKENDS = ('dense', 'noisy_max')
+DEFAULT_CPD_BACKEND = os.environ.get('RISK_CPD_BACKEND', 'noisy_max')
 
 class ImprovedRiskAssessmentBayesianNetwork:
-    def __init__(self):
+    def __init__(self, cpd_backend=DEFAULT_CPD_BACKEND, effects=None, parent_priors=None, risk_base=None):
+        """
+        cpd_backend selects how the Risk Level CPD is represented. Both give
+        exact posteriors. effects optionally sets per-parent noisy-MAX effect
+        tables (parent state x Risk Level from Low to High); without them the
+        noisy-MAX CPD reduces to RISK_LEVEL_BASE, same as the dense table.
+        parent_priors ({variable: probabilities}) and risk_base replace the
+        PARENT_PRIORS probabilities and RISK_LEVEL_BASE, e.g. with estimates
+        from risk_cpd_learning. With effects, risk_base is the noisy-MAX leak.
+        """
+        if cpd_backend not in CPD_BACKENDS:
+            raise ValueError(f"Unknown cpd_backend '{cpd_backend}'. Expected one of: {', '.join(CPD_BACKENDS)}")
+        if cpd_backend == 'dense' and effects:
+            raise ValueError("Per-parent effects are only supported by the noisy_max backend")
+        self.cpd_backend = cpd_backend
+        self.parent_priors = {var: list((parent_priors or {}).get(var, prior)) for var, (_, prior) in PARENT_PRIORS.items()}
+        self.risk_base = list(RISK_LEVEL_BASE if risk_base is None else risk_base)
+        # {variable: {state: index}}, same attribute as RiskAssessmentBayesianNetwork.state_index
+        self.state_index = {var: {state: i for i, state in enumerate(states)} for var, (states, _) in PARENT_PRIORS.items()}
+        if cpd_backend == 'dense':
+            self._build_dense()
+        else:
+            self._build_noisy_max(effects)
+
+    def _build_noisy_max(self, effects):
+        # Noisy-MAX works on states ordered from least to most severe
+        severity_order = RISK_LEVEL_STATES[::-1]
+        self.risk_cpd = NoisyMaxCPD('Risk Level', severity_order, self.risk_base[::-1],
+                                    {var: states for var, (states, _) in PARENT_PRIORS.items()},
+                                    effects)
+
+    def _build_dense(self):
+        # pgmpy is slow to import, so load it only when a network is built
+        from pgmpy.models import DiscreteBayesianNetwork
+        from pgmpy.factors.discrete import TabularCPD
+        from pgmpy.inference import VariableElimination
+
         # Define a more comprehensive Bayesian Network structure including more variables
-        self.model = DiscreteBayesianNetwork([
-            ('Performance', 'Risk Level'),
-            ('Hours per Week', 'Risk Level'),
-            ('Teacher Satisfaction', 'Risk Level'),
-            ('Student Satisfaction', 'Risk Level'),
-            ('Teachers Count', 'Risk Level'),
-            ('Students Count', 'Risk Level'),
-            ('Salary Ratio', 'Risk Level'),
-            ('Professional Dev Hours', 'Risk Level'),
-            ('Historical Resignations', 'Risk Level'),
-            ('Historical Retentions', 'Risk Level'),
-            ('Workload Per Teacher', 'Risk Level')
-        ])
-
-        # Define CPDs for each variable (simplified example, should be refined with real data)
-        cpd_performance = TabularCPD(variable='Performance', variable_card=3,
-                                    values=[[0.7], [0.2], [0.1]],
-                                    state_names={'Performance': ['High', 'Medium', 'Low']})
-
-        cpd_hours = TabularCPD(variable='Hours per Week', variable_card=3,
-                               values=[[0.6], [0.3], [0.1]],
-                               state_names={'Hours per Week': ['Low', 'Medium', 'High']})
-
-        cpd_teacher_satisfaction = TabularCPD(variable='Teacher Satisfaction', variable_card=3,
-                                              values=[[0.7], [0.2], [0.1]],
-                                              state_names={'Teacher Satisfaction': ['High', 'Medium', 'Low']})
-
-        cpd_student_satisfaction = TabularCPD(variable='Student Satisfaction', variable_card=3,
-                                              values=[[0.7], [0.2], [0.1]],
-                                              state_names={'Student Satisfaction': ['High', 'Medium', 'Low']})
-
-        cpd_teachers_count = TabularCPD(variable='Teachers Count', variable_card=3,
-                                       values=[[0.6], [0.3], [0.1]],
-                                       state_names={'Teachers Count': ['Low', 'Medium', 'High']})
-
-        cpd_students_count = TabularCPD(variable='Students Count', variable_card=3,
-                                       values=[[0.6], [0.3], [0.1]],
-                                       state_names={'Students Count': ['Low', 'Medium', 'High']})
-
-        cpd_salary_ratio = TabularCPD(variable='Salary Ratio', variable_card=3,
-                                     values=[[0.7], [0.2], [0.1]],
-                                     state_names={'Salary Ratio': ['High', 'Medium', 'Low']})
-
-        cpd_prof_dev_hours = TabularCPD(variable='Professional Dev Hours', variable_card=3,
-                                       values=[[0.7], [0.2], [0.1]],
-                                       state_names={'Professional Dev Hours': ['High', 'Medium', 'Low']})
-
-        cpd_hist_resignations = TabularCPD(variable='Historical Resignations', variable_card=3,
-                                          values=[[0.1], [0.3], [0.6]],
-                                          state_names={'Historical Resignations': ['Low', 'Medium', 'High']})
-
-        cpd_hist_retentions = TabularCPD(variable='Historical Retentions', variable_card=3,
-                                        values=[[0.6], [0.3], [0.1]],
-                                        state_names={'Historical Retentions': ['High', 'Medium', 'Low']})
-
-        cpd_workload_per_teacher = TabularCPD(variable='Workload Per Teacher', variable_card=3,
-                                             values=[[0.6], [0.3], [0.1]],
-                                             state_names={'Workload Per Teacher': ['Low', 'Medium', 'High']})
+        self.model = DiscreteBayesianNetwork([(var, 'Risk Level') for var in PARENT_PRIORS])
+
+        # Define CPDs for each variable
+        parent_cpds = [TabularCPD(variable=var, variable_card=len(states),
+                                  values=[[p] for p in self.parent_priors[var]],
+                                  state_names={var: states})
+                       for var, (states, _) in PARENT_PRIORS.items()]
 
         # CPD for Risk Level with all parent variables (simplified uniform distribution for example)
+        n_columns = 3 ** len(PARENT_PRIORS)
+        state_names = {var: states for var, (states, _) in PARENT_PRIORS.items()}
+        state_names['Risk Level'] = RISK_LEVEL_STATES
         cpd_risk_level = TabularCPD(variable='Risk Level', variable_card=3,
-                                    values=[[0.33]*177147, [0.33]*177147, [0.34]*177147],
-                                    evidence=['Performance', 'Hours per Week', 'Teacher Satisfaction', 'Student Satisfaction',
-                                              'Teachers Count', 'Students Count', 'Salary Ratio', 'Professional Dev Hours',
-                                              'Historical Resignations', 'Historical Retentions', 'Workload Per Teacher'],
-                                    evidence_card=[3]*11,
-                                    state_names={'Risk Level': ['High', 'Medium', 'Low'],
-                                                 'Performance': ['High', 'Medium', 'Low'],
-                                                 'Hours per Week': ['Low', 'Medium', 'High'],
-                                                 'Teacher Satisfaction': ['High', 'Medium', 'Low'],
-                                                 'Student Satisfaction': ['High', 'Medium', 'Low'],
-                                                 'Teachers Count': ['Low', 'Medium', 'High'],
-                                                 'Students Count': ['Low', 'Medium', 'High'],
-                                                 'Salary Ratio': ['High', 'Medium', 'Low'],
-                                                 'Professional Dev Hours': ['High', 'Medium', 'Low'],
-                                                 'Historical Resignations': ['Low', 'Medium', 'High'],
-                                                 'Historical Retentions': ['High', 'Medium', 'Low'],
-                                                 'Workload Per Teacher': ['Low', 'Medium', 'High']})
-
-        self.model.add_cpds(cpd_performance, cpd_hours, cpd_teacher_satisfaction, cpd_student_satisfaction,
-                            cpd_teachers_count, cpd_students_count, cpd_salary_ratio, cpd_prof_dev_hours,
-                            cpd_hist_resignations, cpd_hist_retentions, cpd_workload_per_teacher, cpd_risk_level)
+                                    values=[[p] * n_columns for p in self.risk_base],
+                                    evidence=list(PARENT_PRIORS),
+                                    evidence_card=[3] * len(PARENT_PRIORS),
+                                    state_names=state_names)
+
+        self.model.add_cpds(*parent_cpds, cpd_risk_level)
 
         self.model.check_model()
         self.infer = VariableElimination(self.model)
+        # Queries reuse a contraction plan per evidence pattern instead of running VE from scratch
+        self.compiled = CompiledInference(self.model.get_cpds())
+
+    def predict_risk_batch(self, indices):
+        """
+        Risk Level distributions for an (n, len(PARENT_PRIORS)) array of
+        parent state indices (PARENT_PRIORS order, -1 for unobserved), e.g.
+        from EvidenceDiscretizer.indices. Returns an (n, 3) array.
+        Only the noisy_max backend is vectorized; dense runs one compiled
+        query per row and is meant for checking the noisy_max results.
+        """
+        if self.cpd_backend == 'noisy_max':
+            return self.risk_cpd.query_batch(indices, self.parent_priors)[:, ::-1]
+        # The dense backend has no vectorized inference; query row by row
+        names = list(PARENT_PRIORS)
+        return np.array([self.predict_risk({var: PARENT_PRIORS[var][0][i] for var, i in zip(names, row) if i >= 0})
+                         for row in np.asarray(indices)])
+
+    def sensitivity(self, indices):
+        """
+        Risk Level distributions for every single-variable change of the
+        evidence in one batch. indices is as for predict_risk_batch. Returns
+        (base, shifted): base is (n, 3) and shifted[i, j, s] is row i with
+        parent j set to its state s, shape (n, parents, 3, 3).
+        Requires the noisy_max backend.
+        """
+        if self.cpd_backend != 'noisy_max':
+            # dense would make n x 11 x 3 row-by-row queries
+            raise ValueError("sensitivity() requires the noisy_max backend")
+        indices = np.asarray(indices, dtype=np.intp)
+        n, k = indices.shape
+        # Every parent has three states
+        changed = single_variable_changes(indices, 3)
+        shifted = self.predict_risk_batch(changed.reshape(-1, k)).reshape(n, k, 3, -1)
+        return self.predict_risk_batch(indices), shifted
 
     def predict_risk(self, evidence):
-        query_result = self.infer.query(variables=['Risk Level'], evidence=evidence)
-        return query_result.values
-
-def map_to_evidence(row):
-    def categorize(value, thresholds, labels):
-        for i, threshold in enumerate(thresholds):
-            if value <= threshold:
-                return labels[i]
-        return labels[-1]
-
-    evidence = {}
-    evidence['Performance'] = categorize(row.get('performance', 0), [70, 85], ['Low', 'Medium', 'High'])
-    evidence['Hours per Week'] = categorize(row.get('hours_per_week', 0), [1.5, 3], ['Low', 'Medium', 'High'])
-    evidence['Teacher Satisfaction'] = categorize(row.get('teacher_satisfaction', 0), [0.6, 0.8], ['Low', 'Medium', 'High'])
-    evidence['Student Satisfaction'] = categorize(row.get('student_satisfaction', 0), [0.6, 0.8], ['Low', 'Medium', 'High'])
-    evidence['Teachers Count'] = categorize(row.get('teachers_count', 0), [1, 2], ['Low', 'Medium', 'High'])
-    evidence['Students Count'] = categorize(row.get('students_count', 0), [300, 600], ['Low', 'Medium', 'High'])
-    evidence['Salary Ratio'] = categorize(row.get('salary_ratio', 0), [1.0, 1.05], ['Low', 'Medium', 'High'])
-    evidence['Professional Dev Hours'] = categorize(row.get('professional_dev_hours', 0), [10, 20], ['Low', 'Medium', 'High'])
-    evidence['Historical Resignations'] = categorize(row.get('historical_resignations', 0), [3, 6], ['Low', 'Medium', 'High'])
-    evidence['Historical Retentions'] = categorize(row.get('historical_retentions', 0), [3, 6], ['High', 'Medium', 'Low'])
-    evidence['Workload Per Teacher'] = categorize(row.get('workload_per_teacher', 0), [10, 20], ['Low', 'Medium', 'High'])
-    return evidence
+        """
+        Return the Risk Level distribution ordered like RISK_LEVEL_STATES.
+        """
+        if self.cpd_backend == 'noisy_max':
+            return self.risk_cpd.query(evidence, self.parent_priors)[::-1]
+        return self.compiled.query('Risk Level', evidence)
+
+# How each evidence variable is binned from its column: (column, thresholds, labels, right)
+EVIDENCE_SPEC = {
+    'Performance': ('performance', [70, 85], ['Low', 'Medium', 'High'], True),
+    'Hours per Week': ('hours_per_week', [1.5, 3], ['Low', 'Medium', 'High'], True),
+    'Teacher Satisfaction': ('teacher_satisfaction', [0.6, 0.8], ['Low', 'Medium', 'High'], True),
+    'Student Satisfaction': ('student_satisfaction', [0.6, 0.8], ['Low', 'Medium', 'High'], True),
+    'Teachers Count': ('teachers_count', [1, 2], ['Low', 'Medium', 'High'], True),
+    'Students Count': ('students_count', [300, 600], ['Low', 'Medium', 'High'], True),
+    'Salary Ratio': ('salary_ratio', [1.0, 1.05], ['Low', 'Medium', 'High'], True),
+    'Professional Dev Hours': ('professional_dev_hours', [10, 20], ['Low', 'Medium', 'High'], True),
+    'Historical Resignations': ('historical_resignations', [3, 6], ['Low', 'Medium', 'High'], True),
+    'Historical Retentions': ('historical_retentions', [3, 6], ['High', 'Medium', 'Low'], True),
+    'Workload Per Teacher': ('workload_per_teacher', [10, 20], ['Low', 'Medium', 'High'], True)
+}
+evidence_discretizer = EvidenceDiscretizer(EVIDENCE_SPEC)
 
 def main():
-    config = {
-        'host': 'localhost',
-        'database': 'workforce',
-        'user': 'root',
-        'password': 'Omamam@010101'
-    }
     try:
-        connection = mysql.connector.connect(**config)
+        connection = get_connection()
         if connection.is_connected():
             cursor = connection.cursor(dictionary=True)
             cursor.execute("SELECT * FROM risk_assessment")
             rows = cursor.fetchall()
-            network = ImprovedRiskAssessmentBayesianNetwork()
+            # RISK_CPD_MODE=learned swaps in CPDs learned from the table (see risk_cpd_learning)
+            from risk_cpd_learning import learned_network_kwargs
+            network = ImprovedRiskAssessmentBayesianNetwork(**learned_network_kwargs('improved'))
             strand_risk_predictions = {}
             strand_counts = {}
-            for row in rows:
-                evidence = map_to_evidence(row)
-                risk_dist = network.predict_risk(evidence)
+            indices = evidence_discretizer.indices(rows, list(PARENT_PRIORS), network.state_index, unobserved=-1)
+            risk_dists = network.predict_risk_batch(indices)
+            for row, risk_dist in zip(rows, risk_dists):
                 risk_list = risk_dist.tolist() if hasattr(risk_dist, 'tolist') else list(risk_dist)
                 strand = row['strand']
                 if strand not in strand_risk_predictions:
@@ -1,9 +1,55 @@
-from pgmpy.models import DiscreteBayesianNetwork
-from pgmpy.factors.discrete import TabularCPD
-from pgmpy.inference import VariableElimination
+import hashlib
+import logging
+import os
+import string
+import tempfile
+
+import numpy as np
+
+from risk_sensitivity import single_variable_changes
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_POSTERIOR_CACHE_DIR = os.environ.get(
+    'RISK_POSTERIOR_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_posteriors')
+)
+# Posterior tables kept in the cache directory; each learned CPD update adds one
+POSTERIOR_CACHE_KEEP = int(os.environ.get('RISK_POSTERIOR_CACHE_KEEP', '4'))
 
 class RiskAssessmentBayesianNetwork:
-    def __init__(self):
+    # Axis order of the compiled posterior tensor
+    EVIDENCE_VARIABLES = ['Student Count', 'Performance', 'Hours per Week', 'Teacher Satisfaction', 'Student Satisfaction']
+    QUERY_VARIABLE = 'Risk Level'
+    # Parents of each variable in CPD evidence order, and the CPD state orders
+    PARENTS = {
+        'Student Count': [],
+        'Performance': ['Student Count'],
+        'Hours per Week': ['Student Count'],
+        'Teacher Satisfaction': ['Student Count'],
+        'Student Satisfaction': ['Student Count'],
+        'Risk Level': ['Performance', 'Hours per Week', 'Teacher Satisfaction', 'Student Satisfaction']
+    }
+    STATE_NAMES = {
+        'Student Count': ['Low', 'Medium', 'High'],
+        'Performance': ['High', 'Medium', 'Low'],
+        'Hours per Week': ['High', 'Medium', 'Low'],
+        'Teacher Satisfaction': ['High', 'Medium', 'Low'],
+        'Student Satisfaction': ['High', 'Medium', 'Low'],
+        'Risk Level': ['High', 'Medium', 'Low']
+    }
+
+    def __init__(self, cache_dir=DEFAULT_POSTERIOR_CACHE_DIR, cpd_values=None):
+        """
+        cpd_values optionally replaces the hand-coded CPDs, e.g. with tables
+        learned by risk_cpd_learning: {variable: (states, parent configurations)}
+        in the PARENTS / STATE_NAMES order, like TabularCPD values.
+        """
+        # pgmpy is slow to import, so load it only when a network is built
+        from pgmpy.models import DiscreteBayesianNetwork
+        from pgmpy.factors.discrete import TabularCPD
+        from pgmpy.inference import VariableElimination
+
         # Define the structure of the Bayesian Network with students_count as Student Count variable
         self.model = DiscreteBayesianNetwork([
             ('Student Count', 'Performance'),
@@ -81,7 +127,16 @@ class RiskAssessmentBayesianNetwork:
                                                  'Teacher Satisfaction': ['High', 'Medium', 'Low'],
                                                  'Student Satisfaction': ['High', 'Medium', 'Low']})
 
-        self.model.add_cpds(cpd_student_count, cpd_performance, cpd_hours, cpd_teacher_satisfaction, cpd_student_satisfaction, cpd_risk_level)
+        cpds = [cpd_student_count, cpd_performance, cpd_hours, cpd_teacher_satisfaction, cpd_student_satisfaction, cpd_risk_level]
+        for i, cpd in enumerate(cpds):
+            if cpd_values and cpd.variable in cpd_values:
+                cpds[i] = TabularCPD(variable=cpd.variable, variable_card=cpd.variable_card,
+                                     values=np.asarray(cpd_values[cpd.variable]).reshape(cpd.variable_card, -1),
+                                     evidence=self.PARENTS[cpd.variable] or None,
+                                     evidence_card=list(cpd.cardinality[1:]) or None,
+                                     state_names={var: self.STATE_NAMES[var] for var in cpd.variables})
+
+        self.model.add_cpds(*cpds)
 
         # Check model correctness
         self.model.check_model()
@@ -89,14 +144,142 @@ class RiskAssessmentBayesianNetwork:
         # Prepare inference engine
         self.infer = VariableElimination(self.model)
 
+        # Every query is answered from a precompiled posterior table (see compile_posteriors)
+        self.state_names = {var: list(self.model.get_cpds(var).state_names[var]) for var in self.EVIDENCE_VARIABLES}
+        self.state_index = {var: {state: i for i, state in enumerate(states)} for var, states in self.state_names.items()}
+        self.cache_dir = cache_dir
+        self.posteriors = self._load_or_compile_posteriors()
+
+    def cpd_hash(self):
+        """
+        Hash of the network's CPDs; the posterior table is cached under it.
+        """
+        digest = hashlib.sha256()
+        for cpd in sorted(self.model.get_cpds(), key=lambda c: c.variable):
+            digest.update(cpd.variable.encode('utf-8'))
+            digest.update(repr(sorted((var, list(states)) for var, states in cpd.state_names.items())).encode('utf-8'))
+            digest.update(repr(cpd.variables).encode('utf-8'))
+            digest.update(np.ascontiguousarray(cpd.values, dtype=np.float64).tobytes())
+        return digest.hexdigest()[:16]
+
+    def compile_posteriors(self):
+        """
+        Return P(Risk Level | evidence) for every evidence combination as a
+        tensor of shape (4, 4, 4, 4, 4, 3), one axis per EVIDENCE_VARIABLES
+        entry. Index 0-2 on an axis is that variable's state; index 3 means the
+        variable is unobserved (marginalized out).
+
+        The network is small enough (3^6 joint states) to build the full joint
+        with einsum and read every posterior off it exactly.
+        """
+        variables = self.EVIDENCE_VARIABLES + [self.QUERY_VARIABLE]
+        letters = dict(zip(variables, string.ascii_lowercase))
+        operands = []
+        subscripts = []
+        for cpd in self.model.get_cpds():
+            factor = cpd.to_factor()
+            # Align each factor's state order with the order used for the tensor axes
+            values = factor.values
+            for axis, var in enumerate(factor.variables):
+                if var in self.state_names:
+                    order = [factor.state_names[var].index(state) for state in self.state_names[var]]
+                    values = np.take(values, order, axis=axis)
+            operands.append(values)
+            subscripts.append(''.join(letters[var] for var in factor.variables))
+        joint = np.einsum(','.join(subscripts) + '->' + ''.join(letters[var] for var in variables), *operands)
+
+        # Append an "unobserved" slot to every evidence axis holding the sum over that axis
+        for axis in range(len(self.EVIDENCE_VARIABLES)):
+            joint = np.concatenate([joint, joint.sum(axis=axis, keepdims=True)], axis=axis)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return joint / joint.sum(axis=-1, keepdims=True)
+
+    def _load_or_compile_posteriors(self):
+        path = os.path.join(self.cache_dir, f'risk_posteriors_{self.cpd_hash()}.npy')
+        try:
+            posteriors = np.load(path)
+            # Mark the table as recently used so pruning keeps it
+            os.utime(path)
+            return posteriors
+        except (OSError, ValueError):
+            pass
+        posteriors = self.compile_posteriors()
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temp file and rename so concurrent runs never read a partial table
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.npy')
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, posteriors)
+            os.replace(tmp_path, path)
+            self._prune_posterior_cache()
+        except OSError as e:
+            logger.warning(f"Could not cache risk posteriors in {self.cache_dir}: {e}")
+        return posteriors
+
+    def _prune_posterior_cache(self, keep=POSTERIOR_CACHE_KEEP):
+        """
+        Delete all but the keep most recently used posterior tables, so
+        superseded learned CPDs do not pile up.
+        """
+        paths = [os.path.join(self.cache_dir, name) for name in os.listdir(self.cache_dir)
+                 if name.startswith('risk_posteriors_') and name.endswith('.npy')]
+        used = []
+        for path in paths:
+            try:
+                used.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        for _, path in sorted(used, reverse=True)[max(keep, 1):]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def evidence_indices(self, evidence_list):
+        """
+        Convert evidence dicts to an (n, 5) array of posterior tensor indices.
+        Variables missing from an evidence dict get the unobserved index 3.
+        """
+        indices = np.full((len(evidence_list), len(self.EVIDENCE_VARIABLES)), 3, dtype=np.intp)
+        for row, evidence in enumerate(evidence_list):
+            for var, state in evidence.items():
+                try:
+                    indices[row, self.EVIDENCE_VARIABLES.index(var)] = self.state_index[var][state]
+                except (ValueError, KeyError):
+                    raise ValueError(f"Unknown evidence {var}={state}")
+        return indices
+
     def predict_risk(self, evidence):
         """
         Predict risk level distribution given evidence.
         Evidence keys: 'Student Count', 'Performance', 'Hours per Week', 'Teacher Satisfaction', 'Student Satisfaction'
         Values should be states like 'Low', 'Medium', 'High' for Student Count and 'High'/'Medium'/'Low' for others.
         """
-        query_result = self.infer.query(variables=['Risk Level'], evidence=evidence)
-        return query_result.values
+        return self.predict_risk_batch([evidence])[0]
+
+    def predict_risk_batch(self, evidence_list):
+        """
+        Predict risk level distributions for many evidence dicts at once.
+        Also accepts an (n, 5) index array from evidence_indices.
+        Returns an (n, 3) array ordered like the Risk Level states.
+        """
+        if isinstance(evidence_list, np.ndarray):
+            indices = evidence_list
+        else:
+            indices = self.evidence_indices(evidence_list)
+        return self.posteriors[tuple(indices.T)]
+
+    def sensitivity(self, indices):
+        """
+        Risk Level distributions for every single-variable change of the
+        evidence, read from the posterior table in one lookup. indices is an
+        (n, 5) array from evidence_indices. Returns (base, shifted): base is
+        (n, 3) and shifted[i, j, s] is row i with EVIDENCE_VARIABLES[j] set
+        to its state s, shape (n, 5, 3, 3).
+        """
+        indices = np.asarray(indices, dtype=np.intp)
+        changed = single_variable_changes(indices, self.posteriors.shape[0] - 1)
+        return self.posteriors[tuple(indices.T)], self.posteriors[tuple(np.moveaxis(changed, -1, 0))]
 
 if __name__ == "__main__":
     network = RiskAssessmentBayesianNetwork()
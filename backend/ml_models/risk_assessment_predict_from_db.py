@@ -1,76 +1,75 @@
-import mysql.connector
 from mysql.connector import Error
+from db_pool import get_connection
 from risk_assessment_pgmpy import RiskAssessmentBayesianNetwork
+from evidence_discretizer import EvidenceDiscretizer
+from risk_sensitivity import strand_sensitivity
 import json
 
-def map_to_evidence(row):
-    """
-    Map database row fields to Bayesian Network evidence keys.
-    Adjust this mapping based on your actual data and variable meanings.
-    """
-    student_count = row.get('students_count', 0)
-    if student_count < 300:
-        student_count_state = 'Low'
-    elif student_count < 600:
-        student_count_state = 'Medium'
-    else:
-        student_count_state = 'High'
+# How each evidence variable is binned from its column: (column, thresholds, labels, right)
+EVIDENCE_SPEC = {
+    'Student Count': ('students_count', [300, 600], ['Low', 'Medium', 'High'], False),
+    'Hours per Week': ('hours_per_week', [20, 40], ['Low', 'Medium', 'High'], False),
+    'Teacher Satisfaction': ('teacher_satisfaction', [50, 85], ['Low', 'Medium', 'High'], False),
+    'Student Satisfaction': ('student_satisfaction', [50, 85], ['Low', 'Medium', 'High'], False)
+}
+evidence_discretizer = EvidenceDiscretizer(EVIDENCE_SPEC)
 
-    hours = row.get('hours_per_week', 0)
-    if hours >= 40:
-        hours_state = 'High'
-    elif hours >= 20:
-        hours_state = 'Medium'
-    else:
-        hours_state = 'Low'
+RISK_ROWS_QUERY = "SELECT strand, students_count, hours_per_week, teacher_satisfaction FROM risk_assessment"
 
-    teacher_sat = row.get('teacher_satisfaction', 0)
-    if teacher_sat >= 85:
-        teacher_satisfaction_state = 'High'
-    elif teacher_sat >= 50:
-        teacher_satisfaction_state = 'Medium'
-    else:
-        teacher_satisfaction_state = 'Low'
+_fixed_network = None
 
-    student_sat = row.get('student_satisfaction', 0)
-    if student_sat >= 85:
-        student_satisfaction_state = 'High'
-    elif student_sat >= 50:
-        student_satisfaction_state = 'Medium'
-    else:
-        student_satisfaction_state = 'Low'
+def get_network():
+    """
+    The risk network; RISK_CPD_MODE=learned swaps in CPDs learned from the
+    table (see risk_cpd_learning). The fixed network is built once per process.
+    """
+    global _fixed_network
+    from risk_cpd_learning import learned_network_kwargs
+    kwargs = learned_network_kwargs('basic')
+    if kwargs:
+        return RiskAssessmentBayesianNetwork(**kwargs)
+    if _fixed_network is None:
+        _fixed_network = RiskAssessmentBayesianNetwork()
+    return _fixed_network
 
-    return {
-        "Student Count": student_count_state,
-        "Hours per Week": hours_state,
-        "Teacher Satisfaction": teacher_satisfaction_state,
-        "Student Satisfaction": student_satisfaction_state
-    }
+def risk_sensitivity(top=None):
+    """
+    Ranked what-if changes of every evidence variable per strand, for the
+    same rows and network the prediction uses.
+    """
+    connection = get_connection()
+    try:
+        cursor = connection.cursor(dictionary=True)
+        cursor.execute(RISK_ROWS_QUERY)
+        rows = cursor.fetchall()
+        cursor.close()
+    finally:
+        connection.close()
 
-def main():
-    # Database connection parameters
-    config = {
-        'host': 'localhost',
-        'database': 'workforce',
-        'user': 'root',
-        'password': 'Omamam@010101'
-    }
+    network = get_network()
+    indices = evidence_discretizer.indices(rows, network.EVIDENCE_VARIABLES, network.state_index, unobserved=3)
+    base, shifted = network.sensitivity(indices)
+    return strand_sensitivity([row['strand'] for row in rows], base, shifted, network.EVIDENCE_VARIABLES,
+                              network.state_names, network.STATE_NAMES[network.QUERY_VARIABLE], top)
 
+def main():
     try:
-        connection = mysql.connector.connect(**config)
+        connection = get_connection()
         if connection.is_connected():
             cursor = connection.cursor(dictionary=True)
-            cursor.execute("SELECT strand, students_count, hours_per_week, teacher_satisfaction FROM risk_assessment")
+            cursor.execute(RISK_ROWS_QUERY)
             rows = cursor.fetchall()
 
-            network = RiskAssessmentBayesianNetwork()
+            network = get_network()
 
             strand_risk_predictions = {}
             strand_counts = {}
 
-            for row in rows:
-                evidence = map_to_evidence(row)
-                risk_dist = network.predict_risk(evidence)
+            # Discretize all rows at once and do one lookup into the precompiled posterior table
+            indices = evidence_discretizer.indices(rows, network.EVIDENCE_VARIABLES, network.state_index, unobserved=3)
+            risk_dists = network.predict_risk_batch(indices)
+
+            for row, risk_dist in zip(rows, risk_dists):
                 # Convert numpy array or other to list for JSON serialization
                 risk_list = risk_dist.tolist() if hasattr(risk_dist, 'tolist') else list(risk_dist)
                 strand = row['strand']
@@ -1,6 +1,8 @@
-import mysql.connector
 from mysql.connector import Error
+from db_pool import get_connection
+import argparse
 import json
+import numpy as np
 
 # Step 1: Identify Key Risk Indicators
 # Teacher Satisfaction (1=Best, 3=Worst)
@@ -97,70 +99,189 @@ def risk_level_from_score(score):
     else:
         return 'High'
 
-def main():
-    config = {
-        'host': 'localhost',
-        'database': 'workforce',
-        'user': 'root',
-        'password': 'Omamam@010101'
+# Batch scoring: the same normalizations and weights applied to whole columns at once
+
+RISK_FACTORS = ['teacher_satisfaction', 'hours_per_week', 'historical_resignations', 'student_satisfaction', 'performance']
+
+def normalize_factors(columns):
+    """
+    Vectorized normalize_* helpers. columns maps each RISK_FACTORS name to an
+    array; returns the 0-10 risk of each factor as float arrays. Results are
+    identical to the scalar functions (same arithmetic, clipped to range);
+    missing (NaN) values stay NaN.
+    """
+    ts = np.asarray(columns['teacher_satisfaction'], dtype=float)
+    hpw = np.asarray(columns['hours_per_week'], dtype=float)
+    hr = np.asarray(columns['historical_resignations'], dtype=float)
+    ss = np.asarray(columns['student_satisfaction'], dtype=float)
+    perf = np.asarray(columns['performance'], dtype=float)
+    return {
+        'teacher_satisfaction': np.select([ts == 1, ts == 2, ts == 3, np.isnan(ts)], [0.0, 5.0, 10.0, np.nan], 10.0),
+        'hours_per_week': np.select([hpw <= 1, hpw <= 1.5, hpw <= 2, np.isnan(hpw)], [0.0, 3.3, 6.6, np.nan], 10.0),
+        'historical_resignations': np.clip((hr - 3) / (7 - 3) * 10, 0, 10),
+        'student_satisfaction': np.clip((0.91 - ss) / (0.91 - 0.7) * 10, 0, 10),
+        'performance': np.clip((90 - perf) / (90 - 73) * 10, 0, 10)
+    }
+
+def calculate_risk_scores(columns):
+    """
+    Vectorized calculate_risk_score over arrays of factor values.
+    """
+    normalized = normalize_factors(columns)
+    return sum(normalized[factor] * weights[factor] for factor in RISK_FACTORS)
+
+def risk_levels_from_scores(scores):
+    """
+    Vectorized risk_level_from_score; None where the score is NaN.
+    """
+    scores = np.asarray(scores, dtype=float)
+    levels = np.select([scores < 3, scores < 6], ['Low', 'Medium'], 'High')
+    return np.where(np.isnan(scores), None, levels)
+
+def load_risk_table(connection, start_year=None, end_year=None):
+    """
+    Read risk_assessment rows (optionally limited to a year range) into
+    column arrays: year, strand and the RISK_FACTORS.
+    """
+    query = f"SELECT year, strand, {', '.join(RISK_FACTORS)} FROM risk_assessment"
+    conditions, params = [], []
+    if start_year is not None:
+        conditions.append("year >= %s")
+        params.append(start_year)
+    if end_year is not None:
+        conditions.append("year <= %s")
+        params.append(end_year)
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    cursor = connection.cursor()
+    cursor.execute(query, params)
+    rows = cursor.fetchall()
+    cursor.close()
+
+    columns = list(zip(*rows)) if rows else [()] * (2 + len(RISK_FACTORS))
+    table = {
+        'year': np.array(columns[0], dtype=int),
+        'strand': np.array(columns[1], dtype=object)
+    }
+    for factor, values in zip(RISK_FACTORS, columns[2:]):
+        # Decimal and None convert directly (None becomes NaN)
+        table[factor] = np.array(values, dtype=float)
+    return table
+
+def risk_score_matrix(table):
+    """
+    Average each factor per (year, strand), as the per-year script does with
+    AVG ... GROUP BY strand, and score every cell in one pass. Like AVG, the
+    averages skip NULL (NaN) values.
+    Returns years, strands and year x strand arrays of scores (NaN where a
+    strand has no data for a year, or none for some factor), levels (None
+    wherever the score is NaN) and the 0-10 risk of each factor.
+    """
+    years, year_idx = np.unique(table['year'], return_inverse=True)
+    strands, strand_idx = np.unique(table['strand'].astype(str), return_inverse=True)
+    cell = year_idx * len(strands) + strand_idx
+    n_cells = len(years) * len(strands)
+
+    averages = {}
+    for factor in RISK_FACTORS:
+        values = np.asarray(table[factor], dtype=float)
+        observed = ~np.isnan(values)
+        sums = np.bincount(cell, weights=np.where(observed, values, 0.0), minlength=n_cells)
+        counts = np.bincount(cell, weights=observed, minlength=n_cells)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # 0 / 0 leaves NaN where a cell has no values for the factor
+            averages[factor] = (sums / counts).reshape(len(years), len(strands))
+    # Same sum as calculate_risk_scores, keeping the per-factor risks for the analysis text
+    factor_risks = normalize_factors(averages)
+    scores = sum(factor_risks[factor] * weights[factor] for factor in RISK_FACTORS)
+    levels = risk_levels_from_scores(scores)
+    return {'years': years, 'strands': strands, 'risk_scores': scores, 'risk_levels': levels,
+            'factor_risks': factor_risks}
+
+# Labels of the factor risks in the analysis text
+FACTOR_LABELS = {
+    'teacher_satisfaction': 'Teacher Satisfaction Risk',
+    'hours_per_week': 'Workload Risk (Hours per Week)',
+    'historical_resignations': 'Retention Risk (Historical Resignations)',
+    'student_satisfaction': 'Student Satisfaction Risk',
+    'performance': 'Performance Risk'
+}
+
+def risk_analysis(strand, score, level, factor_risks):
+    """
+    Automated analysis text for one strand from its score, level and
+    {factor: 0-10 risk}.
+    """
+    analysis = f"Risk Score: {round(score, 2)}. " + ", ".join(
+        f"{FACTOR_LABELS[factor]}: {factor_risks[factor]:.1f}/10" for factor in RISK_FACTORS) + ". "
+    if level == "Low":
+        analysis += f"The {strand} strand shows low overall risk with generally stable metrics."
+    elif level == "Medium":
+        analysis += f"The {strand} strand has moderate risk, indicating some concerns in workload, satisfaction, or performance."
+    else:  # High risk
+        analysis += f"The {strand} strand is at high risk, with significant challenges in workload, retention, and performance."
+    return analysis
+
+def risk_score_history(start_year=None, end_year=None, analysis=False):
+    """
+    Year x strand risk scores and levels for the given year range, ready for JSON.
+    With analysis the year x strand analysis texts are included too (None
+    where a strand has no score).
+    """
+    connection = get_connection()
+    try:
+        table = load_risk_table(connection, start_year, end_year)
+    finally:
+        connection.close()
+    matrix = risk_score_matrix(table)
+    history = {
+        'years': [int(year) for year in matrix['years']],
+        'strands': [str(strand) for strand in matrix['strands']],
+        'risk_scores': [[None if np.isnan(score) else round(float(score), 2) for score in row]
+                        for row in matrix['risk_scores']],
+        'risk_levels': matrix['risk_levels'].tolist()
+    }
+    if analysis:
+        history['analysis'] = [
+            [None if np.isnan(matrix['risk_scores'][y, s]) else
+             risk_analysis(strand, float(matrix['risk_scores'][y, s]), matrix['risk_levels'][y, s],
+                           {factor: float(matrix['factor_risks'][factor][y, s]) for factor in RISK_FACTORS})
+             for s, strand in enumerate(history['strands'])]
+            for y in range(len(history['years']))
+        ]
+    return history
+
+def strand_results(history, year_index):
+    """
+    {strand: {risk_score, risk_level, analysis}} of one year of a history
+    built with analysis=True, skipping strands without a score.
+    """
+    return {
+        strand: {
+            'risk_score': history['risk_scores'][year_index][s],
+            'risk_level': history['risk_levels'][year_index][s],
+            'analysis': history['analysis'][year_index][s]
+        }
+        for s, strand in enumerate(history['strands']) if history['risk_scores'][year_index][s] is not None
     }
+
+def main():
+    parser = argparse.ArgumentParser(description="Weighted risk score and analysis per strand.")
+    parser.add_argument('--start-year', type=int, help="First year to score (default: the latest year)")
+    parser.add_argument('--end-year', type=int, help="Last year to score (default: the latest year)")
+    args = parser.parse_args()
+
     try:
-        connection = mysql.connector.connect(**config)
-        if connection.is_connected():
-            cursor = connection.cursor(dictionary=True)
-            # Get latest year data (2024) per strand
-            cursor.execute("""
-                SELECT strand, AVG(teacher_satisfaction) AS teacher_satisfaction,
-                       AVG(hours_per_week) AS hours_per_week,
-                       AVG(historical_resignations) AS historical_resignations,
-                       AVG(student_satisfaction) AS student_satisfaction,
-                       AVG(performance) AS performance
-                FROM risk_assessment
-                WHERE year = 2024
-                GROUP BY strand
-            """)
-            rows = cursor.fetchall()
-            results = {}
-            for row in rows:
-                risk_score = calculate_risk_score(row)
-                risk_level = risk_level_from_score(risk_score)
-                # Generate detailed automated analysis text based on risk score and normalized factors
-                ts = normalize_teacher_satisfaction(row['teacher_satisfaction'])
-                hpw = normalize_hours_per_week(row['hours_per_week'])
-                hr_val = row['historical_resignations']
-                if isinstance(hr_val, Decimal):
-                    hr_val = float(hr_val)
-                hr = normalize_resignations(hr_val)
-                ss = normalize_student_satisfaction(row['student_satisfaction'])
-                perf = normalize_performance(row['performance'])
-
-                analysis = (
-                    f"Risk Score: {round(risk_score, 2)}. "
-                    f"Teacher Satisfaction Risk: {ts:.1f}/10, "
-                    f"Workload Risk (Hours per Week): {hpw:.1f}/10, "
-                    f"Retention Risk (Historical Resignations): {hr:.1f}/10, "
-                    f"Student Satisfaction Risk: {ss:.1f}/10, "
-                    f"Performance Risk: {perf:.1f}/10. "
-                )
-                if risk_level == "Low":
-                    analysis += f"The {row['strand']} strand shows low overall risk with generally stable metrics."
-                elif risk_level == "Medium":
-                    analysis += f"The {row['strand']} strand has moderate risk, indicating some concerns in workload, satisfaction, or performance."
-                else:  # High risk
-                    analysis += f"The {row['strand']} strand is at high risk, with significant challenges in workload, retention, and performance."
-
-                results[row['strand']] = {
-                    'risk_score': round(risk_score, 2),
-                    'risk_level': risk_level,
-                    'analysis': analysis
-                }
-            print(json.dumps(results, indent=2))
+        history = risk_score_history(args.start_year, args.end_year, analysis=True)
     except Error as e:
         print(f"Error connecting to database: {e}")
-    finally:
-        if connection.is_connected():
-            cursor.close()
-            connection.close()
+        return
+    if args.start_year is None and args.end_year is None:
+        # Latest year data per strand
+        results = strand_results(history, len(history['years']) - 1) if history['years'] else {}
+    else:
+        results = {str(year): strand_results(history, y) for y, year in enumerate(history['years'])}
+    print(json.dumps(results, indent=2))
 
 if __name__ == "__main__":
     main()
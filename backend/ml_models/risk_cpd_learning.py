@@ -0,0 +1,339 @@
+"""
+Learn the risk networks' CPDs from the risk_assessment table.
+
+The sufficient statistics of a discrete Bayesian network are, for every
+variable, the counts of (parent states, own state) over the training rows.
+CPDCounts keeps them as count tensors and saves them together with the id
+of the last row seen and a checksum of the rows counted, so retraining
+after new rows are inserted only reads and counts those rows, while a
+reloaded or edited table is noticed and relearned.
+
+Risk Level is not stored in the table; each row is labeled with the
+weighted risk score level from risk_assessment_weighted_step_by_step.
+
+The improved network's Risk Level has eleven parents, far too many
+configurations to count. It is a noisy-MAX CPD instead, whose per-parent
+effect tables are estimated from pairwise (parent state, Risk Level)
+counts, see noisy_max_effects.
+
+Usage: python risk_cpd_learning.py [basic|improved] [--rebuild]
+"""
+import argparse
+import json
+import logging
+import os
+import tempfile
+
+import numpy as np
+
+from db_pool import get_connection
+from evidence_discretizer import EvidenceDiscretizer
+from risk_assessment_pgmpy import RiskAssessmentBayesianNetwork, DEFAULT_POSTERIOR_CACHE_DIR
+from risk_assessment_predict_from_db import EVIDENCE_SPEC as BASIC_EVIDENCE_SPEC
+from risk_assessment_improved import PARENT_PRIORS, RISK_LEVEL_STATES, EVIDENCE_SPEC as IMPROVED_EVIDENCE_SPEC
+from risk_assessment_weighted_step_by_step import RISK_FACTORS, calculate_risk_scores, risk_levels_from_scores
+
+logger = logging.getLogger(__name__)
+
+LEARNED_CPD_DIR = os.environ.get('RISK_LEARNED_CPD_DIR', DEFAULT_POSTERIOR_CACHE_DIR)
+# Dirichlet pseudo-count added to every cell, so unseen parent configurations stay uniform
+DEFAULT_PSEUDO_COUNT = float(os.environ.get('RISK_CPD_PSEUDO_COUNT', '1'))
+# 'fixed' keeps the hand-coded CPDs, 'learned' updates and uses the learned ones
+RISK_CPD_MODE = os.environ.get('RISK_CPD_MODE', 'fixed')
+
+# Structure, state names and training discretization of each network
+NETWORKS = {
+    'basic': (
+        RiskAssessmentBayesianNetwork.PARENTS,
+        RiskAssessmentBayesianNetwork.STATE_NAMES,
+        # The prediction script leaves Performance unobserved, but training needs it
+        dict(BASIC_EVIDENCE_SPEC, Performance=('performance', [70, 85], ['Low', 'Medium', 'High'], False))
+    ),
+    # A full Risk Level table over 11 parents has far more cells than the table has rows;
+    # Risk Level is counted on its own here and against each parent in PAIRWISE
+    'improved': (
+        dict({var: [] for var in PARENT_PRIORS}, **{'Risk Level': []}),
+        dict({var: states for var, (states, _) in PARENT_PRIORS.items()}, **{'Risk Level': RISK_LEVEL_STATES}),
+        IMPROVED_EVIDENCE_SPEC
+    )
+}
+
+
+# Pairwise counts kept per network: {child: parents counted against it one at a time}
+PAIRWISE = {
+    'basic': {},
+    'improved': {'Risk Level': list(PARENT_PRIORS)}
+}
+
+
+class CPDCounts:
+    """
+    Count tensors of a discrete Bayesian network: counts[var] has shape
+    (parent cardinalities..., var cardinality), parents in the given order.
+    pairwise ({child: [parents]}) adds pair_counts[(parent, child)] of shape
+    (parent cardinality, child cardinality) for each listed pair.
+    """
+
+    def __init__(self, parents, state_names, pseudo_count=DEFAULT_PSEUDO_COUNT, pairwise=None):
+        self.parents = {var: list(var_parents) for var, var_parents in parents.items()}
+        self.state_names = {var: list(states) for var, states in state_names.items()}
+        self.pseudo_count = pseudo_count
+        self.pairwise = {child: list(child_parents) for child, child_parents in (pairwise or {}).items()}
+        self.counts = {var: np.zeros([len(self.state_names[p]) for p in var_parents] + [len(self.state_names[var])])
+                       for var, var_parents in self.parents.items()}
+        self.pair_counts = {(parent, child): np.zeros((len(self.state_names[parent]), len(self.state_names[child])))
+                            for child, child_parents in self.pairwise.items() for parent in child_parents}
+        self.n_rows = 0
+        self.last_id = 0
+        # SUM(CRC32(...)) of the counted rows, see rows_checksum
+        self.checksum = 0
+
+    def update(self, codes):
+        """
+        Add rows given as {variable: int array of state indices, -1 if
+        missing}. Each CPD (and each pair) counts the rows where the
+        variable and all its parents are observed. Costs O(rows added).
+        """
+        n = len(next(iter(codes.values()))) if codes else 0
+        tensors = [(self.counts[var], var_parents + [var]) for var, var_parents in self.parents.items()]
+        tensors += [(counts, list(pair)) for pair, counts in self.pair_counts.items()]
+        for counts, variables in tensors:
+            columns = [np.asarray(codes[v], dtype=np.intp) for v in variables]
+            observed = np.logical_and.reduce([column >= 0 for column in columns])
+            np.add.at(counts, tuple(column[observed] for column in columns), 1)
+        self.n_rows += n
+        return n
+
+    def _normalize(self, counts):
+        counts = counts + self.pseudo_count
+        totals = counts.sum(axis=-1, keepdims=True)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(totals > 0, counts / totals, 1.0 / counts.shape[-1])
+
+    def probabilities(self, var):
+        """
+        P(var | parents) with the same axes as counts[var].
+        """
+        return self._normalize(self.counts[var])
+
+    def pair_probabilities(self, parent, child):
+        """
+        P(child | parent), shape (parent states, child states).
+        """
+        return self._normalize(self.pair_counts[(parent, child)])
+
+    def cpd_values(self):
+        """
+        Every CPD in TabularCPD layout: (states, parent configurations),
+        last parent varying fastest.
+        """
+        return {var: np.moveaxis(self.probabilities(var), -1, 0).reshape(len(self.state_names[var]), -1)
+                for var in self.parents}
+
+    def save(self, path):
+        meta = {'parents': self.parents, 'state_names': self.state_names, 'pseudo_count': self.pseudo_count,
+                'pairwise': self.pairwise, 'n_rows': self.n_rows, 'last_id': self.last_id, 'checksum': self.checksum}
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial model
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.npz')
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, meta=json.dumps(meta), **{f'counts/{var}': counts for var, counts in self.counts.items()},
+                     **{f'pairs/{parent}/{child}': counts for (parent, child), counts in self.pair_counts.items()})
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            learned = cls(meta['parents'], meta['state_names'], meta['pseudo_count'], meta.get('pairwise'))
+            for var in learned.counts:
+                learned.counts[var] = data[f'counts/{var}']
+            for parent, child in learned.pair_counts:
+                learned.pair_counts[(parent, child)] = data[f'pairs/{parent}/{child}']
+        learned.n_rows = meta['n_rows']
+        learned.last_id = meta['last_id']
+        # Counts saved before checksums were kept are relearned once
+        learned.checksum = meta.get('checksum')
+        return learned
+
+def learned_cpd_path(network):
+    return os.path.join(LEARNED_CPD_DIR, f'risk_cpd_counts_{network}.npz')
+
+def load_counts(network, path=None):
+    """
+    Saved counts for the network, or None if there are none (or they were
+    learned for a different structure).
+    """
+    parents, state_names, _ = NETWORKS[network]
+    path = path or learned_cpd_path(network)
+    try:
+        counts = CPDCounts.load(path)
+    except (OSError, ValueError, KeyError) as e:
+        if os.path.exists(path):
+            logger.warning(f"Could not load learned CPDs from {path}: {e}")
+        return None
+    if counts.parents != parents or counts.state_names != state_names or counts.pairwise != PAIRWISE[network]:
+        logger.warning(f"Learned CPDs in {path} do not match the {network} network, ignoring them")
+        return None
+    return counts
+
+def risk_level_codes(rows, states):
+    """
+    Risk Level index of every row from its weighted risk score; -1 where a
+    risk factor is missing.
+    """
+    columns = {factor: EvidenceDiscretizer.to_float([row.get(factor) for row in rows]) for factor in RISK_FACTORS}
+    levels = risk_levels_from_scores(calculate_risk_scores(columns))
+    codes = np.full(len(rows), -1, dtype=np.intp)
+    for i, state in enumerate(states):
+        codes[levels == state] = i
+    if rows:
+        codes[np.logical_or.reduce([np.isnan(values) for values in columns.values()])] = -1
+    return codes
+
+def training_codes(rows, network):
+    """
+    State indices of every network variable for the given table rows.
+    """
+    parents, state_names, spec = NETWORKS[network]
+    variables = [var for var in parents if var != 'Risk Level']
+    state_index = {var: {state: i for i, state in enumerate(states)} for var, states in state_names.items()}
+    indices = EvidenceDiscretizer(spec).indices(rows, variables, state_index, unobserved=-1, missing=True)
+    codes = {var: indices[:, j] for j, var in enumerate(variables)}
+    codes['Risk Level'] = risk_level_codes(rows, state_names['Risk Level'])
+    return codes
+
+def checksum_columns(network):
+    """
+    risk_assessment columns the network's training reads.
+    """
+    _, _, spec = NETWORKS[network]
+    columns = ['id'] + [column for column, *_ in spec.values()] + RISK_FACTORS
+    return list(dict.fromkeys(columns))
+
+def rows_checksum(cursor, network, first_id, last_id):
+    """
+    Row count and SUM(CRC32) of the training columns of the rows with
+    first_id < id <= last_id. The sum is additive over id ranges, so the
+    checksum of all counted rows is kept up to date from the new rows alone.
+    """
+    fields = ', '.join(f"IFNULL(`{column}`, 'NULL')" for column in checksum_columns(network))
+    cursor.execute(f"SELECT COUNT(*), SUM(CRC32(CONCAT_WS('|', {fields}))) FROM risk_assessment "
+                   f"WHERE id > %s AND id <= %s", (first_id, last_id))
+    n_rows, checksum = cursor.fetchone()
+    return int(n_rows), int(checksum or 0)
+
+def update_learned_cpds(network='basic', path=None, rebuild=False):
+    """
+    Bring the saved counts up to date with risk_assessment, reading only rows
+    inserted since the last update. If rows already counted were deleted,
+    edited or replaced (e.g. the table was truncated and reloaded), their
+    checksum no longer matches and the counts are rebuilt from scratch.
+    Returns (counts, rows added).
+    """
+    parents, state_names, _ = NETWORKS[network]
+    path = path or learned_cpd_path(network)
+    counts = None if rebuild else load_counts(network, path)
+    connection = get_connection()
+    try:
+        cursor = connection.cursor()
+        if counts is not None:
+            if rows_checksum(cursor, network, 0, counts.last_id) != (counts.n_rows, counts.checksum):
+                logger.info(f"risk_assessment rows changed since the last update, relearning {network} CPDs")
+                counts = None
+        if counts is None:
+            counts = CPDCounts(parents, state_names, pairwise=PAIRWISE[network])
+
+        dict_cursor = connection.cursor(dictionary=True)
+        dict_cursor.execute("SELECT * FROM risk_assessment WHERE id > %s ORDER BY id", (counts.last_id,))
+        rows = dict_cursor.fetchall()
+        dict_cursor.close()
+        if rows:
+            last_id = int(rows[-1]['id'])
+            _, new_checksum = rows_checksum(cursor, network, counts.last_id, last_id)
+        cursor.close()
+    finally:
+        connection.close()
+
+    added = counts.update(training_codes(rows, network))
+    if rows:
+        counts.last_id = last_id
+        counts.checksum += new_checksum
+    if added or not os.path.exists(path):
+        counts.save(path)
+    logger.info(f"Learned {network} CPDs from {added} new rows ({counts.n_rows} total)")
+    return counts, added
+
+def noisy_max_effects(counts, child='Risk Level'):
+    """
+    Leak and per-parent effect tables of a noisy-MAX CPD for child, from its
+    marginal and its pairwise counts against each parent. Both are returned
+    with the child states from least to most severe, i.e. reversed.
+
+    Under noisy-MAX, P(child <= k | x_i) / P(child <= k) is CDF_i(k | x_i)
+    up to a factor per parent and k. The factor is set so that the parent's
+    first state, its least risky one, has no effect (its CDF is 1), and the
+    leak takes up the rest, so the marginal of the child is matched.
+    Normalizing by a fixed state rather than by the largest ratio keeps the
+    sampling noise of parents the child does not depend on from compounding
+    into the leak.
+    """
+    target_cdf = np.cumsum(counts.probabilities(child)[::-1])
+    effects = {}
+    mean_cdf = np.ones_like(target_cdf)
+    for parent in counts.pairwise[child]:
+        ratio = np.cumsum(counts.pair_probabilities(parent, child)[:, ::-1], axis=1) / target_cdf
+        cdf = np.minimum(np.maximum.accumulate(ratio / ratio[0], axis=1), 1.0)
+        cdf[:, -1] = 1.0
+        effects[parent] = np.diff(cdf, axis=1, prepend=0.0)
+        mean_cdf *= counts.probabilities(parent) @ cdf
+    leak_cdf = np.minimum(np.maximum.accumulate(target_cdf / mean_cdf), 1.0)
+    leak_cdf[-1] = 1.0
+    return np.diff(leak_cdf, prepend=0.0), effects
+
+def network_kwargs(network, counts):
+    """
+    Constructor arguments that make a risk network use the CPDs learned in
+    counts. The improved network's learned Risk Level CPD is noisy-MAX, so
+    it is built with that backend.
+    """
+    values = counts.cpd_values()
+    if network == 'basic':
+        return {'cpd_values': values}
+    leak, effects = noisy_max_effects(counts)
+    return {
+        'cpd_backend': 'noisy_max',
+        'parent_priors': {var: values[var][:, 0] for var in PARENT_PRIORS},
+        'risk_base': leak[::-1],
+        'effects': effects
+    }
+
+def learned_network_kwargs(network):
+    """
+    Constructor arguments that make a risk network use learned CPDs, or {}
+    unless RISK_CPD_MODE is 'learned'. In learned mode the counts are
+    updated from the database first, which only reads new rows.
+    """
+    if RISK_CPD_MODE != 'learned':
+        return {}
+    counts, _ = update_learned_cpds(network)
+    return network_kwargs(network, counts)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('network', nargs='?', choices=sorted(NETWORKS), default='basic')
+    parser.add_argument('--rebuild', action='store_true', help='ignore saved counts and relearn from all rows')
+    args = parser.parse_args()
+
+    counts, added = update_learned_cpds(args.network, rebuild=args.rebuild)
+    print(json.dumps({
+        'network': args.network,
+        'rows_added': added,
+        'rows_total': counts.n_rows,
+        'last_id': counts.last_id,
+        'cpds': {var: values.tolist() for var, values in counts.cpd_values().items()}
+    }))
+
+if __name__ == "__main__":
+    main()
@@ -1,152 +1,256 @@
 import json
 import sys
 import os
-import matplotlib.pyplot as plt
-import seaborn as sns
+import glob
+import hashlib
+import tempfile
 import numpy as np
-from collections import defaultdict
 
-def aggregate_risk_heatmap(risk_data):
+HEATMAP_OUTPUT_DIR = os.environ.get('HEATMAP_OUTPUT_DIR', os.path.join(os.path.dirname(__file__), '../api/uploads'))
+# Rendered heatmaps kept on disk; the least recently used ones are deleted beyond this
+HEATMAP_CACHE_MAX_IMAGES = int(os.environ.get('HEATMAP_CACHE_MAX_IMAGES', '50'))
+
+def heatmap_filename(year, strands, risk_levels):
     """
-    Aggregates detailed risk metrics by strand for the latest year.
-    risk_data: list of dicts with keys including 'Year', 'Strand', 'Risk Level',
-               'hours_per_week', 'performance', 'teacher_satisfaction', 'student_satisfaction'
-    Returns dict with aggregated metrics and heatmap image URLs.
+    Images are named by a hash of what they show, so identical matrices reuse
+    one file and different ones never overwrite each other.
     """
-    if not risk_data:
-        return {}
+    key = json.dumps({'year': year, 'strands': strands, 'risk_levels': risk_levels}, sort_keys=True)
+    return f"risk_heatmap_{hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]}.png"
 
-    # Defensive: filter out items without 'Year' or with empty 'Year'
-    filtered_data = [item for item in risk_data if 'Year' in item and item['Year'] not in (None, '', 'null')]
+def evict_old_heatmaps(output_dir, max_images=HEATMAP_CACHE_MAX_IMAGES):
+    images = glob.glob(os.path.join(output_dir, 'risk_heatmap_*.png'))
+    if len(images) <= max_images:
+        return
+    images.sort(key=lambda path: os.path.getmtime(path))
+    for path in images[:len(images) - max_images]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
 
-    if not filtered_data:
-        return {}
+def render_overall_heatmap(year, strands, overall_risks, overall_risk_levels, overall_colors,
+                           output_dir=HEATMAP_OUTPUT_DIR):
+    """
+    Render the overall strand risk heatmap, or reuse the cached image for the
+    same matrix. Returns the image file name.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    filename = heatmap_filename(year, strands, overall_risk_levels)
+    output_path = os.path.join(output_dir, filename)
+    if os.path.exists(output_path):
+        # Mark as recently used for eviction
+        os.utime(output_path)
+        return filename
+
+    # Plotting libraries are only needed here, so import them on first use (headless backend)
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    import seaborn as sns
+
+    overall_data = np.array([overall_risks])
+    fig = plt.figure(figsize=(len(strands), 1.5))
+    ax = sns.heatmap(overall_data, annot=[overall_risk_levels], fmt='', cmap=sns.color_palette(overall_colors), cbar=False, linewidths=0.5, linecolor='black')
+    ax.set_xticklabels(strands, rotation=45, ha='right', fontsize=12)
+    ax.set_yticklabels([])
+    plt.title(f'Overall Risk Heatmap for Year {year}', fontsize=14)
+    plt.tight_layout()
+
+    # Render to a temp file and rename so concurrent requests never see a partial image
+    fd, tmp_path = tempfile.mkstemp(dir=output_dir, suffix='.png')
+    os.close(fd)
+    fig.savefig(tmp_path)
+    plt.close(fig)
+    os.replace(tmp_path, output_path)
+
+    evict_old_heatmaps(output_dir)
+    return filename
+
+# Define risk priority and colors for overall risk level
+RISK_PRIORITY = {
+    'Extreme': 4,
+    'High': 3,
+    'Medium': 2,
+    'Low': 1,
+    'Unknown': 0
+}
+PRIORITY_LEVELS = {priority: level for level, priority in RISK_PRIORITY.items()}
+RISK_COLORS = {
+    'Extreme': '#FF2D00',  # Dark Red
+    'High': '#FF4E42',     # Red
+    'Medium': '#FFEB3B',   # Yellow
+    'Low': '#81C784',      # Green
+    'Unknown': '#B0BEC5'   # Grey
+}
+
+# Thresholds for burnout and retention risk
+BURNOUT_HOURS_THRESHOLD = 40
+LOW_SATISFACTION_THRESHOLD = 70
+LOW_PERFORMANCE_THRESHOLD = 75
 
-    # Find latest year
-    years = []
-    for item in filtered_data:
+# Per (year, strand) metrics, in cube order
+CUBE_METRICS = ['count', 'average_performance', 'average_teacher_satisfaction', 'average_student_satisfaction',
+                'average_workload', 'high_burnout_proportion', 'retention_risk_proportion', 'max_risk_priority']
+
+def _float_column(values, convert=float):
+    # Fast path for plain numbers (None becomes NaN); convert element-wise only for odd values
+    try:
+        return np.array(values, dtype=float)
+    except (TypeError, ValueError):
+        pass
+    result = np.empty(len(values))
+    for i, value in enumerate(values):
         try:
-            years.append(int(item['Year']))
-        except (ValueError, TypeError):
-            continue
+            result[i] = convert(value)
+        except (TypeError, ValueError):
+            result[i] = np.nan
+    return result
 
-    if not years:
-        return {}
+def _label_codes(values, default):
+    # Labels repeat a lot, so strip each distinct value once
+    codes = {}
+    cleaned = {}
+    result = np.empty(len(values), dtype=np.intp)
+    for i, value in enumerate(values):
+        label = cleaned.get(value)
+        if label is None:
+            label = cleaned[value] = default if value is None else str(value).strip()
+        result[i] = codes.setdefault(label, len(codes))
+    return result, list(codes)
 
-    latest_year = max(years)
+def risk_metric_groups(risk_data):
+    """
+    Compute every strand metric for all years in one grouped NumPy pass.
+    Returns {'year': array, 'strand': list, <CUBE_METRICS>: array}, one entry
+    per (year, strand) group in order of first appearance. Rows without a
+    valid Year are dropped; missing numeric fields count as 0.
+    """
+    risk_data = [item for item in risk_data or [] if isinstance(item, dict)]
+    year = _float_column([item.get('Year') for item in risk_data], convert=int)
+    valid = ~np.isnan(year)
 
-    # Filter data for latest year
-    latest_year_data = [item for item in filtered_data if int(item.get('Year', 0)) == latest_year]
+    def numeric(key):
+        values = _float_column([item.get(key, 0) for item in risk_data])
+        return np.nan_to_num(values, nan=0.0)[valid]
 
-    # Define risk priority and colors for overall risk level
-    risk_priority = {
-        'Extreme': 4,
-        'High': 3,
-        'Medium': 2,
-        'Low': 1,
-        'Unknown': 0
-    }
-    risk_colors = {
-        'Extreme': '#FF2D00',  # Dark Red
-        'High': '#FF4E42',     # Red
-        'Medium': '#FFEB3B',   # Yellow
-        'Low': '#81C784',      # Green
-        'Unknown': '#B0BEC5'   # Grey
-    }
+    strand_codes, strand_names = _label_codes([item.get('Strand', '') for item in risk_data], '')
+    level_codes, level_names = _label_codes([item.get('Risk Level', 'Unknown') for item in risk_data], 'Unknown')
+    level_priority = np.array([RISK_PRIORITY.get(level, 0) for level in level_names], dtype=int)
 
-    # Initialize aggregation containers
-    strand_metrics = defaultdict(lambda: {
-        'count': 0,
-        'high_burnout_count': 0,
-        'performance_sum': 0.0,
-        'teacher_satisfaction_sum': 0.0,
-        'student_satisfaction_sum': 0.0,
-        'workload_sum': 0.0,
-        'retention_risk_count': 0,
-        'max_risk_priority': 0,
-        'max_risk_level': 'Unknown'
-    })
-
-    # Thresholds for burnout and retention risk
-    burnout_hours_threshold = 40
-    low_satisfaction_threshold = 70
-    low_performance_threshold = 75
-
-    for item in latest_year_data:
-        strand = item.get('Strand', '').strip()
-        risk_level = item.get('Risk Level', 'Unknown').strip()
-        hours = float(item.get('hours_per_week', 0))
-        performance = float(item.get('performance', 0))
-        teacher_sat = float(item.get('teacher_satisfaction', 0))
-        student_sat = float(item.get('student_satisfaction', 0))
-
-        metrics = strand_metrics[strand]
-        metrics['count'] += 1
-        metrics['performance_sum'] += performance
-        metrics['teacher_satisfaction_sum'] += teacher_sat
-        metrics['student_satisfaction_sum'] += student_sat
-        metrics['workload_sum'] += hours
+    year = year[valid].astype(np.int64)
+    strand_codes = strand_codes[valid]
+    hours = numeric('hours_per_week')
+    performance = numeric('performance')
+    teacher_sat = numeric('teacher_satisfaction')
+    student_sat = numeric('student_satisfaction')
+    priority = level_priority[level_codes[valid]] if len(level_priority) else np.zeros(0, dtype=int)
 
-        # Burnout risk: high workload and low teacher satisfaction
-        if hours >= burnout_hours_threshold and teacher_sat < low_satisfaction_threshold:
-            metrics['high_burnout_count'] += 1
+    # Group ids numbered in order of first appearance
+    keys = year * max(len(strand_names), 1) + strand_codes
+    unique_keys, first_index, group = np.unique(keys, return_index=True, return_inverse=True)
+    order = np.argsort(first_index)
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    group = rank[group]
+    n_groups = len(unique_keys)
+
+    count = np.bincount(group, minlength=n_groups)
+
+    def mean(values):
+        return np.bincount(group, weights=values, minlength=n_groups) / np.maximum(count, 1)
 
+    low_satisfaction = teacher_sat < LOW_SATISFACTION_THRESHOLD
+    max_priority = np.zeros(n_groups, dtype=int)
+    np.maximum.at(max_priority, group, priority)
+    first_rows = first_index[order]
+    return {
+        'year': year[first_rows],
+        'strand': [strand_names[code] for code in strand_codes[first_rows]],
+        'count': count,
+        'average_performance': mean(performance),
+        'average_teacher_satisfaction': mean(teacher_sat),
+        'average_student_satisfaction': mean(student_sat),
+        'average_workload': mean(hours),
+        # Burnout risk: high workload and low teacher satisfaction
+        'high_burnout_proportion': mean(((hours >= BURNOUT_HOURS_THRESHOLD) & low_satisfaction).astype(float)),
         # Retention risk: low performance and low teacher satisfaction
-        if performance < low_performance_threshold and teacher_sat < low_satisfaction_threshold:
-            metrics['retention_risk_count'] += 1
+        'retention_risk_proportion': mean(((performance < LOW_PERFORMANCE_THRESHOLD) & low_satisfaction).astype(float)),
+        'max_risk_priority': max_priority
+    }
 
-        # Track max risk level priority for overall strand risk
-        current_priority = metrics['max_risk_priority']
-        new_priority = risk_priority.get(risk_level, 0)
-        if new_priority > current_priority:
-            metrics['max_risk_priority'] = new_priority
-            metrics['max_risk_level'] = risk_level
+def aggregate_risk_cube(risk_data):
+    """
+    Year x strand x metric cube of the strand metrics for every year.
+    values[y][s] lists CUBE_METRICS for years[y] and strands[s], or is None
+    when that strand has no rows that year; risk_levels[y][s] is the strand's
+    highest risk level.
+    """
+    groups = risk_metric_groups(risk_data)
+    years = sorted(set(groups['year'].tolist()))
+    strands = sorted(set(groups['strand']))
+    year_pos = {year: i for i, year in enumerate(years)}
+    strand_pos = {strand: i for i, strand in enumerate(strands)}
 
-    # Prepare data for heatmap visualization
-    strands = list(strand_metrics.keys())
-    overall_risks = [metrics['max_risk_priority'] for metrics in strand_metrics.values()]
-    overall_risk_levels = [metrics['max_risk_level'] for metrics in strand_metrics.values()]
-    overall_colors = [risk_colors.get(level, '#B0BEC5') for level in overall_risk_levels]
+    values = [[None] * len(strands) for _ in years]
+    risk_levels = [[None] * len(strands) for _ in years]
+    for g, (year, strand) in enumerate(zip(groups['year'].tolist(), groups['strand'])):
+        y, s = year_pos[year], strand_pos[strand]
+        values[y][s] = [groups[metric][g].item() for metric in CUBE_METRICS]
+        risk_levels[y][s] = PRIORITY_LEVELS[values[y][s][-1]]
+    return {
+        'years': years,
+        'strands': strands,
+        'metrics': CUBE_METRICS,
+        'values': values,
+        'risk_levels': risk_levels
+    }
 
-    # Create heatmap matrix for overall risk
-    overall_data = np.array([overall_risks])
+def aggregate_risk_heatmap(risk_data, render=True):
+    """
+    Aggregates detailed risk metrics by strand for the latest year.
+    risk_data: list of dicts with keys including 'Year', 'Strand', 'Risk Level',
+               'hours_per_week', 'performance', 'teacher_satisfaction', 'student_satisfaction'
+    Returns dict with aggregated metrics, the heatmap matrix and, unless
+    render is False, the heatmap image URL. With render=False the plotting
+    stack is never imported and clients draw the matrix themselves.
+    """
+    groups = risk_metric_groups(risk_data)
+    if not len(groups['year']):
+        return {}
 
-    plt.figure(figsize=(len(strands), 1.5))
-    ax = sns.heatmap(overall_data, annot=overall_risk_levels, fmt='', cmap=sns.color_palette(overall_colors), cbar=False, linewidths=0.5, linecolor='black')
-    ax.set_xticklabels(strands, rotation=45, ha='right', fontsize=12)
-    ax.set_yticklabels([])
-    plt.title(f'Overall Risk Heatmap for Year {latest_year}', fontsize=14)
-    plt.tight_layout()
+    # Metrics of the latest year, strands in order of first appearance
+    latest_year = int(groups['year'].max())
+    latest = np.flatnonzero(groups['year'] == latest_year)
 
-    output_dir = os.path.join(os.path.dirname(__file__), '../api/uploads')
-    os.makedirs(output_dir, exist_ok=True)
-    overall_output_path = os.path.join(output_dir, 'risk_heatmap_overall.png')
-    plt.savefig(overall_output_path)
-    plt.close()
+    # Prepare data for heatmap visualization
+    strands = [groups['strand'][g] for g in latest]
+    overall_risks = [int(groups['max_risk_priority'][g]) for g in latest]
+    overall_risk_levels = [PRIORITY_LEVELS[priority] for priority in overall_risks]
+    overall_colors = [RISK_COLORS.get(level, '#B0BEC5') for level in overall_risk_levels]
+
+    heatmap_image_url = None
+    if render:
+        filename = render_overall_heatmap(latest_year, strands, overall_risks, overall_risk_levels, overall_colors)
+        heatmap_image_url = f'/api/uploads/{filename}'
 
     # Additional heatmaps for detailed risk categories can be generated similarly
     # For brevity, here we return aggregated metrics for each strand
-
-    # Calculate averages and proportions
     detailed_metrics = {}
-    for strand, metrics in strand_metrics.items():
-        count = metrics['count']
-        if count == 0:
-            continue
-        detailed_metrics[strand] = {
-            'average_performance': metrics['performance_sum'] / count,
-            'average_teacher_satisfaction': metrics['teacher_satisfaction_sum'] / count,
-            'average_student_satisfaction': metrics['student_satisfaction_sum'] / count,
-            'average_workload': metrics['workload_sum'] / count,
-            'high_burnout_proportion': metrics['high_burnout_count'] / count,
-            'retention_risk_proportion': metrics['retention_risk_count'] / count,
-            'overall_risk_level': metrics['max_risk_level']
-        }
+    for g, strand, level in zip(latest, strands, overall_risk_levels):
+        detailed_metrics[strand] = {metric: float(groups[metric][g]) for metric in CUBE_METRICS[1:-1]}
+        detailed_metrics[strand]['overall_risk_level'] = level
 
     return {
         'year': latest_year,
         'overall_strand_risk': dict(zip(strands, overall_risk_levels)),
-        'heatmap_image_url': '/api/uploads/risk_heatmap_overall.png',
+        'heatmap_image_url': heatmap_image_url,
+        'heatmap_matrix': {
+            'strands': strands,
+            'risk_priorities': overall_risks,
+            'risk_levels': overall_risk_levels,
+            'colors': overall_colors
+        },
         'detailed_metrics': detailed_metrics
     }
 
@@ -158,7 +262,12 @@ def main():
         print(json.dumps({'error': 'Invalid JSON input'}))
         sys.exit(1)
 
-    result = aggregate_risk_heatmap(risk_data)
+    if '--cube' in sys.argv[1:]:
+        # Every year at once: year x strand x metric
+        result = aggregate_risk_cube(risk_data)
+    else:
+        # --json-only returns the matrix for client-side rendering without plotting
+        result = aggregate_risk_heatmap(risk_data, render='--json-only' not in sys.argv[1:])
     print(json.dumps(result))
 
 if __name__ == "__main__":
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+def single_variable_changes(indices, n_states):
+    """
+    Every single-variable what-if of an (n, k) evidence index array: returns
+    (n, k, n_states, k) where [i, j, s] is row i with variable j set to state s.
+    """
+    indices = np.asarray(indices, dtype=np.intp)
+    n, k = indices.shape
+    changed = np.broadcast_to(indices[:, None, None, :], (n, k, n_states, k)).copy()
+    variables = np.arange(k)
+    changed[:, variables, :, variables] = np.arange(n_states)
+    return changed
+
+def strand_sensitivity(strands, base, shifted, variables, state_names, risk_states, top=None):
+    """
+    Rank what-if changes per strand.
+
+    base (n, risk states) and shifted (n, variables, states, risk states) are
+    per-row distributions from a network's sensitivity(); a strand's risk is
+    the mean over its rows, as in the prediction scripts, and a change sets
+    the variable for every row of the strand. Changes are ranked by shift,
+    the total variation distance from the strand's current distribution.
+    Returns {strand: {'risk': {...}, 'changes': [...]}}, limited to the top
+    changes per strand if given.
+    """
+    names, codes = np.unique(np.asarray(strands, dtype=str), return_inverse=True)
+    counts = np.bincount(codes, minlength=len(names))[:, None]
+    strand_base = np.zeros((len(names),) + base.shape[1:])
+    np.add.at(strand_base, codes, base)
+    strand_base /= counts
+    strand_shifted = np.zeros((len(names),) + shifted.shape[1:])
+    np.add.at(strand_shifted, codes, shifted)
+    strand_shifted /= counts[:, :, None, None]
+
+    deltas = strand_shifted - strand_base[:, None, None, :]
+    shifts = 0.5 * np.abs(deltas).sum(axis=-1)
+    n_states = shifts.shape[2]
+    # Stable sort keeps variable order for ties
+    order = np.argsort(-shifts.reshape(len(names), -1), axis=1, kind='stable')[:, :top]
+
+    result = {}
+    for g, strand in enumerate(names):
+        changes = []
+        for flat in order[g]:
+            j, s = divmod(int(flat), n_states)
+            changes.append({
+                'variable': variables[j],
+                'state': state_names[variables[j]][s],
+                'shift': float(shifts[g, j, s]),
+                'risk': dict(zip(risk_states, strand_shifted[g, j, s].tolist())),
+                'delta': dict(zip(risk_states, deltas[g, j, s].tolist()))
+            })
+        result[str(strand)] = {
+            'risk': dict(zip(risk_states, strand_base[g].tolist())),
+            'changes': changes
+        }
+    return result
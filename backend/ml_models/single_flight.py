@@ -0,0 +1,72 @@
+import hashlib
+import json
+import threading
+
+
+def computation_key(name, *parts):
+    """
+    Build a single-flight key from a computation name and its JSON-serializable inputs.
+    """
+    payload = json.dumps(parts, sort_keys=True, default=str)
+    return f"{name}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key: the first caller runs the
+    computation and everyone who arrives while it is in flight waits for and
+    shares its result (or its exception). Nothing is cached once the call
+    finishes; that is the response cache's job.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'executions': 0, 'coalesced': 0, 'in_flight': 0}
+
+    def do(self, key, fn):
+        """
+        Run fn() once per in-flight key. Returns (result, shared), where shared
+        is True when this caller reused another caller's computation.
+        """
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = _Call()
+                self._calls[key] = call
+                self._stats['executions'] += 1
+                self._stats['in_flight'] += 1
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+                self._stats['in_flight'] -= 1
+            call.done.set()
+        return call.result, False
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
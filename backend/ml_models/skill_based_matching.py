@@ -1,7 +1,16 @@
+import argparse
+import hashlib
+import itertools
 import json
+import logging
 from collections import defaultdict
 import os
-import sys
+
+import numpy as np
+
+from skill_index import SkillIndex
+
+logger = logging.getLogger(__name__)
 
 def load_input_data():
     base_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api', 'temp')
@@ -15,13 +24,93 @@ def load_input_data():
         preferences = json.load(f)
     return teachers, classes, constraints, preferences
 
-def skill_based_matching(teachers, classes, constraints, preferences):
+def skill_scores(teacher_skill_map, teacher_rows, required_skills_per_class, candidates=None):
+    """
+    Score every teacher against every class at once. Teacher skills and
+    proficiencies and class requirements are encoded as sparse matrices over
+    the vocabulary of required skills, so the matched-skill counts and the
+    proficiency sums are two sparse products with the class matrix.
+    teacher_rows gives each teacher's position in teacher_skill_map (teachers
+    sharing an id share the last one's entry). Only the teachers at the
+    sorted positions candidates (all by default) are encoded. Returns a CSC
+    matrix teachers x classes holding the score wherever the teacher shares
+    at least one required skill with the class; a teacher's experience is
+    only read if they match some class.
+    """
+    from scipy.sparse import csc_matrix, csr_matrix
+
+    if candidates is None:
+        candidates = np.arange(len(teacher_rows))
+    # Encode each candidate id once; inverse maps candidates to their row
+    id_rows, inverse = np.unique(teacher_rows[candidates], return_inverse=True)
+
+    vocabulary = {}
+    for required_skills in required_skills_per_class:
+        for skill in required_skills:
+            vocabulary.setdefault(skill, len(vocabulary))
+    all_infos = list(teacher_skill_map.values())
+    infos = [all_infos[row] for row in id_rows.tolist()]
+    skill_cols = [[vocabulary[skill] for skill in info['skills'] if skill in vocabulary] for info in infos]
+    proficiencies = [[(vocabulary[skill], level) for skill, level in info['proficiency_level'].items()
+                      if level and skill in vocabulary] for info in infos]
+    class_cols = [[vocabulary[skill] for skill in required_skills] for required_skills in required_skills_per_class]
+
+    def rows_matrix(rows, values, n_columns):
+        # CSR matrix from per-row column lists (and values)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(row) for row in rows], out=indptr[1:])
+        indices = np.fromiter(itertools.chain.from_iterable(rows), dtype=np.int64, count=indptr[-1])
+        return csr_matrix((values, indices, indptr), shape=(len(rows), n_columns))
+
+    skills = rows_matrix(skill_cols, np.ones(sum(map(len, skill_cols)), dtype=np.int64), len(vocabulary))
+    proficiency = rows_matrix(
+        [[column for column, _ in row] for row in proficiencies],
+        np.fromiter((level for row in proficiencies for _, level in row), dtype=np.int64), len(vocabulary))
+    class_skills = rows_matrix(class_cols, np.ones(sum(map(len, class_cols)), dtype=np.int64), len(vocabulary)).T.tocsr()
+
+    # Scores are kept only where some skill matches, and proficiency only counts there
+    matched = skills @ class_skills
+    scores = (matched + 2 * (proficiency @ class_skills).multiply(matched > 0)).tocsr().astype(float)
+    experience = np.zeros(len(infos))
+    for i in np.flatnonzero(np.diff(matched.indptr)).tolist():
+        experience[i] = infos[i].get('experience', 0) * 0.3
+    scores.data += np.repeat(experience, np.diff(scores.indptr))
+
+    scores = scores[inverse].tocsc()
+    scores.sort_indices()
+    # Back from candidate rows to roster positions (candidates are sorted, so rows stay sorted)
+    return csc_matrix((scores.data, np.asarray(candidates)[scores.indices], scores.indptr),
+                      shape=(len(teacher_rows), len(required_skills_per_class)))
+
+def top_candidates(scores, top_k=None):
+    """
+    Indices of scores from highest to lowest, ties in index order; only the
+    top_k highest if given.
+    """
+    if top_k is not None and top_k < len(scores):
+        if top_k <= 0:
+            return np.zeros(0, dtype=np.intp)
+        threshold = scores[np.argpartition(-scores, top_k - 1)[:top_k]].min()
+        above = np.flatnonzero(scores > threshold)
+        tied = np.flatnonzero(scores == threshold)[:top_k - len(above)]
+        chosen = np.concatenate([above, tied])
+        return chosen[np.argsort(-scores[chosen], kind='stable')]
+    return np.argsort(-scores, kind='stable')
+
+# Kept across calls so an unchanged roster is not re-indexed
+teacher_skill_index = SkillIndex()
+
+def skill_based_matching(teachers, classes, constraints, preferences, top_k=None, skill_index=None,
+                         roster_version=None):
     """
     Match teachers to classes/activities based on skills, certifications, availability, and preferences.
     Returns detailed matching scores and best teacher per class.
+    With top_k only the top_k highest-scoring candidates of each class are
+    scored in detail and considered for assignment.
+    Candidates come from skill_index (teacher_skill_index by default), synced
+    with the roster unless it is already at roster_version.
     """
     assignments = defaultdict(list)  # class_name -> list of assigned teachers
-    teacher_hours = {t['id']: 0 for t in teachers}
     # Ensure max_hours is set to 40 if None
     for t in teachers:
         if t.get('max_hours_per_week') is None:
@@ -68,77 +157,86 @@ def skill_based_matching(teachers, classes, constraints, preferences):
         'ICT': 6
     }
 
-    for cclass in classes:
+    # Combine core_subjects and specialized_subjects for matching
+    required_skills_per_class = [
+        set(s.lower().strip() for s in cclass.get('core_subjects', []) + cclass.get('specialized_subjects', []))
+        for cclass in classes
+    ]
+    # Teachers sharing an id share its teacher_skill_map entry and hours
+    id_row = {teacher_id: i for i, teacher_id in enumerate(teacher_skill_map)}
+    teacher_rows = np.array([id_row[t['id']] for t in teachers], dtype=np.intp)
+    # Only teachers indexed under some required skill are scored
+    if skill_index is None:
+        skill_index = teacher_skill_index
+    # One locked call, so another request syncing a different roster cannot slip in between
+    teacher_skills = {teacher_id: info['skills'] for teacher_id, info in teacher_skill_map.items()}
+    candidate_ids = skill_index.sync_candidates(teacher_skills, set().union(*required_skills_per_class), roster_version)
+    candidates = np.flatnonzero(np.isin(teacher_rows, [id_row[teacher_id] for teacher_id in candidate_ids]))
+    scores = skill_scores(teacher_skill_map, teacher_rows, required_skills_per_class, candidates)
+    teacher_names = np.array([t['name'] for t in teachers], dtype=object)
+    # Only teachers with preferences need checking against each class
+    with_preferences = [i for i, t in enumerate(teachers) if teacher_skill_map[t['id']]['preferences']]
+    hours = np.zeros(len(id_row))
+    max_hours = np.array([info['max_hours'] for info in teacher_skill_map.values()], dtype=float)
+
+    for class_index, cclass in enumerate(classes):
         strand = cclass.get('name')
         if strand is None:
             # Try to get strand from 'strand' key or 'strand_name'
             strand = cclass.get('strand') or cclass.get('strand_name')
-        # Combine core_subjects and specialized_subjects for matching
-        core_subjects = cclass.get('core_subjects', [])
-        specialized_subjects = cclass.get('specialized_subjects', [])
-        required_skills = set(s.lower().strip() for s in core_subjects + specialized_subjects)
         hours_needed = cclass.get('hours_per_week', 0)
         needed_teachers = teachers_needed_per_strand.get(strand, 1)
 
-        # Debug logging
-        print(f"Matching for class: {strand} with required skills: {required_skills} and hours needed: {hours_needed}", file=sys.stderr)
-
-        # Find suitable teachers who meet skill requirements
-        suitable_teachers = []
-        for t in teachers:
-            t_skills = teacher_skill_map[t['id']]['skills']
-            print(f"Checking teacher {t['name']} skills: {t_skills} against required: {required_skills}", file=sys.stderr)
-            if required_skills.intersection(t_skills):
-                # Relax max_hours and availability constraints for testing
-                # if teacher_hours[t['id']] + hours_needed <= teacher_skill_map[t['id']]['max_hours']:
-                #     availability = teacher_skill_map[t['id']]['availability']
-                #     if availability.get('available', True):
-                suitable_teachers.append(t)
-
-        print(f"Suitable teachers for class {strand}: {[t['name'] for t in suitable_teachers]}", file=sys.stderr)
+        # Suitable teachers share at least one required skill
+        start, end = scores.indptr[class_index], scores.indptr[class_index + 1]
+        suitable_teachers = scores.indices[start:end]
+        suitable_scores = scores.data[start:end]
 
         # Apply preferences filtering
-        preferred_teachers = []
-        for t in suitable_teachers:
-            prefs = teacher_skill_map[t['id']]['preferences']
-            preferred_subjects = prefs.get('preferred_subjects', [])
-            preferred_grades = prefs.get('preferred_grades', [])
-            if (not preferred_subjects or cclass.get('subject') in preferred_subjects) and \
-               (not preferred_grades or cclass.get('grade') in preferred_grades):
-                preferred_teachers.append(t)
-
-        print(f"Preferred teachers for class {strand}: {[t['name'] for t in preferred_teachers]}", file=sys.stderr)
-
-        def calculate_score(teacher):
-            score = 0
-            teacher_skills = teacher_skill_map[teacher['id']]['skills']
-            score += len(required_skills.intersection(teacher_skills))
-            proficiency = teacher_skill_map[teacher['id']].get('proficiency_level', {})
-            for skill in required_skills:
-                score += 2 * proficiency.get(skill, 0)
-            score += teacher_skill_map[teacher['id']].get('experience', 0) * 0.3
-            return score
-
-        candidate_teachers = preferred_teachers if preferred_teachers else suitable_teachers
-        scored_candidates = [(t, calculate_score(t)) for t in candidate_teachers]
-        scored_candidates.sort(key=lambda x: x[1], reverse=True)
+        preferred = np.ones(len(suitable_teachers), dtype=bool)
+        if with_preferences:
+            excluded = []
+            for i in with_preferences:
+                prefs = teacher_skill_map[teachers[i]['id']]['preferences']
+                preferred_subjects = prefs.get('preferred_subjects', [])
+                preferred_grades = prefs.get('preferred_grades', [])
+                if not ((not preferred_subjects or cclass.get('subject') in preferred_subjects) and
+                        (not preferred_grades or cclass.get('grade') in preferred_grades)):
+                    excluded.append(i)
+            preferred = ~np.isin(suitable_teachers, excluded)
+
+        if preferred.any():
+            candidate_teachers, candidate_scores = suitable_teachers[preferred], suitable_scores[preferred]
+        else:
+            candidate_teachers, candidate_scores = suitable_teachers, suitable_scores
+        order = top_candidates(candidate_scores, top_k)
+        ranked = candidate_teachers[order]
+        scored_candidates = list(zip(teacher_names[ranked].tolist(), candidate_scores[order].tolist()))
 
         # Assign all qualified teachers to the strand (allow multiple strands per teacher)
-        for t, score in scored_candidates:
-            if teacher_hours[t['id']] + hours_needed <= teacher_skill_map[t['id']]['max_hours']:
-                assignments[strand].append(t['name'])
-                teacher_hours[t['id']] += hours_needed
+        rows = teacher_rows[ranked]
+        if len(np.unique(rows)) == len(rows):
+            fits = hours[rows] + hours_needed <= max_hours[rows]
+            hours[rows[fits]] += hours_needed
+            if fits.any():
+                assignments[strand].extend(teacher_names[ranked[fits]].tolist())
+        else:
+            # Teachers sharing an id share hours, so they are checked in turn
+            for i, row in zip(ranked.tolist(), rows.tolist()):
+                if hours[row] + hours_needed <= max_hours[row]:
+                    assignments[strand].append(teachers[i]['name'])
+                    hours[row] += hours_needed
 
     # Do not convert list of assigned teachers to comma-separated string; keep as list for JSON consistency
     # if assignments[strand]:
     #     assignments[strand] = ', '.join(assignments[strand])
 
-        detailed_scores[strand] = [{'teacher': t['name'], 'score': score} for t, score in scored_candidates]
+        detailed_scores[strand] = [{'teacher': name, 'score': score} for name, score in scored_candidates]
 
         if not assignments[strand]:
             assignments[strand] = "Unassigned"
 
-        print(f"Assigned teachers for class {strand}: {assignments[strand]}", file=sys.stderr)
+        logger.debug(f"Class {strand}: {len(suitable_teachers)} suitable teachers, {len(scored_candidates)} scored")
 
     # Assign unassigned teachers to "Unassigned" strand
     assigned_teacher_ids = set()
@@ -162,30 +260,27 @@ def skill_based_matching(teachers, classes, constraints, preferences):
         for teacher_name in teacher_names_list:
             teacher_strands[teacher_name].append(strand)
 
-    # Fix teacher names by reconstructing full names from teachers list
-    name_map = {}
-    for t in teachers:
-        full_name = t['name']
-        name_map[full_name] = full_name
-
-    fixed_teacher_strands = defaultdict(list)
-    for teacher_name, strands in teacher_strands.items():
-        if teacher_name in name_map:
-            fixed_teacher_strands[teacher_name].extend(strands)
-        else:
-            fixed_teacher_strands[teacher_name].extend(strands)
-
     # Remove duplicates
-    for full_name in fixed_teacher_strands:
-        fixed_teacher_strands[full_name] = list(set(fixed_teacher_strands[full_name]))
+    fixed_teacher_strands = {teacher_name: list(set(strands)) for teacher_name, strands in teacher_strands.items()}
 
     return {
         'assignments': assignments,
         'detailed_scores': detailed_scores,
-        'teacher_strands': dict(fixed_teacher_strands)
+        'teacher_strands': fixed_teacher_strands
     }
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Skill-based matching of teachers to classes')
+    parser.add_argument('--top-k', type=int, help='Only consider the top K candidates per class')
+    args = parser.parse_args()
+
     teachers, classes, constraints, preferences = load_input_data()
-    assignments = skill_based_matching(teachers, classes, constraints, preferences)
+    # The index is saved between runs and re-synced only when the teacher roster changes
+    roster_version = hashlib.sha256(json.dumps(teachers, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    skill_index = SkillIndex.load()
+    indexed_version = skill_index.version
+    assignments = skill_based_matching(teachers, classes, constraints, preferences, top_k=args.top_k,
+                                       skill_index=skill_index, roster_version=roster_version)
+    if indexed_version != roster_version:
+        skill_index.save()
     print(json.dumps(assignments, indent=2))
@@ -0,0 +1,149 @@
+"""
+Inverted index from normalized skill to the ids of the teachers who have it.
+
+The index is synced with a roster once per roster version; only teachers
+who were added, removed or whose skills changed touch their posting lists.
+The teachers who share at least one of a class's required skills are then
+the union of a few posting lists instead of a scan of the whole roster.
+"""
+import json
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Where the skill_based_matching script keeps the index between runs
+SKILL_INDEX_PATH = os.environ.get(
+    'SKILL_INDEX_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'api', 'temp', 'skill_index.json')
+)
+
+
+class SkillIndex:
+    """
+    Posting lists {skill: set of teacher ids} plus each teacher's skills,
+    so a teacher can be re-indexed or dropped without scanning the others.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._skills = {}
+        self._postings = {}
+        # Roster version the index was last synced at (see sync)
+        self.version = None
+
+    def _remove_locked(self, teacher_id):
+        for skill in self._skills.pop(teacher_id, ()):
+            posting = self._postings[skill]
+            posting.discard(teacher_id)
+            if not posting:
+                del self._postings[skill]
+
+    def _add_locked(self, teacher_id, skills):
+        skills = frozenset(skills)
+        old_skills = self._skills.get(teacher_id, frozenset())
+        for skill in old_skills - skills:
+            posting = self._postings[skill]
+            posting.discard(teacher_id)
+            if not posting:
+                del self._postings[skill]
+        for skill in skills - old_skills:
+            self._postings.setdefault(skill, set()).add(teacher_id)
+        self._skills[teacher_id] = skills
+
+    def add(self, teacher_id, skills):
+        """
+        Index a new teacher, or re-index an edited one, with their normalized skills.
+        """
+        with self._lock:
+            self._add_locked(teacher_id, skills)
+
+    def remove(self, teacher_id):
+        with self._lock:
+            self._remove_locked(teacher_id)
+
+    def _sync_locked(self, teacher_skills, version):
+        if version is not None and version == self.version:
+            return 0
+        changed = 0
+        for teacher_id, skills in teacher_skills.items():
+            if self._skills.get(teacher_id) != skills:
+                self._add_locked(teacher_id, skills)
+                changed += 1
+        removed = [teacher_id for teacher_id in self._skills if teacher_id not in teacher_skills]
+        for teacher_id in removed:
+            self._remove_locked(teacher_id)
+        self.version = version
+        if changed or removed:
+            logger.debug(f"Skill index: {changed} teachers indexed, {len(removed)} removed")
+        return changed + len(removed)
+
+    def _candidates_locked(self, skills):
+        result = set()
+        for skill in skills:
+            result.update(self._postings.get(skill, ()))
+        return result
+
+    def sync(self, teacher_skills, version=None):
+        """
+        Bring the index in line with {teacher id: normalized skills}. Nothing
+        is compared if version is given and the index is already at it.
+        Returns the number of teachers added, edited or removed.
+        """
+        with self._lock:
+            return self._sync_locked(teacher_skills, version)
+
+    def candidates(self, skills):
+        """
+        Ids of the teachers having at least one of skills.
+        """
+        with self._lock:
+            return self._candidates_locked(skills)
+
+    def sync_candidates(self, teacher_skills, skills, version=None):
+        """
+        sync followed by candidates under one lock, so a concurrent sync with
+        another roster cannot return teachers that are not in this one.
+        """
+        with self._lock:
+            self._sync_locked(teacher_skills, version)
+            return self._candidates_locked(skills)
+
+    def postings(self, skill):
+        with self._lock:
+            return set(self._postings.get(skill, ()))
+
+    def __len__(self):
+        return len(self._skills)
+
+    def save(self, path=SKILL_INDEX_PATH):
+        with self._lock:
+            data = {
+                'version': self.version,
+                'teachers': [[teacher_id, sorted(skills)] for teacher_id, skills in self._skills.items()]
+            }
+        directory = os.path.dirname(path) or '.'
+        os.makedirs(directory, exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial index
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=SKILL_INDEX_PATH):
+        """
+        The saved index, or an empty one if there is none.
+        """
+        index = cls()
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return index
+        for teacher_id, skills in data['teachers']:
+            index._add_locked(teacher_id, skills)
+        index.version = data['version']
+        return index
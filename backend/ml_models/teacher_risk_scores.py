@@ -0,0 +1,304 @@
+"""
+Per-teacher risk scores with an in-memory top-K index.
+
+Every teacher's latest risk_assessment row is scored with the weighted risk
+model in one vectorized batch, the scores are written to teacher_risk_scores
+(see backend/sql/create_teacher_risk_scores_table.sql) and loaded into a
+TeacherRiskIndex, which answers "top K highest-risk teachers (in a strand)"
+without rescanning and can be updated one teacher at a time. The index also
+records a checksum of every row it was scored from, so after the table
+changes only the teachers whose rows differ are rescored.
+
+Usage: python teacher_risk_scores.py [--top 50] [--strand HUMSS]
+"""
+import argparse
+import bisect
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+from db_pool import get_connection
+from evidence_discretizer import EvidenceDiscretizer
+from risk_assessment_weighted_step_by_step import RISK_FACTORS, calculate_risk_scores, risk_levels_from_scores
+
+logger = logging.getLogger(__name__)
+
+# risk_assessment column identifying the teacher a row belongs to
+TEACHER_COLUMN = os.environ.get('RISK_TEACHER_COLUMN', 'teacher_retention_id')
+
+
+def teacher_key(teacher):
+    """
+    The key a teacher is indexed and stored under: ids come as ints from the
+    database and as strings from request JSON, so both map to the string.
+    """
+    return str(teacher)
+
+
+class TeacherRiskIndex:
+    """
+    Teachers ordered by risk score, overall and per strand. Each order is a
+    sorted list of (-score, teacher) kept with bisect, so top(k) is a slice
+    and updating one teacher is one removal and one insertion. Teachers are
+    held under teacher_key(), along with {row id: checksum} of the
+    risk_assessment rows they were scored from.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._order = []
+        self._strand_order = {}
+        self._rows = {}
+        # Data version the index was last refreshed at (set by refresh_if_stale)
+        self.version = None
+
+    def load(self, entries, rows=None):
+        """
+        Replace the index contents with {teacher: entry} where each entry has
+        at least 'strand' and 'risk_score', scored from rows ({teacher: {row
+        id: checksum}}).
+        """
+        entries = {teacher_key(teacher): entry for teacher, entry in entries.items()}
+        order = sorted((-entry['risk_score'], teacher) for teacher, entry in entries.items())
+        strand_order = {}
+        for key in order:
+            strand_order.setdefault(entries[key[1]]['strand'], []).append(key)
+        with self._lock:
+            self._entries = dict(entries)
+            self._order = order
+            self._strand_order = strand_order
+            self._rows = {teacher_key(teacher): dict(checksums) for teacher, checksums in (rows or {}).items()}
+
+    def _remove_locked(self, teacher):
+        entry = self._entries.pop(teacher, None)
+        if entry is None:
+            return
+        key = (-entry['risk_score'], teacher)
+        for order in (self._order, self._strand_order.get(entry['strand'], [])):
+            i = bisect.bisect_left(order, key)
+            if i < len(order) and order[i] == key:
+                del order[i]
+
+    def update(self, teacher, entry):
+        teacher = teacher_key(teacher)
+        with self._lock:
+            self._remove_locked(teacher)
+            self._entries[teacher] = entry
+            key = (-entry['risk_score'], teacher)
+            bisect.insort(self._order, key)
+            bisect.insort(self._strand_order.setdefault(entry['strand'], []), key)
+
+    def remove(self, teacher):
+        teacher = teacher_key(teacher)
+        with self._lock:
+            self._remove_locked(teacher)
+
+    def cover(self, rows):
+        """
+        Record the rows ({teacher: {row id: checksum}}, empty if none) the
+        given teachers were just scored from.
+        """
+        with self._lock:
+            for teacher, checksums in rows.items():
+                if checksums:
+                    self._rows[teacher_key(teacher)] = dict(checksums)
+                else:
+                    self._rows.pop(teacher_key(teacher), None)
+
+    def changed_teachers(self, rows):
+        """
+        Teachers whose current rows ({teacher: {row id: checksum}} for the
+        whole table) differ from the rows they were scored from.
+        """
+        rows = {teacher_key(teacher): checksums for teacher, checksums in rows.items()}
+        with self._lock:
+            return {teacher for teacher in rows.keys() | self._rows.keys()
+                    if rows.get(teacher) != self._rows.get(teacher)}
+
+    def top(self, k, strand=None):
+        """
+        The k highest-risk teachers, optionally within one strand, highest first.
+        """
+        with self._lock:
+            order = self._order if strand is None else self._strand_order.get(strand, [])
+            return [dict(self._entries[teacher], teacher=teacher) for _, teacher in order[:k]]
+
+    def get(self, teacher):
+        teacher = teacher_key(teacher)
+        with self._lock:
+            entry = self._entries.get(teacher)
+            return None if entry is None else dict(entry, teacher=teacher)
+
+    def __len__(self):
+        return len(self._entries)
+
+def score_rows(rows):
+    """
+    Score each teacher's latest row (rows ordered oldest first).
+    Returns {teacher key: entry}.
+    """
+    latest = {}
+    for row in rows:
+        latest[teacher_key(row[TEACHER_COLUMN])] = row
+    teachers = list(latest)
+    rows = list(latest.values())
+    columns = {factor: EvidenceDiscretizer.to_float([row.get(factor) for row in rows]) for factor in RISK_FACTORS}
+    scores = calculate_risk_scores(columns) if rows else np.zeros(0)
+    levels = risk_levels_from_scores(scores)
+
+    entries = {}
+    for teacher, row, score, level in zip(teachers, rows, scores.tolist(), levels.tolist()):
+        if np.isnan(score):
+            # A risk factor is missing; leave the teacher unscored
+            continue
+        entries[teacher] = {
+            'strand': row.get('strand'),
+            'year': row.get('year'),
+            'risk_score': round(score, 4),
+            'risk_level': level,
+            'row_id': row.get('id')
+        }
+    return entries
+
+def _row_checksum_sql():
+    # CRC32 of every column a teacher's score depends on
+    columns = [TEACHER_COLUMN, 'year', 'strand'] + RISK_FACTORS
+    return "CRC32(CONCAT_WS('|', " + ', '.join(f"IFNULL(`{column}`, 'NULL')" for column in columns) + "))"
+
+def _fetch_rows(connection, teachers=None):
+    cursor = connection.cursor(dictionary=True)
+    query = (f"SELECT id, {TEACHER_COLUMN}, year, strand, {', '.join(RISK_FACTORS)}, "
+             f"{_row_checksum_sql()} AS row_checksum FROM risk_assessment")
+    if teachers is None:
+        cursor.execute(query + f" WHERE {TEACHER_COLUMN} IS NOT NULL ORDER BY year, id")
+    else:
+        placeholders = ', '.join(['%s'] * len(teachers))
+        cursor.execute(query + f" WHERE {TEACHER_COLUMN} IN ({placeholders}) ORDER BY year, id", list(teachers))
+    rows = cursor.fetchall()
+    cursor.close()
+    return rows
+
+def _row_checksums(rows):
+    # {teacher: {row id: checksum}} of (teacher, row id, checksum) rows
+    checksums = {}
+    for teacher, row_id, checksum in rows:
+        checksums.setdefault(teacher_key(teacher), {})[int(row_id)] = int(checksum)
+    return checksums
+
+def _fetch_row_checksums(connection):
+    cursor = connection.cursor()
+    cursor.execute(f"SELECT {TEACHER_COLUMN}, id, {_row_checksum_sql()} FROM risk_assessment "
+                   f"WHERE {TEACHER_COLUMN} IS NOT NULL")
+    checksums = _row_checksums(cursor.fetchall())
+    cursor.close()
+    return checksums
+
+def _upsert_scores(cursor, entries):
+    cursor.executemany(
+        "INSERT INTO teacher_risk_scores (teacher_key, strand, year, risk_score, risk_level, source_row_id) "
+        "VALUES (%s, %s, %s, %s, %s, %s) "
+        "ON DUPLICATE KEY UPDATE strand = VALUES(strand), year = VALUES(year), risk_score = VALUES(risk_score), "
+        "risk_level = VALUES(risk_level), source_row_id = VALUES(source_row_id)",
+        [(teacher, e['strand'], e['year'], e['risk_score'], e['risk_level'], e['row_id'])
+         for teacher, e in entries.items()])
+
+def refresh_all(index):
+    """
+    Rescore every teacher, rewrite teacher_risk_scores and reload the index.
+    Returns the number of teachers scored.
+    """
+    connection = get_connection()
+    try:
+        rows = _fetch_rows(connection)
+        entries = score_rows(rows)
+        cursor = connection.cursor()
+        cursor.execute("DELETE FROM teacher_risk_scores")
+        if entries:
+            _upsert_scores(cursor, entries)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    index.load(entries, _row_checksums((row[TEACHER_COLUMN], row['id'], row['row_checksum']) for row in rows))
+    logger.info(f"Scored risk for {len(entries)} teachers")
+    return len(entries)
+
+def refresh_teachers(index, teachers):
+    """
+    Rescore the given teachers after their risk_assessment rows changed.
+    Returns {teacher key: new entry, or None if the teacher no longer has a
+    scorable row}.
+    """
+    teachers = list(dict.fromkeys(teacher_key(teacher) for teacher in teachers))
+    if not teachers:
+        return {}
+    connection = get_connection()
+    try:
+        rows = _fetch_rows(connection, teachers)
+        scored = score_rows(rows)
+        entries = {teacher: scored.get(teacher) for teacher in teachers}
+        cursor = connection.cursor()
+        unscored = [(teacher,) for teacher, entry in entries.items() if entry is None]
+        if unscored:
+            cursor.executemany("DELETE FROM teacher_risk_scores WHERE teacher_key = %s", unscored)
+        if scored:
+            _upsert_scores(cursor, scored)
+        connection.commit()
+        cursor.close()
+    finally:
+        connection.close()
+    for teacher, entry in entries.items():
+        if entry is None:
+            index.remove(teacher)
+        else:
+            index.update(teacher, entry)
+    checksums = _row_checksums((row[TEACHER_COLUMN], row['id'], row['row_checksum']) for row in rows)
+    index.cover({teacher: checksums.get(teacher, {}) for teacher in teachers})
+    return entries
+
+def refresh_teacher(index, teacher):
+    """
+    Rescore one teacher after their risk_assessment rows changed. Returns
+    the new entry, or None if the teacher no longer has a scorable row.
+    """
+    return refresh_teachers(index, [teacher])[teacher_key(teacher)]
+
+def refresh_if_stale(index, version):
+    """
+    Bring the index up to date if the risk_assessment data version moved
+    since it was last refreshed. Row checksums are compared against the rows
+    the index was scored from, and only teachers whose rows changed are
+    rescored (everyone when that is most of the index, or on first use).
+    """
+    if index.version == version:
+        return
+    if index.version is not None:
+        connection = get_connection()
+        try:
+            changed = index.changed_teachers(_fetch_row_checksums(connection))
+        finally:
+            connection.close()
+        if len(changed) <= len(index) // 2:
+            refresh_teachers(index, changed)
+            logger.info(f"Rescored risk for {len(changed)} changed teachers")
+            index.version = version
+            return
+    refresh_all(index)
+    index.version = version
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--top', type=int, default=50)
+    parser.add_argument('--strand')
+    args = parser.parse_args()
+
+    index = TeacherRiskIndex()
+    refresh_all(index)
+    print(json.dumps(index.top(args.top, args.strand), default=str))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+# Weight of one matching specialized subject. Core subjects are shared by every strand, so they
+# only break ties between a strand's members: all of a strand's core subjects at Expert add
+# CORE_SUBJECT_WEIGHT in total, less than one proficiency step on a specialized subject
+SPECIALIZED_SUBJECT_WEIGHT = 1.0
+CORE_SUBJECT_WEIGHT = 0.2
+# Bonus per certification naming the strand or one of its specialized subjects
+CERTIFICATION_WEIGHT = 0.5
+# Proficiency multiplies a subject's weight; unknown proficiency counts as Intermediate
+PROFICIENCY_MULTIPLIER = {
+    'Beginner': 0.5,
+    'Intermediate': 1.0,
+    'Advanced': 1.5,
+    'Expert': 2.0
+}
+
+
+def proficiency_multiplier(level):
+    # Levels come as names or as their 1-4 rank
+    if isinstance(level, (int, float)) and not isinstance(level, bool):
+        return max(0.0, min(float(level), 4.0)) / 2
+    return PROFICIENCY_MULTIPLIER.get(level, 1.0)
+
+def teacher_name(teacher):
+    return teacher.get('name') or teacher.get('full_name')
+
+def _as_list(value):
+    # The database returns GROUP_CONCAT strings; JSON inputs use lists
+    if not value:
+        return []
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return [str(item).strip() for item in value]
+
+def skill_profile(teacher):
+    """
+    The fields a teacher's strand scores depend on, normalized.
+    """
+    proficiency = teacher.get('proficiency_levels')
+    return {
+        'subjects': sorted({s.lower() for s in _as_list(teacher.get('subjects_expertise')) + _as_list(teacher.get('skills'))}),
+        'certifications': sorted({c.lower() for c in _as_list(teacher.get('teaching_certifications') or teacher.get('certifications'))}),
+        'proficiency': {str(k).strip().lower(): v for k, v in proficiency.items()} if isinstance(proficiency, dict) else {}
+    }
+
+def has_skill_data(teachers):
+    for teacher in teachers:
+        profile = skill_profile(teacher)
+        if profile['subjects'] or profile['certifications']:
+            return True
+    return False
+
+
+class StrandScoreMatrix:
+    """
+    Sparse teacher x strand skill-match scores computed from each teacher's
+    subjects_expertise (or skills), proficiency_levels and certifications
+    against the strands' core and specialized subjects.
+
+    update(teachers) rescores only teachers whose skill fields changed,
+    drops those no longer on the roster and returns per-strand
+    {teacher: score} dicts (O(1) lookups); matrix() gives the CSR matrix.
+    """
+
+    def __init__(self, strand_parameters):
+        self.strands = list(strand_parameters)
+        self._subjects = []
+        for strand in self.strands:
+            params = strand_parameters[strand]
+            self._subjects.append((
+                [s.lower() for s in params.get('specialized_subjects', [])],
+                [s.lower() for s in params.get('core_subjects', [])]
+            ))
+        self._lock = threading.Lock()
+        self._rows = {}
+        self._fingerprints = {}
+        self._scores = None
+        self._matrix = None
+        self.rescored = 0
+
+    def score_teacher(self, profile):
+        """
+        Scores of one teacher (a skill_profile) for every strand. A teacher
+        belongs to (scores above zero in) only the strands where they match a
+        specialized subject.
+        """
+        subjects = set(profile['subjects'])
+        proficiency = profile['proficiency']
+        row = np.zeros(len(self.strands))
+        for j, (specialized, core) in enumerate(self._subjects):
+            row[j] = SPECIALIZED_SUBJECT_WEIGHT * sum(proficiency_multiplier(proficiency.get(subject))
+                                                      for subject in specialized if subject in subjects)
+            if row[j] == 0:
+                continue
+            keywords = [self.strands[j].lower()] + specialized
+            row[j] += CERTIFICATION_WEIGHT * sum(1 for cert in profile['certifications']
+                                                 if any(keyword in cert for keyword in keywords))
+            if core:
+                row[j] += CORE_SUBJECT_WEIGHT * sum(proficiency_multiplier(proficiency.get(subject))
+                                                    for subject in core if subject in subjects) / (2.0 * len(core))
+        return np.round(row, 2)
+
+    def update(self, teachers):
+        """
+        Sync with the roster and return its scores as scores() would. Both
+        happen under one lock, so concurrent callers with different rosters
+        each get the scores of their own roster.
+        """
+        with self._lock:
+            rescored = 0
+            seen = set()
+            for teacher in teachers:
+                name = teacher_name(teacher)
+                if name is None or name in seen:
+                    continue
+                seen.add(name)
+                profile = skill_profile(teacher)
+                fingerprint = hashlib.sha256(json.dumps(profile, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+                if self._fingerprints.get(name) != fingerprint:
+                    self._rows[name] = self.score_teacher(profile)
+                    self._fingerprints[name] = fingerprint
+                    rescored += 1
+            removed = [name for name in self._rows if name not in seen]
+            for name in removed:
+                del self._rows[name]
+                del self._fingerprints[name]
+            if rescored or removed:
+                self._scores = None
+                self._matrix = None
+            self.rescored += rescored
+            return self._scores_locked()
+
+    def _scores_locked(self):
+        # Rebuilt rather than modified, so a returned dict never changes under its holder
+        if self._scores is None:
+            scores = {strand: {} for strand in self.strands}
+            for name, row in self._rows.items():
+                for j in np.flatnonzero(row):
+                    scores[self.strands[j]][name] = float(row[j])
+            self._scores = scores
+        return self._scores
+
+    def scores(self):
+        """
+        {strand: {teacher: score}} for every non-zero score, in roster order,
+        shaped like SKILL_BASED_MATCHING_SCORES.
+        """
+        with self._lock:
+            return self._scores_locked()
+
+    def matrix(self):
+        """
+        (teacher names, scipy.sparse CSR matrix of teachers x self.strands).
+        """
+        from scipy.sparse import csr_matrix
+
+        with self._lock:
+            if self._matrix is None:
+                names = list(self._rows)
+                dense = np.array([self._rows[name] for name in names]).reshape(len(names), len(self.strands))
+                self._matrix = (names, csr_matrix(dense))
+            return self._matrix
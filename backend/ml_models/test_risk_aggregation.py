@@ -0,0 +1,171 @@
+import math
+import random
+
+import numpy as np
+
+import risk_assessment_weighted_step_by_step as weighted
+from risk_assessment_weighted_step_by_step import (RISK_FACTORS, calculate_risk_score, risk_level_from_score,
+                                                    risk_levels_from_scores, risk_score_matrix)
+from risk_heatmap_aggregation import CUBE_METRICS, PRIORITY_LEVELS, RISK_PRIORITY, aggregate_risk_cube
+
+STRANDS = ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']
+LEVELS = ['Low', 'Medium', 'High', 'Extreme', 'Unknown']
+
+def random_factor(rng, factor):
+    if rng.random() < 0.15:
+        return None
+    return {
+        'teacher_satisfaction': lambda: rng.choice([1, 2, 3]),
+        'hours_per_week': lambda: rng.choice([1, 1.5, 2, 2.5]),
+        'historical_resignations': lambda: rng.uniform(0, 10),
+        'student_satisfaction': lambda: rng.uniform(0.6, 1),
+        'performance': lambda: rng.uniform(60, 100)
+    }[factor]()
+
+def sql_avg_baseline(rows, year, strand):
+    # AVG(...) GROUP BY strand for one year: NULLs are skipped, all-NULL gives NULL
+    group = [row for row in rows if row['year'] == year and row['strand'] == strand]
+    if not group:
+        return None, None
+    averages = {}
+    for factor in RISK_FACTORS:
+        values = [row[factor] for row in group if row[factor] is not None]
+        averages[factor] = sum(values) / len(values) if values else None
+    if any(value is None for value in averages.values()):
+        return None, None
+    score = calculate_risk_score(averages)
+    return score, risk_level_from_score(score)
+
+def test_risk_score_matrix_matches_sql_avg():
+    rng = random.Random(0)
+    rows = [dict({'year': rng.randint(2019, 2024), 'strand': rng.choice(STRANDS)},
+                 **{factor: random_factor(rng, factor) for factor in RISK_FACTORS})
+            for _ in range(120)]
+    # A strand whose hours are never recorded in one year
+    rows += [{'year': 2024, 'strand': 'TVL', 'teacher_satisfaction': 2, 'hours_per_week': None,
+              'historical_resignations': 4.0, 'student_satisfaction': 0.8, 'performance': 80.0}]
+    table = {'year': np.array([row['year'] for row in rows]),
+             'strand': np.array([row['strand'] for row in rows], dtype=object)}
+    for factor in RISK_FACTORS:
+        table[factor] = np.array([row[factor] for row in rows], dtype=float)
+
+    matrix = risk_score_matrix(table)
+    for y, year in enumerate(matrix['years'].tolist()):
+        for s, strand in enumerate(matrix['strands'].tolist()):
+            score, level = sql_avg_baseline(rows, year, strand)
+            if score is None:
+                assert np.isnan(matrix['risk_scores'][y, s]), (year, strand)
+            else:
+                assert math.isclose(matrix['risk_scores'][y, s], score, abs_tol=1e-9), (year, strand)
+            assert matrix['risk_levels'][y, s] == level, (year, strand)
+    assert matrix['risk_levels'][list(matrix['years']).index(2024), list(matrix['strands']).index('TVL')] is None
+
+def scalar_analysis(strand, averages):
+    # The text the script used to build from one AVG ... GROUP BY strand row
+    score = calculate_risk_score(averages)
+    level = risk_level_from_score(score)
+    text = (f"Risk Score: {round(score, 2)}. "
+            f"Teacher Satisfaction Risk: {weighted.normalize_teacher_satisfaction(averages['teacher_satisfaction']):.1f}/10, "
+            f"Workload Risk (Hours per Week): {weighted.normalize_hours_per_week(averages['hours_per_week']):.1f}/10, "
+            f"Retention Risk (Historical Resignations): {weighted.normalize_resignations(averages['historical_resignations']):.1f}/10, "
+            f"Student Satisfaction Risk: {weighted.normalize_student_satisfaction(averages['student_satisfaction']):.1f}/10, "
+            f"Performance Risk: {weighted.normalize_performance(averages['performance']):.1f}/10. ")
+    return level, text
+
+def test_history_analysis_matches_scalar_text():
+    rng = random.Random(2)
+    rows = [(rng.choice([2023, 2024]), rng.choice(STRANDS), rng.choice([1, 2, 3]), rng.choice([1, 1.5, 2, 2.5]),
+             rng.uniform(0, 10), rng.uniform(0.6, 1), rng.uniform(60, 100)) for _ in range(80)]
+
+    class Cursor:
+        def execute(self, query, params):
+            self.rows = [row for row in rows if all(row[0] >= p for p in params[:1])] if params else rows
+        def fetchall(self):
+            return self.rows
+        def close(self):
+            pass
+
+    class Connection:
+        def cursor(self):
+            return Cursor()
+        def close(self):
+            pass
+
+    get_connection = weighted.get_connection
+    weighted.get_connection = Connection
+    try:
+        history = weighted.risk_score_history(2024, None, analysis=True)
+    finally:
+        weighted.get_connection = get_connection
+    results = weighted.strand_results(history, 0)
+    assert history['years'] == [2024] and set(results) == {row[1] for row in rows if row[0] == 2024}
+    for strand, result in results.items():
+        group = [row for row in rows if row[0] == 2024 and row[1] == strand]
+        averages = {factor: sum(row[2 + i] for row in group) / len(group) for i, factor in enumerate(RISK_FACTORS)}
+        level, text = scalar_analysis(strand, averages)
+        assert result['risk_level'] == level
+        assert result['analysis'].startswith(text), (result['analysis'], text)
+        assert result['risk_score'] == round(calculate_risk_score(averages), 2)
+
+def test_risk_levels_from_scores_skips_nan():
+    levels = risk_levels_from_scores(np.array([1.0, 4.0, 8.0, np.nan]))
+    assert levels.tolist() == ['Low', 'Medium', 'High', None]
+
+def cube_baseline(risk_data):
+    # Per-row loop of the original heatmap aggregation, for every year
+    cells = {}
+    for item in risk_data:
+        try:
+            year = int(item['Year'])
+        except (KeyError, TypeError, ValueError):
+            continue
+        hours = float(item.get('hours_per_week', 0))
+        performance = float(item.get('performance', 0))
+        teacher_sat = float(item.get('teacher_satisfaction', 0))
+        student_sat = float(item.get('student_satisfaction', 0))
+        m = cells.setdefault((year, item.get('Strand', '').strip()), {
+            'count': 0, 'performance': 0.0, 'teacher_sat': 0.0, 'student_sat': 0.0, 'hours': 0.0,
+            'burnout': 0, 'retention': 0, 'priority': 0})
+        m['count'] += 1
+        m['performance'] += performance
+        m['teacher_sat'] += teacher_sat
+        m['student_sat'] += student_sat
+        m['hours'] += hours
+        m['burnout'] += hours >= 40 and teacher_sat < 70
+        m['retention'] += performance < 75 and teacher_sat < 70
+        m['priority'] = max(m['priority'], RISK_PRIORITY.get(item.get('Risk Level', 'Unknown').strip(), 0))
+    return {key: [m['count'], m['performance'] / m['count'], m['teacher_sat'] / m['count'],
+                  m['student_sat'] / m['count'], m['hours'] / m['count'], m['burnout'] / m['count'],
+                  m['retention'] / m['count'], m['priority']]
+            for key, m in cells.items()}
+
+def test_aggregate_risk_cube_matches_row_loop():
+    rng = random.Random(1)
+    risk_data = [{'Year': str(rng.randint(2020, 2024)), 'Strand': rng.choice(STRANDS) + rng.choice(['', ' ']),
+                  'Risk Level': rng.choice(LEVELS), 'hours_per_week': rng.uniform(20, 50),
+                  'performance': rng.uniform(60, 100), 'teacher_satisfaction': rng.uniform(50, 95),
+                  'student_satisfaction': rng.uniform(50, 95)}
+                 for _ in range(300)]
+    risk_data.append({'Year': None, 'Strand': 'STEM'})
+
+    cube = aggregate_risk_cube(risk_data)
+    expected = cube_baseline(risk_data)
+    assert cube['metrics'] == CUBE_METRICS
+    seen = 0
+    for y, year in enumerate(cube['years']):
+        for s, strand in enumerate(cube['strands']):
+            values = cube['values'][y][s]
+            if (year, strand) not in expected:
+                assert values is None and cube['risk_levels'][y][s] is None
+                continue
+            seen += 1
+            assert np.allclose(values, expected[(year, strand)]), (year, strand)
+            assert cube['risk_levels'][y][s] == PRIORITY_LEVELS[expected[(year, strand)][-1]]
+    assert seen == len(expected)
+
+if __name__ == "__main__":
+    test_risk_score_matrix_matches_sql_avg()
+    test_history_analysis_matches_scalar_text()
+    test_risk_levels_from_scores_skips_nan()
+    test_aggregate_risk_cube_matches_row_loop()
+    print("Risk aggregation tests passed.")
@@ -0,0 +1,61 @@
+import os
+import tempfile
+
+import numpy as np
+
+from risk_assessment_improved import PARENT_PRIORS, RISK_LEVEL_STATES, ImprovedRiskAssessmentBayesianNetwork
+from risk_cpd_learning import NETWORKS, PAIRWISE, CPDCounts, network_kwargs
+
+def sample_codes(n, seed=0):
+    # Risk Level driven by Hours per Week and Performance; the other parents are noise
+    rng = np.random.default_rng(seed)
+    codes = {var: rng.integers(0, 3, n) for var in PARENT_PRIORS}
+    hours = codes['Hours per Week']             # Low, Medium, High
+    performance = codes['Performance']          # High, Medium, Low
+    severity = np.maximum(hours, performance)   # 0 = least risky
+    noise = rng.random(n) < 0.1
+    severity = np.where(noise, rng.integers(0, 3, n), severity)
+    # Risk Level codes index RISK_LEVEL_STATES (High, Medium, Low)
+    codes['Risk Level'] = 2 - severity
+    return codes
+
+def new_counts():
+    parents, state_names, _ = NETWORKS['improved']
+    return CPDCounts(parents, state_names, pairwise=PAIRWISE['improved'])
+
+def test_learned_effects_follow_evidence():
+    counts = new_counts()
+    counts.update(sample_codes(5000))
+    network = ImprovedRiskAssessmentBayesianNetwork(**network_kwargs('improved', counts))
+    high = RISK_LEVEL_STATES.index('High')
+    calm = network.predict_risk({'Hours per Week': 'Low', 'Performance': 'High'})
+    busy = network.predict_risk({'Hours per Week': 'High'})
+    failing = network.predict_risk({'Hours per Week': 'High', 'Performance': 'Low'})
+    assert calm[high] < 0.2 < busy[high], (calm, busy)
+    assert failing[high] > 0.8, failing
+    # A parent the data does not depend on barely moves the posterior
+    noise = [network.predict_risk({'Students Count': state}) for state in PARENT_PRIORS['Students Count'][0]]
+    assert np.abs(np.diff(noise, axis=0)).max() < 0.05, noise
+    assert np.allclose(calm.sum(), 1) and np.allclose(failing.sum(), 1)
+
+def test_incremental_counts_match_full_counts():
+    codes = sample_codes(3000, seed=1)
+    full = new_counts()
+    full.update(codes)
+    incremental = new_counts()
+    incremental.update({var: values[:1000] for var, values in codes.items()})
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'counts.npz')
+        incremental.save(path)
+        incremental = CPDCounts.load(path)
+    incremental.update({var: values[1000:] for var, values in codes.items()})
+    expected = network_kwargs('improved', full)
+    learned = network_kwargs('improved', incremental)
+    assert np.allclose(expected['risk_base'], learned['risk_base'])
+    for parent in PARENT_PRIORS:
+        assert np.allclose(expected['effects'][parent], learned['effects'][parent])
+
+if __name__ == "__main__":
+    test_learned_effects_follow_evidence()
+    test_incremental_counts_match_full_counts()
+    print("Risk CPD learning tests passed.")
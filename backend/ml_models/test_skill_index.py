@@ -0,0 +1,55 @@
+import json
+import threading
+
+from skill_based_matching import skill_based_matching
+from skill_index import SkillIndex
+
+CLASSES = [
+    {'name': 'STEM', 'core_subjects': ['General Mathematics'], 'specialized_subjects': ['Basic Calculus']},
+    {'name': 'ABM', 'core_subjects': ['Oral Communication'], 'specialized_subjects': ['Business Finance']}
+]
+ROSTER_A = [
+    {'id': 'a1', 'name': 'Ana Cruz', 'skills': ['General Mathematics', 'Basic Calculus']},
+    {'id': 'a2', 'name': 'Ben Reyes', 'skills': ['Oral Communication']}
+]
+ROSTER_B = [
+    {'id': 'b1', 'name': 'Dan Lim', 'skills': ['Business Finance', 'Oral Communication']},
+    {'id': 'b2', 'name': 'Ella Tan', 'skills': ['Basic Calculus']}
+]
+
+def run(roster, skill_index=None):
+    teachers = [dict(t) for t in roster]
+    return json.dumps(skill_based_matching(teachers, CLASSES, [], [], skill_index=skill_index), sort_keys=True)
+
+def test_sync_candidates():
+    index = SkillIndex()
+    assert index.sync_candidates({'a1': {'math'}, 'a2': {'english'}}, {'math'}) == {'a1'}
+    assert index.sync_candidates({'b1': {'math'}}, {'math', 'english'}, version='v2') == {'b1'}
+    assert index.version == 'v2' and len(index) == 1
+
+def test_alternating_rosters_on_shared_index():
+    expected = {id(roster): run(roster, SkillIndex()) for roster in (ROSTER_A, ROSTER_B)}
+    shared = SkillIndex()
+    errors = []
+
+    def worker(roster):
+        for _ in range(200):
+            try:
+                output = run(roster, shared)
+            except KeyError as e:
+                errors.append(f"KeyError {e}")
+                continue
+            if output != expected[id(roster)]:
+                errors.append(output)
+
+    threads = [threading.Thread(target=worker, args=(roster,)) for roster in (ROSTER_A, ROSTER_B) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"{len(errors)} runs differed from the single-threaded output"
+
+if __name__ == "__main__":
+    test_sync_candidates()
+    test_alternating_rosters_on_shared_index()
+    print("Skill index tests passed.")
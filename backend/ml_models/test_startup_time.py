@@ -0,0 +1,44 @@
+import os
+import subprocess
+import sys
+
+# Cumulative import time allowed for `import api`, in milliseconds
+STARTUP_BUDGET_MS = float(os.environ.get('STARTUP_IMPORT_BUDGET_MS', '1000'))
+
+# These must stay lazily imported; any of them alone costs hundreds of milliseconds
+HEAVY_MODULES = ['prophet', 'statsmodels', 'sklearn', 'pgmpy', 'matplotlib', 'seaborn']
+
+def measure_api_import():
+    """
+    Import api in a fresh interpreter with -X importtime.
+    Returns (total_ms, set of top-level packages imported).
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import api'],
+        cwd=os.path.dirname(os.path.abspath(__file__)),
+        capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing api failed:\n{result.stderr}")
+
+    total_us = None
+    packages = set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        name = name.strip()
+        packages.add(name.split('.')[0])
+        if name == 'api':
+            total_us = int(cumulative)
+    return total_us / 1000.0, packages
+
+def test_startup_time():
+    total_ms, packages = measure_api_import()
+    eager = [m for m in HEAVY_MODULES if m in packages]
+    assert not eager, f"Heavy modules imported at startup ({total_ms:.0f} ms): {', '.join(eager)}"
+    assert total_ms <= STARTUP_BUDGET_MS, f"import api took {total_ms:.0f} ms, over the {STARTUP_BUDGET_MS:.0f} ms budget"
+
+if __name__ == "__main__":
+    test_startup_time()
+    print("Startup time test passed.")
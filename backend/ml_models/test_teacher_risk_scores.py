@@ -0,0 +1,161 @@
+import random
+import zlib
+
+import teacher_risk_scores
+from risk_assessment_weighted_step_by_step import RISK_FACTORS, calculate_risk_score, risk_level_from_score
+from teacher_risk_scores import TEACHER_COLUMN, TeacherRiskIndex, score_rows
+
+STRANDS = ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']
+
+def baseline_top(entries, k, strand=None):
+    # Full sort of the current entries, the order the index must reproduce
+    rows = [(-e['risk_score'], teacher) for teacher, e in entries.items() if strand is None or e['strand'] == strand]
+    return [teacher for _, teacher in sorted(rows)[:k]]
+
+def test_index_matches_sorted_baseline():
+    rng = random.Random(0)
+    entries = {teacher: {'strand': rng.choice(STRANDS), 'risk_score': round(rng.random(), 2)} for teacher in range(300)}
+    index = TeacherRiskIndex()
+    index.load(entries)
+    current = {str(teacher): entry for teacher, entry in entries.items()}
+    for step in range(500):
+        teacher = rng.randrange(320)
+        if rng.random() < 0.2:
+            index.remove(teacher)
+            current.pop(str(teacher), None)
+        else:
+            entry = {'strand': rng.choice(STRANDS), 'risk_score': round(rng.random(), 2)}
+            index.update(teacher, entry)
+            current[str(teacher)] = entry
+        k = rng.randint(1, 40)
+        strand = rng.choice(STRANDS + [None])
+        assert [e['teacher'] for e in index.top(k, strand)] == baseline_top(current, k, strand), f"step {step}"
+    assert len(index) == len(current)
+
+def test_teacher_keys_are_normalized():
+    index = TeacherRiskIndex()
+    index.load({12: {'strand': 'STEM', 'risk_score': 0.5}})
+    assert index.get('12') == index.get(12) == {'strand': 'STEM', 'risk_score': 0.5, 'teacher': '12'}
+    index.update('12', {'strand': 'ABM', 'risk_score': 0.9})
+    assert len(index) == 1 and index.top(5, 'STEM') == []
+    index.remove(12)
+    assert len(index) == 0 and index.top(5) == []
+
+def test_score_rows_matches_scalar_scores():
+    rng = random.Random(1)
+    rows = []
+    for row_id in range(200):
+        row = {'id': row_id, TEACHER_COLUMN: rng.randrange(60), 'year': 2015 + row_id // 40,
+               'strand': rng.choice(STRANDS)}
+        row.update({'teacher_satisfaction': rng.choice([1, 2, 3]), 'hours_per_week': rng.choice([1, 1.5, 2, 2.5]),
+                    'historical_resignations': rng.uniform(0, 10), 'student_satisfaction': rng.uniform(0.6, 1),
+                    'performance': rng.uniform(60, 100)})
+        rows.append(row)
+    entries = score_rows(rows)
+
+    latest = {}
+    for row in rows:
+        latest[str(row[TEACHER_COLUMN])] = row
+    assert set(entries) == set(latest)
+    for teacher, row in latest.items():
+        score = calculate_risk_score(row)
+        assert entries[teacher]['risk_score'] == round(score, 4)
+        assert entries[teacher]['risk_level'] == risk_level_from_score(score)
+        assert entries[teacher]['row_id'] == row['id']
+
+class FakeRiskDatabase:
+    """
+    risk_assessment rows in memory, answering the queries teacher_risk_scores makes.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def checksum(self, row):
+        fields = [row[TEACHER_COLUMN], row['year'], row['strand']] + [row[factor] for factor in RISK_FACTORS]
+        return zlib.crc32('|'.join(map(str, fields)).encode('utf-8'))
+
+    def connect(self):
+        database = self
+
+        class Cursor:
+            def __init__(self, dictionary=False):
+                self.dictionary = dictionary
+                self.result = []
+
+            def execute(self, query, params=()):
+                if not query.startswith('SELECT'):
+                    return
+                selected = [row for row in database.rows
+                            if not params or str(row[TEACHER_COLUMN]) in {str(p) for p in params}]
+                if self.dictionary:
+                    self.result = [dict(row, row_checksum=database.checksum(row))
+                                   for row in sorted(selected, key=lambda row: (row['year'], row['id']))]
+                else:
+                    self.result = [(row[TEACHER_COLUMN], row['id'], database.checksum(row)) for row in selected]
+
+            def executemany(self, query, params):
+                pass
+
+            def fetchall(self):
+                return self.result
+
+            def close(self):
+                pass
+
+        class Connection:
+            def cursor(self, dictionary=False):
+                return Cursor(dictionary)
+
+            def commit(self):
+                pass
+
+            def close(self):
+                pass
+
+        return Connection()
+
+def test_top_after_single_refresh_rescores_nobody():
+    import api
+
+    rng = random.Random(2)
+    rows = [{'id': row_id, TEACHER_COLUMN: row_id % 20, 'year': 2024, 'strand': rng.choice(STRANDS),
+             'teacher_satisfaction': rng.choice([1, 2, 3]), 'hours_per_week': rng.choice([1, 1.5, 2, 2.5]),
+             'historical_resignations': rng.uniform(0, 10), 'student_satisfaction': rng.uniform(0.6, 1),
+             'performance': rng.uniform(60, 100)} for row_id in range(40)]
+    database = FakeRiskDatabase(rows)
+    full_refreshes = []
+    refresh_all = teacher_risk_scores.refresh_all
+    saved = (teacher_risk_scores.get_connection, teacher_risk_scores.refresh_all, api.response_cache.data_version)
+    teacher_risk_scores.get_connection = database.connect
+    teacher_risk_scores.refresh_all = lambda index: full_refreshes.append(1) or refresh_all(index)
+    api.response_cache.data_version = lambda tables: str(sum(database.checksum(row) for row in rows))
+    try:
+        client = api.app.test_client()
+        assert len(client.get('/api/teacher_risk/top?k=5').get_json()['teachers']) == 5
+        assert len(full_refreshes) == 1
+
+        rows[3]['performance'] = 100.0
+        rows[3]['teacher_satisfaction'] = 1
+        assert client.post('/api/teacher_risk/refresh', json={'teacher_id': 3}).status_code == 200
+        top = client.get('/api/teacher_risk/top?k=20').get_json()['teachers']
+        assert len(full_refreshes) == 1, "the single-teacher refresh should leave nothing to rescore"
+        expected = score_rows(rows)
+        assert {entry['teacher']: entry['risk_score'] for entry in top} == \
+            {teacher: entry['risk_score'] for teacher, entry in expected.items()}
+
+        # A change nobody refreshed is rescored on its own, still without a full pass
+        rows[7]['hours_per_week'] = 3
+        top = client.get('/api/teacher_risk/top?k=20').get_json()['teachers']
+        assert len(full_refreshes) == 1
+        assert next(entry for entry in top if entry['teacher'] == '7')['risk_score'] == \
+            score_rows(rows)['7']['risk_score']
+    finally:
+        teacher_risk_scores.get_connection, teacher_risk_scores.refresh_all, api.response_cache.data_version = saved
+
+if __name__ == "__main__":
+    test_index_matches_sorted_baseline()
+    test_teacher_keys_are_normalized()
+    test_score_rows_matches_scalar_scores()
+    test_top_after_single_refresh_rescores_nobody()
+    print("Teacher risk score tests passed.")
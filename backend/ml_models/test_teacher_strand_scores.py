@@ -0,0 +1,87 @@
+import json
+import threading
+
+from combined_workload_skill_matching import SOLVERS, STRAND_PARAMETERS, combined_workload_skill_matching
+from teacher_strand_scores import StrandScoreMatrix
+
+ROSTER_A = [
+    {'name': 'Ana Cruz', 'subjects_expertise': 'Basic Calculus,General Mathematics', 'max_hours_per_week': 40},
+    {'name': 'Ben Reyes', 'subjects_expertise': 'Creative Writing,Oral Communication', 'max_hours_per_week': 40},
+    {'name': 'Carla Santos', 'subjects_expertise': 'Web Development', 'teaching_certifications': 'ICT NC II',
+     'max_hours_per_week': 40}
+]
+ROSTER_B = [
+    {'name': 'Dan Lim', 'subjects_expertise': 'Business Finance,Principles of Marketing', 'max_hours_per_week': 40},
+    {'name': 'Ella Tan', 'subjects_expertise': 'Applied Economics,PE and Health', 'max_hours_per_week': 40},
+    {'name': 'Ana Cruz', 'subjects_expertise': 'Animation', 'max_hours_per_week': 40}
+]
+
+def test_core_subjects_only_break_ties():
+    scores = StrandScoreMatrix(STRAND_PARAMETERS).update([
+        {'name': 'Ana Cruz', 'subjects_expertise': 'Basic Calculus,General Mathematics'},
+        {'name': 'Ella Tan', 'subjects_expertise': 'Basic Calculus'},
+        {'name': 'Gio Ramos', 'subjects_expertise': 'General Mathematics,Oral Communication'}
+    ])
+    assert scores['STEM']['Ana Cruz'] > scores['STEM']['Ella Tan'] > 0
+    # Core subjects alone make no strand member
+    assert all('Gio Ramos' not in teacher_scores for teacher_scores in scores.values())
+    assert all('Ana Cruz' not in scores[strand] for strand in ('ABM', 'GAS', 'HUMSS', 'ICT'))
+
+def test_roster_assignments_follow_specialized_subjects():
+    for solver in SOLVERS:
+        output = combined_workload_skill_matching(ROSTER_A, [], [], 'name', 'subject', solver=solver)
+        status = {entry['teacher']: entry for entry in output['all_teachers_status']}
+        assert len(output['all_teachers_status']) == len(ROSTER_A), solver
+        assert status['Ana Cruz']['assigned_strands'] == ['STEM']
+        assert status['Ana Cruz']['subjects'] == [{'subject': 'Basic Calculus', 'hours_per_week': 4},
+                                                  {'subject': 'General Mathematics', 'hours_per_week': 4}]
+        assert status['Ben Reyes']['assigned_strands'] == ['HUMSS']
+        assert status['Ben Reyes']['subjects'] == [{'subject': 'Creative Writing', 'hours_per_week': 4},
+                                                   {'subject': 'Oral Communication', 'hours_per_week': 4}]
+        assert status['Carla Santos']['assigned_strands'] == ['ICT']
+        assert [entry['total_hours_per_week'] for entry in output['all_teachers_status']] == [8, 8, 4], solver
+        assert not any(subject['subject'] == 'No assigned specialized subject'
+                       for entry in output['all_teachers_status'] for subject in entry['subjects'])
+
+def test_alternating_rosters_get_their_own_scores():
+    expected = {id(roster): StrandScoreMatrix(STRAND_PARAMETERS).update(roster) for roster in (ROSTER_A, ROSTER_B)}
+    shared = StrandScoreMatrix(STRAND_PARAMETERS)
+    errors = []
+
+    def worker(roster):
+        for _ in range(200):
+            scores = shared.update(roster)
+            if scores != expected[id(roster)]:
+                errors.append(scores)
+
+    threads = [threading.Thread(target=worker, args=(roster,)) for roster in (ROSTER_A, ROSTER_B) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"{len(errors)} updates returned another roster's scores"
+
+def test_alternating_rosters_get_their_own_assignments():
+    expected = {id(roster): json.dumps(combined_workload_skill_matching(roster, [], [], 'name', 'subject'))
+                for roster in (ROSTER_A, ROSTER_B)}
+    errors = []
+
+    def worker(roster):
+        for _ in range(50):
+            output = json.dumps(combined_workload_skill_matching(roster, [], [], 'name', 'subject'))
+            if output != expected[id(roster)]:
+                errors.append(output)
+
+    threads = [threading.Thread(target=worker, args=(roster,)) for roster in (ROSTER_A, ROSTER_B) * 2]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, f"{len(errors)} runs differed from the single-threaded output"
+
+if __name__ == "__main__":
+    test_core_subjects_only_break_ties()
+    test_roster_assignments_follow_specialized_subjects()
+    test_alternating_rosters_get_their_own_scores()
+    test_alternating_rosters_get_their_own_assignments()
+    print("Teacher strand score tests passed.")
@@ -15,7 +15,8 @@ def run_test():
     with open(preferences_file, 'r') as f:
         preferences = json.load(f)
 
-    combined_workload_skill_matching(teachers, classes, preferences, 'name', 'subject')
+    combined_workload_skill_matching(teachers, classes, preferences, 'name', 'subject',
+                                     output_file=os.path.join(temp_dir, 'output.json'))
     print("Workload distribution test executed. Check output.json for results.")
 
 if __name__ == "__main__":
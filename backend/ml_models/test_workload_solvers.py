@@ -0,0 +1,34 @@
+from combined_workload_skill_matching import combined_workload_skill_matching
+
+# Ana is the best Basic Calculus teacher but has hours for one block only; Ella can only teach Basic Calculus
+ROSTER = [
+    {'name': 'Ana Cruz', 'subjects_expertise': 'Basic Calculus,Business Finance',
+     'proficiency_levels': {'Basic Calculus': 'Expert'}, 'max_hours_per_week': 4},
+    {'name': 'Ella Tan', 'subjects_expertise': 'Basic Calculus', 'max_hours_per_week': 40}
+]
+
+def covered_subjects(output):
+    return {(strand, subject['subject'])
+            for entry in output['all_teachers_status'] for strand in entry['assigned_strands']
+            for subject in entry['subjects'] if subject['subject'] != 'No assigned specialized subject'}
+
+def subjects_of(output, name):
+    return [subject['subject'] for entry in output['all_teachers_status'] if entry['teacher'] == name
+            for subject in entry['subjects']]
+
+def test_global_solver_covers_what_per_strand_leaves_open():
+    strand_optimal = combined_workload_skill_matching(ROSTER, [], [], 'name', 'subject', solver='strand_optimal')
+    # STEM is solved first and spends Ana's only block on Basic Calculus
+    assert subjects_of(strand_optimal, 'Ana Cruz') == ['Basic Calculus']
+    assert not any(subject == 'Business Finance' for _, subject in covered_subjects(strand_optimal))
+
+    optimal = combined_workload_skill_matching(ROSTER, [], [], 'name', 'subject', solver='optimal')
+    assert subjects_of(optimal, 'Ana Cruz') == ['Business Finance']
+    assert subjects_of(optimal, 'Ella Tan') == ['Basic Calculus']
+    for entry in optimal['all_teachers_status']:
+        teacher = next(t for t in ROSTER if t['name'] == entry['teacher'])
+        assert entry['total_hours_per_week'] <= teacher['max_hours_per_week']
+
+if __name__ == "__main__":
+    test_global_solver_covers_what_per_strand_leaves_open()
+    print("Workload solver tests passed.")
@@ -1,16 +1,24 @@
 import pandas as pd
 import numpy as np
-import statsmodels.api as sm
-from statsmodels.tsa.arima.model import ARIMA
-from sklearn.linear_model import LinearRegression
-from prophet import Prophet
 import logging
 
 logger = logging.getLogger(__name__)
 
+# statsmodels, sklearn and prophet are imported inside the functions that use
+# them; they take seconds to import and most API requests never need them.
+
+def load_dependencies():
+    """
+    Import the forecasting libraries now instead of on the first forecast.
+    """
+    from statsmodels.tsa.arima.model import ARIMA
+    from sklearn.linear_model import LinearRegression
+    from prophet import Prophet
+
 def forecast_arima(series, order=(1,1,1), steps=3):
     import warnings
     import statsmodels.tools.sm_exceptions
+    from statsmodels.tsa.arima.model import ARIMA
     try:
         logger.info(f"ARIMA forecast input series:\n{series}")
         model = ARIMA(series, order=order)
@@ -25,6 +33,7 @@ def forecast_arima(series, order=(1,1,1), steps=3):
         return pd.Series([series.mean()] * steps)
 
 def forecast_linear_regression(series, steps=3):
+    from sklearn.linear_model import LinearRegression
     try:
         df = series.reset_index()
         df['time'] = np.arange(len(df))
@@ -40,6 +49,7 @@ def forecast_linear_regression(series, steps=3):
         return pd.Series([series.mean()] * steps)
 
 def forecast_prophet(df, date_col='year', value_col='value', steps=3):
+    from prophet import Prophet
     try:
         prophet_df = df[[date_col, value_col]].rename(columns={date_col: 'ds', value_col: 'y'})
         logger.info(f"Prophet input data for forecasting:\n{prophet_df}")
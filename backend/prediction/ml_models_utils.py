@@ -1,26 +1,190 @@
 import pandas as pd
 import numpy as np
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier, RandomForestRegressor
-from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
-from sklearn.metrics import precision_score, recall_score, roc_auc_score, mean_squared_error
 import logging
 import joblib
 import os
+import hashlib
+import json
+import tempfile
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
 
 logger = logging.getLogger(__name__)
 
+# sklearn is imported where it is used so importing this module stays cheap
+
+def load_dependencies():
+    """
+    Import the sklearn modules used for training now instead of on first use.
+    """
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
+    from sklearn.metrics import mean_squared_error
+
 def train_logistic_regression(X, y):
+    from sklearn.linear_model import LogisticRegression
     model = LogisticRegression(max_iter=1000)
     model.fit(X, y)
     return model
 
 def train_random_forest(X, y):
+    from sklearn.ensemble import RandomForestClassifier
     model = RandomForestClassifier(n_estimators=100, random_state=42)
     model.fit(X, y)
     return model
 
-def train_random_forest_regressor(X, y):
+def dataset_fingerprint(X, y=None):
+    """
+    Stable hash of a training frame, its column order and (optionally) its target.
+    Used to key stored models and cached hyperparameters to the data they were fit on.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([str(c) for c in X.columns]).encode('utf-8'))
+    digest.update(pd.util.hash_pandas_object(X, index=False).values.tobytes())
+    if y is not None:
+        digest.update(pd.util.hash_pandas_object(pd.Series(y), index=False).values.tobytes())
+    return digest.hexdigest()[:16]
+
+def frame_summary(X, y=None):
+    """
+    Per-column mean and standard deviation of the training frame (and target),
+    used to measure how far new data has drifted from a cached fit.
+    """
+    frame = X.copy()
+    if y is not None:
+        frame['__target__'] = np.asarray(y)
+    numeric = frame.apply(pd.to_numeric, errors='coerce')
+    return {
+        'n_rows': int(len(frame)),
+        'mean': {str(c): float(v) for c, v in numeric.mean().fillna(0).items()},
+        'std': {str(c): float(v) for c, v in numeric.std(ddof=0).fillna(0).items()}
+    }
+
+def summary_drift(current, cached):
+    """
+    Largest shift of a column mean, in units of the cached standard deviation.
+    Returns infinity when the two summaries do not cover the same columns.
+    """
+    if set(current['mean']) != set(cached['mean']):
+        return float('inf')
+    drift = 0.0
+    for col, mean in current['mean'].items():
+        scale = max(cached['std'].get(col, 0.0), 1e-9)
+        drift = max(drift, abs(mean - cached['mean'][col]) / scale)
+    return drift
+
+DEFAULT_HYPERPARAM_CACHE_PATH = os.environ.get(
+    'HYPERPARAM_CACHE_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models', 'hyperparameter_cache.json')
+)
+# Reuse cached parameters for data of the same model whose column means moved less than this many
+# standard deviations. 0 only reuses parameters searched on exactly the same data.
+DEFAULT_DRIFT_THRESHOLD = float(os.environ.get('HYPERPARAM_DRIFT_THRESHOLD', '0.25'))
+
+def cache_bucket(bucket):
+    """
+    JSON-safe name for the model a cache entry belongs to, e.g. ('STEM', 'retention_rate').
+    """
+    if bucket is None:
+        return None
+    if isinstance(bucket, (tuple, list)):
+        return '/'.join(str(part) for part in bucket)
+    return str(bucket)
+
+class HyperparameterCache:
+    """
+    On-disk cache of GridSearchCV best_params_ keyed by dataset fingerprint.
+
+    An exact fingerprint match always reuses the stored parameters. When
+    drift_threshold is above 0 (the default is 0.25), a frame for the same model (bucket, e.g.
+    (strand, target)) whose summary statistics have drifted less than the
+    threshold from one of that model's entries reuses them too, so its grid
+    is only searched again once the data has really changed. Frames stored
+    without a bucket only ever match exactly.
+
+    Stores from several processes (training pool workers, the prediction
+    worker) are serialized with an flock on path + '.lock'.
+    """
+
+    def __init__(self, path=DEFAULT_HYPERPARAM_CACHE_PATH, drift_threshold=DEFAULT_DRIFT_THRESHOLD):
+        self.path = path
+        self.drift_threshold = drift_threshold
+        self._lock = threading.Lock()
+        self._entries = None
+        self._mtime = None
+
+    def _read(self, reload=False):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return {}
+        if reload or self._entries is None or mtime != self._mtime:
+            try:
+                with open(self.path, 'r') as f:
+                    self._entries = json.load(f)
+                self._mtime = mtime
+            except (OSError, ValueError) as e:
+                logger.warning(f"Ignoring unreadable hyperparameter cache {self.path}: {str(e)}")
+                return {}
+        return self._entries
+
+    def lookup(self, X, y, bucket=None):
+        """
+        Return cached best parameters for this frame, or None if a search is needed.
+        """
+        with self._lock:
+            entries = self._read()
+        fingerprint = dataset_fingerprint(X, y)
+        if fingerprint in entries:
+            logger.info(f"Hyperparameter cache hit for dataset {fingerprint}")
+            return entries[fingerprint]['params']
+        bucket = cache_bucket(bucket)
+        if not self.drift_threshold or bucket is None:
+            return None
+
+        summary = frame_summary(X, y)
+        best_params, best_drift = None, float('inf')
+        for entry in entries.values():
+            if entry.get('bucket') != bucket:
+                continue
+            drift = summary_drift(summary, entry['summary'])
+            if drift < best_drift:
+                best_params, best_drift = entry['params'], drift
+        if best_params is not None and best_drift <= self.drift_threshold:
+            logger.info(f"Reusing cached {bucket} hyperparameters for dataset {fingerprint} (drift {best_drift:.3f})")
+            return best_params
+        return None
+
+    def store(self, X, y, params, bucket=None):
+        fingerprint = dataset_fingerprint(X, y)
+        entry = {'params': params, 'summary': frame_summary(X, y), 'bucket': cache_bucket(bucket)}
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        with self._lock, open(self.path + '.lock', 'a') as lock_file:
+            # Hold the file lock across read-modify-write so other processes' entries are not lost
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            entries = dict(self._read(reload=True))
+            entries[fingerprint] = entry
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(entries, f)
+            os.replace(tmp_path, self.path)
+            self._entries = entries
+            self._mtime = os.path.getmtime(self.path)
+
+hyperparameter_cache = HyperparameterCache()
+
+def train_random_forest_regressor(X, y, param_cache=None, n_jobs=-1, random_state=42, cache_key=None):
+    # param_cache=None uses the shared on-disk cache; pass False to always run the grid search.
+    # cache_key names the model, e.g. (strand, target), so drifted data only reuses its own parameters.
+    from sklearn.ensemble import RandomForestRegressor
+    from sklearn.model_selection import TimeSeriesSplit, GridSearchCV
+    from sklearn.metrics import mean_squared_error
     # Use TimeSeriesSplit for cross-validation due to time series data
     tscv = TimeSeriesSplit(n_splits=3)
     param_grid = {
@@ -29,11 +193,21 @@ def train_random_forest_regressor(X, y):
         'min_samples_split': [2, 5],
         'min_samples_leaf': [1, 2]
     }
-    rf = RandomForestRegressor(random_state=42)
-    grid_search = GridSearchCV(rf, param_grid, cv=tscv, scoring='neg_mean_squared_error', n_jobs=-1)
-    grid_search.fit(X, y)
-    best_model = grid_search.best_estimator_
-    logger.info(f"Best RandomForestRegressor params: {grid_search.best_params_}")
+    if param_cache is None:
+        param_cache = hyperparameter_cache
+    cached_params = param_cache.lookup(X, y, cache_key) if param_cache else None
+    if cached_params is not None:
+        # Same refit GridSearchCV would do with these parameters, without the search
+        best_model = RandomForestRegressor(random_state=random_state, **cached_params)
+        best_model.fit(X, y)
+    else:
+        rf = RandomForestRegressor(random_state=random_state)
+        grid_search = GridSearchCV(rf, param_grid, cv=tscv, scoring='neg_mean_squared_error', n_jobs=n_jobs)
+        grid_search.fit(X, y)
+        best_model = grid_search.best_estimator_
+        logger.info(f"Best RandomForestRegressor params: {grid_search.best_params_}")
+        if param_cache:
+            param_cache.store(X, y, grid_search.best_params_, cache_key)
     # Evaluate best model on training data
     y_pred = best_model.predict(X)
     rmse = mean_squared_error(y, y_pred) ** 0.5
@@ -42,6 +216,7 @@ def train_random_forest_regressor(X, y):
     return best_model
 
 def evaluate_classification_model(model, X_test, y_test):
+    from sklearn.metrics import precision_score, recall_score, roc_auc_score
     y_pred = model.predict(X_test)
     y_proba = model.predict_proba(X_test)[:,1]
     precision = precision_score(y_test, y_pred)
@@ -50,6 +225,7 @@ def evaluate_classification_model(model, X_test, y_test):
     return {'precision': precision, 'recall': recall, 'auc': auc}
 
 def evaluate_regression_model(y_true, y_pred):
+    from sklearn.metrics import mean_squared_error
     rmse = mean_squared_error(y_true, y_pred) ** 0.5
     mae = np.mean(np.abs(y_true - y_pred))
     return {'rmse': rmse, 'mae': mae}
@@ -0,0 +1,170 @@
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_DIR = os.environ.get(
+    'MODEL_REGISTRY_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'saved_models')
+)
+DEFAULT_MAX_LOADED = int(os.environ.get('MODEL_REGISTRY_MAX_LOADED', '32'))
+# Retention per (strand, target): data fingerprints kept, and versions kept per fingerprint
+DEFAULT_KEEP_FINGERPRINTS = int(os.environ.get('MODEL_REGISTRY_KEEP_FINGERPRINTS', '5'))
+DEFAULT_KEEP_VERSIONS = int(os.environ.get('MODEL_REGISTRY_KEEP_VERSIONS', '2'))
+
+_VERSION_PATTERN = re.compile(r'^v(\d+)\.joblib$')
+
+
+class ModelRegistry:
+    """
+    Versioned on-disk store of trained models.
+
+    Artifacts live under <root_dir>/<strand>/<target>/<fingerprint>/v<N>.joblib,
+    where the fingerprint identifies the training data (see
+    ml_models_utils.dataset_fingerprint). Loaded models are kept in an
+    in-process LRU; a lookup notices when a newer version has been written
+    (for example by train_and_save_models.py) and reloads it.
+
+    Each save prunes the (strand, target): only the keep_versions newest
+    versions of the fingerprint and the keep_fingerprints most recently
+    saved or loaded fingerprints stay on disk.
+    """
+
+    def __init__(self, root_dir=DEFAULT_MODEL_DIR, max_loaded=DEFAULT_MAX_LOADED,
+                 keep_fingerprints=DEFAULT_KEEP_FINGERPRINTS, keep_versions=DEFAULT_KEEP_VERSIONS):
+        self.root_dir = root_dir
+        self.max_loaded = max_loaded
+        self.keep_fingerprints = max(1, keep_fingerprints)
+        self.keep_versions = max(1, keep_versions)
+        self._loaded = OrderedDict()  # (strand, target, fingerprint) -> (version, model)
+        self._lock = threading.Lock()
+
+    def _artifact_dir(self, strand, target, fingerprint):
+        return os.path.join(self.root_dir, strand, target, fingerprint)
+
+    def latest_version(self, strand, target, fingerprint):
+        """
+        Return the newest version number stored for the key, or None.
+        """
+        artifact_dir = self._artifact_dir(strand, target, fingerprint)
+        try:
+            names = os.listdir(artifact_dir)
+        except FileNotFoundError:
+            return None
+        versions = [int(m.group(1)) for m in map(_VERSION_PATTERN.match, names) if m]
+        return max(versions) if versions else None
+
+    def _remember(self, key, version, model):
+        with self._lock:
+            self._loaded[key] = (version, model)
+            self._loaded.move_to_end(key)
+            while len(self._loaded) > self.max_loaded:
+                self._loaded.popitem(last=False)
+
+    def load(self, strand, target, fingerprint):
+        """
+        Return the latest model for the key, or None if nothing valid is stored.
+        """
+        key = (strand, target, fingerprint)
+        version = self.latest_version(strand, target, fingerprint)
+        if version is None:
+            return None
+        try:
+            # Mark the fingerprint as in use so pruning keeps it
+            os.utime(self._artifact_dir(strand, target, fingerprint))
+        except OSError:
+            pass
+
+        with self._lock:
+            cached = self._loaded.get(key)
+            if cached is not None and cached[0] == version:
+                self._loaded.move_to_end(key)
+                return cached[1]
+
+        path = os.path.join(self._artifact_dir(strand, target, fingerprint), f'v{version}.joblib')
+        try:
+            model = joblib.load(path)
+        except Exception as e:
+            logger.warning(f"Could not load model artifact {path}: {str(e)}")
+            return None
+        logger.info(f"Loaded {target} model for strand {strand} (version {version}) from registry")
+        self._remember(key, version, model)
+        return model
+
+    def save(self, strand, target, fingerprint, model, metadata=None):
+        """
+        Store the model as a new version and return the version number.
+        """
+        artifact_dir = self._artifact_dir(strand, target, fingerprint)
+        os.makedirs(artifact_dir, exist_ok=True)
+        version = (self.latest_version(strand, target, fingerprint) or 0) + 1
+
+        # Write to a temp file and rename so readers never see a partial artifact
+        fd, tmp_path = tempfile.mkstemp(dir=artifact_dir, suffix='.tmp')
+        os.close(fd)
+        joblib.dump(model, tmp_path)
+        os.replace(tmp_path, os.path.join(artifact_dir, f'v{version}.joblib'))
+
+        info = {'strand': strand, 'target': target, 'fingerprint': fingerprint,
+                'version': version, 'created_at': time.time()}
+        info.update(metadata or {})
+        with open(os.path.join(artifact_dir, f'v{version}.json'), 'w') as f:
+            json.dump(info, f, default=str)
+
+        logger.info(f"Saved {target} model for strand {strand} as version {version}")
+        self._remember((strand, target, fingerprint), version, model)
+        self.prune(strand, target, fingerprint)
+        return version
+
+    def prune(self, strand, target, fingerprint=None):
+        """
+        Delete old versions of fingerprint and the least recently used
+        fingerprints of (strand, target) beyond the retention limits.
+        """
+        if fingerprint is not None:
+            artifact_dir = self._artifact_dir(strand, target, fingerprint)
+            versions = sorted(int(m.group(1)) for m in map(_VERSION_PATTERN.match, os.listdir(artifact_dir)) if m)
+            for old in versions[:-self.keep_versions]:
+                for suffix in ('.joblib', '.json'):
+                    try:
+                        os.remove(os.path.join(artifact_dir, f'v{old}{suffix}'))
+                    except OSError:
+                        pass
+            os.utime(artifact_dir)
+
+        target_dir = os.path.join(self.root_dir, strand, target)
+        used = []
+        for name in os.listdir(target_dir):
+            path = os.path.join(target_dir, name)
+            try:
+                if os.path.isdir(path):
+                    used.append((os.path.getmtime(path), name))
+            except OSError:
+                pass
+        for _, name in sorted(used, reverse=True)[self.keep_fingerprints:]:
+            shutil.rmtree(os.path.join(target_dir, name), ignore_errors=True)
+            with self._lock:
+                self._loaded.pop((strand, target, name), None)
+            logger.info(f"Removed {target} models for strand {strand} trained on {name}")
+
+    def get_or_train(self, strand, target, fingerprint, train_fn, metadata=None):
+        """
+        Return the stored model for the key, training and saving one with
+        train_fn() only when no valid artifact exists.
+        """
+        model = self.load(strand, target, fingerprint)
+        if model is not None:
+            return model
+        model = train_fn()
+        if model is not None:
+            self.save(strand, target, fingerprint, model, metadata)
+        return model
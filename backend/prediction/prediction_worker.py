@@ -0,0 +1,157 @@
+"""
+Long-lived worker for teacher retention predictions.
+
+The PHP endpoints used to spawn a fresh interpreter per request, paying the
+pandas/sklearn/statsmodels/prophet import cost every time. This worker imports
+them once at startup (elsewhere they are loaded lazily) and then answers
+newline-delimited JSON requests, either on stdin/stdout or on a local Unix
+socket.
+
+Request (one JSON document per line):
+    {"id": "abc", "rows": [...], "target_ratio": 25, "forecast_years": 3}
+A bare JSON list is also accepted and treated as the rows.
+
+Response (one JSON document per line):
+    {"id": "abc", "result": <predict_teacher_retention payload>}
+    {"id": "abc", "error": "..."}
+
+Requests are served concurrently, so responses can arrive out of order;
+clients should match them by id.
+"""
+import argparse
+import json
+import logging
+import os
+import socket
+import sys
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+from teacher_retention import predict_teacher_retention, convert_numpy_types, warm_up
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET_PATH = os.environ.get(
+    'PREDICTION_WORKER_SOCKET',
+    os.path.join(tempfile.gettempdir(), 'teacher_retention_worker.sock')
+)
+DEFAULT_MAX_WORKERS = int(os.environ.get('PREDICTION_WORKER_THREADS', '4'))
+
+# Options forwarded from a request to predict_teacher_retention
+PREDICTION_OPTIONS = ('target_ratio', 'forecast_years', 'max_class_size')
+
+
+def handle_request(line):
+    """
+    Decode one request line, run the prediction and return the response dict.
+    """
+    request_id = None
+    try:
+        request = json.loads(line)
+        if isinstance(request, list):
+            request = {'rows': request}
+        request_id = request.get('id')
+        rows = request.get('rows')
+        if not rows:
+            return {'id': request_id, 'error': 'No rows provided'}
+        options = {key: request[key] for key in PREDICTION_OPTIONS if request.get(key) is not None}
+        result = predict_teacher_retention(rows, **options)
+        return {'id': request_id, 'result': convert_numpy_types(result)}
+    except Exception as e:
+        logger.error(f"Error handling prediction request: {str(e)}", exc_info=True)
+        return {'id': request_id, 'error': str(e)}
+
+
+def _encode(response):
+    return json.dumps(response, separators=(',', ':'), default=str) + '\n'
+
+
+def serve_stdio(max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Serve requests read from stdin, writing responses to stdout.
+    """
+    # forecasting prints debug lines to stdout; keep the real stdout for the protocol only
+    protocol_out = sys.stdout
+    sys.stdout = sys.stderr
+    write_lock = threading.Lock()
+
+    def respond(line):
+        response = _encode(handle_request(line))
+        with write_lock:
+            protocol_out.write(response)
+            protocol_out.flush()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for line in sys.stdin:
+            if line.strip():
+                executor.submit(respond, line)
+
+
+def _serve_connection(conn, executor):
+    write_lock = threading.Lock()
+    pending = []
+
+    def respond(line):
+        response = _encode(handle_request(line)).encode('utf-8')
+        with write_lock:
+            try:
+                conn.sendall(response)
+            except OSError as e:
+                logger.warning(f"Client went away before response was sent: {e}")
+
+    try:
+        with conn.makefile('r', encoding='utf-8') as reader:
+            for line in reader:
+                if line.strip():
+                    pending.append(executor.submit(respond, line))
+        # Client half-closed its side; finish outstanding work before closing
+        for future in pending:
+            future.result()
+    finally:
+        conn.close()
+
+
+def serve_unix_socket(path=DEFAULT_SOCKET_PATH, max_workers=DEFAULT_MAX_WORKERS):
+    """
+    Serve requests on a Unix domain socket. Each connection may send several
+    requests; all connections share one bounded pool of prediction threads.
+    """
+    sys.stdout = sys.stderr
+    if os.path.exists(path):
+        os.unlink(path)
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(path)
+    os.chmod(path, 0o660)
+    server.listen()
+    logger.info(f"Prediction worker listening on {path} with {max_workers} threads")
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        while True:
+            conn, _ = server.accept()
+            threading.Thread(target=_serve_connection, args=(conn, executor), daemon=True).start()
+    except KeyboardInterrupt:
+        logger.info("Prediction worker shutting down")
+    finally:
+        server.close()
+        executor.shutdown(wait=False)
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a warm teacher retention prediction worker.")
+    parser.add_argument('--socket', nargs='?', const=DEFAULT_SOCKET_PATH, default=None,
+                        help="Listen on a Unix socket (default path if no value is given) instead of stdin/stdout.")
+    parser.add_argument('--workers', type=int, default=DEFAULT_MAX_WORKERS,
+                        help="Number of requests served concurrently.")
+    args = parser.parse_args()
+
+    # Pay the import cost before the first request instead of during it
+    warm_up()
+    if args.socket:
+        serve_unix_socket(args.socket, args.workers)
+    else:
+        serve_stdio(args.workers)
@@ -18,35 +18,130 @@ import forecasting
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 import ml_models_utils
+from model_registry import ModelRegistry
+import training_scheduler
 
 logger = logging.getLogger(__name__)
 
 from prediction_recommendation import generate_prediction_recommendations
 
+# Shared across calls so a long-lived process (see prediction_worker.py) keeps loaded models warm
+model_registry = ModelRegistry()
+
+def warm_up():
+    """
+    Import the heavy forecasting and training libraries ahead of the first
+    prediction (they are otherwise loaded lazily on first use).
+    """
+    forecasting.load_dependencies()
+    ml_models_utils.load_dependencies()
+
+STRANDS = ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']
+STRAND_ID_TO_NAME = {
+    1: 'STEM',
+    2: 'ABM',
+    3: 'GAS',
+    4: 'HUMSS',
+    5: 'ICT'
+}
+FEATURE_COLS = [
+    'salary_ratio', 'professional_dev_hours', 'workload_per_teacher', 'target_ratio', 'max_class_size',
+    'student_teacher_ratio', 
+    'workload_change', 'salary_growth', 'training_intensity', 'teacher_shortage_flag', 'attrition_risk_score',
+    'strand_growth_rate', 
+    'retention_rate_lag1', 'resignation_rate_lag1', 'retention_rate_roll3', 'resignation_rate_roll3', 'salary_workload_interaction'
+]
+
+def prepare_retention_frame(data_rows):
+    """
+    Long-format frame with engineered features and per-strand resignation and
+    retention rate targets, built from the yearly per-strand rows.
+    Training (train_and_save_models.py) and prediction both use it, so they
+    fingerprint the same frames and share registry entries.
+    """
+    df = pd.DataFrame(data_rows)
+    df['year'] = pd.to_datetime(df['year'], format='%Y', errors='coerce')
+    df = df.sort_values('year').reset_index(drop=True)
+
+    # Add strand_name column based on strand_id
+    df['strand_name'] = df['strand_id'].map(STRAND_ID_TO_NAME)
+
+    # Use long format dataframe for feature engineering
+    df = data_preparation.add_feature_engineering_long_format(df)
+
+    # Calculate resignation_rate and retention_rate per strand using historical counts and teacher counts
+    for strand in STRANDS:
+        strand_df = df[df['strand_name'] == strand]
+        if not strand_df.empty:
+            # Calculate rates with safe division and cap at realistic max values
+            resignation_rate_raw = strand_df['historical_resignations'] / strand_df['teachers_count'].replace(0, np.nan)
+            retention_rate_raw = strand_df['historical_retentions'] / strand_df['teachers_count'].replace(0, np.nan)
+            # Cap resignation rate at 0.3 (30%)
+            resignation_rate_capped = resignation_rate_raw.clip(upper=0.3).fillna(0)
+            # Cap retention rate between 0.85 and 0.95
+            retention_rate_capped = retention_rate_raw.clip(lower=0.85, upper=0.95).fillna(0.85)
+            df.loc[df['strand_name'] == strand, f'resignation_rate_{strand}'] = resignation_rate_capped
+            df.loc[df['strand_name'] == strand, f'retention_rate_{strand}'] = retention_rate_capped
+        else:
+            df.loc[df['strand_name'] == strand, f'resignation_rate_{strand}'] = 0
+            df.loc[df['strand_name'] == strand, f'retention_rate_{strand}'] = 0
+
+    # Fill NaN with zeros for rates
+    for strand in STRANDS:
+        df[f'resignation_rate_{strand}'] = df[f'resignation_rate_{strand}'].fillna(0)
+        df[f'retention_rate_{strand}'] = df[f'retention_rate_{strand}'].fillna(0)
+    return df
+
+def regression_inputs(df, strands=STRANDS, feature_cols=FEATURE_COLS):
+    """
+    Yield (strand, target, X, y, fingerprint) for every model that has
+    enough data; (strand, target, None, None, None) for the ones that do not.
+    """
+    for strand in strands:
+        strand_df = df[df['strand_name'] == strand]
+        # Train models only if data is sufficient
+        if len(strand_df) <= 1 or strand_df[f'resignation_rate_{strand}'].isnull().all():
+            yield strand, 'resignation_rate', None, None, None
+            yield strand, 'retention_rate', None, None, None
+            continue
+        for target in ['resignation_rate', 'retention_rate']:
+            X, y = ml_models_utils.prepare_features_for_regression(strand_df, f'{target}_{strand}', feature_cols)
+            if len(X) == 0 or len(y) == 0:
+                yield strand, target, None, None, None
+                continue
+            yield strand, target, X, y, ml_models_utils.dataset_fingerprint(X, y)
+
+def load_or_train_models(df, strands, feature_cols):
+    """
+    Return {(strand, target): model} for the resignation and retention targets.
+    Models come from the registry; any that are missing are trained together
+    in one parallel batch (see training_scheduler) and then stored.
+    """
+    models = {}
+    pending = {}
+    for strand, target, X, y, fingerprint in regression_inputs(df, strands, feature_cols):
+        models[(strand, target)] = None if X is None else model_registry.load(strand, target, fingerprint)
+        if X is not None and models[(strand, target)] is None:
+            pending[(strand, target)] = (X, y, fingerprint)
+
+    trained = training_scheduler.train_jobs({key: (X, y) for key, (X, y, _) in pending.items()})
+    for (strand, target), model in trained.items():
+        X, _, fingerprint = pending[(strand, target)]
+        model_registry.save(strand, target, fingerprint, model,
+                            metadata={'n_rows': len(X), 'feature_cols': feature_cols})
+        models[(strand, target)] = model
+    return models
+
 def predict_teacher_retention(data_rows, target_ratio=25, forecast_years=3, max_class_size=None):
     """
     Comprehensive prediction integrating feature engineering, ML models, and forecasting.
     """
     try:
-        df = pd.DataFrame(data_rows)
-        logger.info(f"Input data columns: {df.columns.tolist()}")
-        logger.info(f"Input data sample:\n{df.head()}")
-        df['year'] = pd.to_datetime(df['year'], format='%Y', errors='coerce')
-        df = df.sort_values('year').reset_index(drop=True)
-
-        strands = ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']
-
-        # Map strand_id to strand_name
-        strand_id_to_name = {
-            1: 'STEM',
-            2: 'ABM',
-            3: 'GAS',
-            4: 'HUMSS',
-            5: 'ICT'
-        }
-
-        # Add strand_name column based on strand_id
-        df['strand_name'] = df['strand_id'].map(strand_id_to_name)
+        df = prepare_retention_frame(data_rows)
+        logger.info(f"Prepared data columns: {df.columns.tolist()}")
+        logger.info(f"Prepared data sample:\n{df.head()}")
+        strands = STRANDS
+        feature_cols = FEATURE_COLS
 
         # Log input data summary for debugging
         logger.info(f"Input data rows count: {len(df)}")
@@ -54,44 +149,11 @@ def predict_teacher_retention(data_rows, target_ratio=25, forecast_years=3, max_
         logger.info(f"Historical resignations per strand:\n{df.groupby('strand_name')['historical_resignations'].sum()}")
         logger.info(f"Historical retentions per strand:\n{df.groupby('strand_name')['historical_retentions'].sum()}")
 
-        # Use long format dataframe for feature engineering
-        df = data_preparation.add_feature_engineering_long_format(df)
-
-        # Calculate resignation_rate and retention_rate per strand using historical counts and teacher counts
-        strands = ['STEM', 'ABM', 'GAS', 'HUMSS', 'ICT']
-        for strand in strands:
-            strand_df = df[df['strand_name'] == strand]
-            if not strand_df.empty:
-                # Calculate rates with safe division and cap at realistic max values
-                resignation_rate_raw = strand_df['historical_resignations'] / strand_df['teachers_count'].replace(0, np.nan)
-                retention_rate_raw = strand_df['historical_retentions'] / strand_df['teachers_count'].replace(0, np.nan)
-                # Cap resignation rate at 0.3 (30%)
-                resignation_rate_capped = resignation_rate_raw.clip(upper=0.3).fillna(0)
-                # Cap retention rate between 0.85 and 0.95
-                retention_rate_capped = retention_rate_raw.clip(lower=0.85, upper=0.95).fillna(0.85)
-                df.loc[df['strand_name'] == strand, f'resignation_rate_{strand}'] = resignation_rate_capped
-                df.loc[df['strand_name'] == strand, f'retention_rate_{strand}'] = retention_rate_capped
-            else:
-                df.loc[df['strand_name'] == strand, f'resignation_rate_{strand}'] = 0
-                df.loc[df['strand_name'] == strand, f'retention_rate_{strand}'] = 0
-
-        # Fill NaN with zeros for rates
-        for strand in strands:
-            df[f'resignation_rate_{strand}'] = df[f'resignation_rate_{strand}'].fillna(0)
-            df[f'retention_rate_{strand}'] = df[f'retention_rate_{strand}'].fillna(0)
-
-        # Prepare features and targets per strand
-        feature_cols = [
-            'salary_ratio', 'professional_dev_hours', 'workload_per_teacher', 'target_ratio', 'max_class_size',
-            'student_teacher_ratio', 
-            'workload_change', 'salary_growth', 'training_intensity', 'teacher_shortage_flag', 'attrition_risk_score',
-            'strand_growth_rate', 
-            'retention_rate_lag1', 'resignation_rate_lag1', 'retention_rate_roll3', 'resignation_rate_roll3', 'salary_workload_interaction'
-        ]
         resignation_models = {}
         retention_models = {}
         resignation_preds = {}
         retention_preds = {}
+        models = load_or_train_models(df, strands, feature_cols)
 
         for strand in strands:
             # Filter data for strand
@@ -107,13 +169,8 @@ def predict_teacher_retention(data_rows, target_ratio=25, forecast_years=3, max_
             y_retain = strand_df[f'retention_rate_{strand}']
             X = strand_df[feature_cols]
 
-            # Train models if data is sufficient
-            if len(X) > 1 and not y_resign.isnull().all():
-                resignation_models[strand] = ml_models_utils.train_models_per_strand(strand_df, [strand], f'resignation_rate_{strand}', feature_cols, model_type='random_forest_regressor')[strand]
-                retention_models[strand] = ml_models_utils.train_models_per_strand(strand_df, [strand], f'retention_rate_{strand}', feature_cols, model_type='random_forest_regressor')[strand]
-            else:
-                resignation_models[strand] = None
-                retention_models[strand] = None
+            resignation_models[strand] = models[(strand, 'resignation_rate')]
+            retention_models[strand] = models[(strand, 'retention_rate')]
 
             # Predict resignation and retention rates
             if resignation_models[strand]:
@@ -0,0 +1,68 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+import ml_models_utils
+from ml_models_utils import HyperparameterCache
+
+PARAMS = {'n_estimators': 100, 'max_depth': 5, 'min_samples_split': 2, 'min_samples_leaf': 1}
+KEY = ('STEM', 'retention_rate')
+
+def training_frame(seed=0, shift=0.0):
+    rng = np.random.RandomState(seed)
+    X = pd.DataFrame({'students_count': rng.normal(300, 30, 40) + shift * 30,
+                      'salary_ratio': rng.normal(1.02, 0.01, 40)})
+    return X, rng.normal(0.9, 0.02, 40)
+
+def new_cache(drift_threshold=ml_models_utils.DEFAULT_DRIFT_THRESHOLD):
+    return HyperparameterCache(os.path.join(tempfile.mkdtemp(), 'cache.json'), drift_threshold)
+
+def test_default_allows_drift_reuse():
+    assert ml_models_utils.DEFAULT_DRIFT_THRESHOLD > 0
+
+def test_exact_reuse():
+    cache = new_cache(drift_threshold=0)
+    X, y = training_frame()
+    cache.store(X, y, PARAMS, KEY)
+    assert cache.lookup(X, y) == PARAMS
+    assert cache.lookup(X, y, ('ABM', 'resignation_rate')) == PARAMS
+    X2, y2 = training_frame(shift=0.05)
+    assert cache.lookup(X2, y2, KEY) is None
+
+def test_reuse_within_drift_threshold():
+    cache = new_cache()
+    X, y = training_frame()
+    cache.store(X, y, PARAMS, KEY)
+    X2, y2 = training_frame(shift=0.05)
+    assert cache.lookup(X2, y2, KEY) == PARAMS
+    # Another model's entries are never reused for drifted data, nor entries without a key
+    assert cache.lookup(X2, y2, ('ABM', 'retention_rate')) is None
+    assert cache.lookup(X2, y2) is None
+
+def test_rejects_beyond_drift_threshold():
+    cache = new_cache()
+    X, y = training_frame()
+    cache.store(X, y, PARAMS, KEY)
+    X2, y2 = training_frame(shift=1.0)
+    assert cache.lookup(X2, y2, KEY) is None
+    # Same shape of data but other columns is never a match
+    assert cache.lookup(X.rename(columns={'salary_ratio': 'pd_hours'}), y, KEY) is None
+
+def test_cache_survives_reload():
+    cache = new_cache()
+    X, y = training_frame()
+    cache.store(X, y, PARAMS, KEY)
+    assert HyperparameterCache(cache.path).lookup(X, y, KEY) == PARAMS
+
+if __name__ == "__main__":
+    test_default_allows_drift_reuse()
+    test_exact_reuse()
+    test_reuse_within_drift_threshold()
+    test_rejects_beyond_drift_threshold()
+    test_cache_survives_reload()
+    print("Hyperparameter cache tests passed.")
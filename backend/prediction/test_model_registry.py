@@ -0,0 +1,37 @@
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+
+from model_registry import ModelRegistry
+
+def test_keeps_newest_versions():
+    registry = ModelRegistry(tempfile.mkdtemp(), keep_versions=2)
+    for i in range(4):
+        registry.save('STEM', 'retention_rate', 'data1', {'model': i})
+    artifact_dir = os.path.join(registry.root_dir, 'STEM', 'retention_rate', 'data1')
+    assert sorted(os.listdir(artifact_dir)) == ['v3.joblib', 'v3.json', 'v4.joblib', 'v4.json']
+    assert ModelRegistry(registry.root_dir).load('STEM', 'retention_rate', 'data1') == {'model': 3}
+
+def test_drops_least_recently_used_fingerprints():
+    registry = ModelRegistry(tempfile.mkdtemp(), keep_fingerprints=2)
+    registry.save('STEM', 'retention_rate', 'data1', 'first')
+    time.sleep(0.02)
+    registry.save('STEM', 'retention_rate', 'data2', 'second')
+    time.sleep(0.02)
+    # Loading data1 makes data2 the least recently used
+    assert registry.load('STEM', 'retention_rate', 'data1') == 'first'
+    time.sleep(0.02)
+    registry.save('STEM', 'retention_rate', 'data3', 'third')
+    assert sorted(os.listdir(os.path.join(registry.root_dir, 'STEM', 'retention_rate'))) == ['data1', 'data3']
+    assert registry.load('STEM', 'retention_rate', 'data2') is None
+    # Other targets are pruned separately
+    registry.save('STEM', 'resignation_rate', 'data2', 'other')
+    assert registry.load('STEM', 'resignation_rate', 'data2') == 'other'
+
+if __name__ == "__main__":
+    test_keeps_newest_versions()
+    test_drops_least_recently_used_fingerprints()
+    print("Model registry tests passed.")
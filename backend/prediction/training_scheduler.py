@@ -0,0 +1,97 @@
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.dirname(__file__)))
+import ml_models_utils
+
+logger = logging.getLogger(__name__)
+
+# Total cores all training jobs may use together (pool processes x GridSearchCV n_jobs)
+DEFAULT_CORE_BUDGET = int(os.environ.get('TRAINING_CORE_BUDGET', os.cpu_count() or 1))
+DEFAULT_RANDOM_STATE = 42
+
+
+class CoreBudget:
+    """
+    Cores shared by every training call in this process, so concurrent
+    forecasts (job threads, the prediction worker) together stay within
+    the budget instead of each sizing a pool to the whole machine.
+    """
+
+    def __init__(self, cores):
+        self.cores = max(1, cores)
+        self._free = self.cores
+        self._condition = threading.Condition()
+
+    def acquire(self, wanted):
+        """
+        Wait until a core is free, then take up to wanted cores.
+        Returns the number taken.
+        """
+        with self._condition:
+            while self._free == 0:
+                self._condition.wait()
+            granted = max(1, min(wanted, self._free))
+            self._free -= granted
+            return granted
+
+    def release(self, cores):
+        with self._condition:
+            self._free += cores
+            self._condition.notify_all()
+
+core_budget_pool = CoreBudget(DEFAULT_CORE_BUDGET)
+
+def _train_job(X, y, n_jobs, random_state, key):
+    return ml_models_utils.train_random_forest_regressor(X, y, n_jobs=n_jobs, random_state=random_state,
+                                                         cache_key=key)
+
+def plan_workers(n_jobs, core_budget=DEFAULT_CORE_BUDGET, max_workers=None):
+    """
+    Split the core budget between pool processes and the n_jobs each
+    GridSearchCV gets, so nested parallelism never exceeds the budget.
+    Returns (pool_workers, inner_n_jobs).
+    """
+    core_budget = max(1, core_budget)
+    workers = min(n_jobs, core_budget, max_workers or core_budget)
+    workers = max(1, workers)
+    return workers, max(1, core_budget // workers)
+
+def train_jobs(jobs, core_budget=DEFAULT_CORE_BUDGET, max_workers=None, random_state=DEFAULT_RANDOM_STATE):
+    """
+    Train one RandomForestRegressor per job.
+    jobs: dict of key (e.g. (strand, target)) -> (X, y).
+    Returns dict of key -> trained model.
+
+    The call uses at most core_budget cores out of the process-wide
+    core_budget_pool, waiting for cores other calls hold. Worker processes
+    are spawned, not forked, since this runs inside a threaded server.
+
+    Every job uses the same fixed random_state, and a forest's result does not
+    depend on its n_jobs, so the models are identical to a sequential run.
+    """
+    if not jobs:
+        return {}
+    cores = core_budget_pool.acquire(core_budget)
+    try:
+        workers, inner_n_jobs = plan_workers(len(jobs), cores, max_workers)
+        keys = list(jobs)
+
+        if workers > 1:
+            logger.info(f"Training {len(jobs)} models on {workers} processes with n_jobs={inner_n_jobs} each")
+            try:
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+                    futures = {key: executor.submit(_train_job, jobs[key][0], jobs[key][1], inner_n_jobs, random_state,
+                                                     key)
+                               for key in keys}
+                    return {key: futures[key].result() for key in keys}
+            except Exception as e:
+                logger.warning(f"Parallel training failed ({str(e)}), retrying sequentially")
+
+        return {key: _train_job(jobs[key][0], jobs[key][1], cores, random_state, key) for key in keys}
+    finally:
+        core_budget_pool.release(cores)
@@ -0,0 +1,150 @@
+-- Version counters read by the Flask response cache (ml_models/response_cache.py).
+-- Every write to a source table bumps its counter, so cached analytics responses
+-- are invalidated even when rows are updated in place.
+CREATE TABLE IF NOT EXISTS data_versions (
+    table_name VARCHAR(64) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+);
+
+INSERT IGNORE INTO data_versions (table_name, version) VALUES
+('teacher_retention_data', 0),
+('trend_identification', 0),
+('risk_assessment', 0),
+('teachers', 0),
+('teacher_workload', 0),
+('teacher_subject_expertise', 0),
+('teacher_certifications', 0),
+('certification_types', 0),
+('subject_areas', 0),
+('strands', 0);
+
+DROP TRIGGER IF EXISTS teacher_retention_data_ai_version;
+CREATE TRIGGER teacher_retention_data_ai_version AFTER INSERT ON teacher_retention_data FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_retention_data', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_retention_data_au_version;
+CREATE TRIGGER teacher_retention_data_au_version AFTER UPDATE ON teacher_retention_data FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_retention_data', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_retention_data_ad_version;
+CREATE TRIGGER teacher_retention_data_ad_version AFTER DELETE ON teacher_retention_data FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_retention_data', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS trend_identification_ai_version;
+CREATE TRIGGER trend_identification_ai_version AFTER INSERT ON trend_identification FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('trend_identification', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trend_identification_au_version;
+CREATE TRIGGER trend_identification_au_version AFTER UPDATE ON trend_identification FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('trend_identification', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS trend_identification_ad_version;
+CREATE TRIGGER trend_identification_ad_version AFTER DELETE ON trend_identification FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('trend_identification', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS risk_assessment_ai_version;
+CREATE TRIGGER risk_assessment_ai_version AFTER INSERT ON risk_assessment FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('risk_assessment', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS risk_assessment_au_version;
+CREATE TRIGGER risk_assessment_au_version AFTER UPDATE ON risk_assessment FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('risk_assessment', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS risk_assessment_ad_version;
+CREATE TRIGGER risk_assessment_ad_version AFTER DELETE ON risk_assessment FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('risk_assessment', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS teachers_ai_version;
+CREATE TRIGGER teachers_ai_version AFTER INSERT ON teachers FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teachers', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teachers_au_version;
+CREATE TRIGGER teachers_au_version AFTER UPDATE ON teachers FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teachers', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teachers_ad_version;
+CREATE TRIGGER teachers_ad_version AFTER DELETE ON teachers FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teachers', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS teacher_workload_ai_version;
+CREATE TRIGGER teacher_workload_ai_version AFTER INSERT ON teacher_workload FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_workload', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_workload_au_version;
+CREATE TRIGGER teacher_workload_au_version AFTER UPDATE ON teacher_workload FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_workload', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_workload_ad_version;
+CREATE TRIGGER teacher_workload_ad_version AFTER DELETE ON teacher_workload FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_workload', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS teacher_subject_expertise_ai_version;
+CREATE TRIGGER teacher_subject_expertise_ai_version AFTER INSERT ON teacher_subject_expertise FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_subject_expertise', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_subject_expertise_au_version;
+CREATE TRIGGER teacher_subject_expertise_au_version AFTER UPDATE ON teacher_subject_expertise FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_subject_expertise', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_subject_expertise_ad_version;
+CREATE TRIGGER teacher_subject_expertise_ad_version AFTER DELETE ON teacher_subject_expertise FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_subject_expertise', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS teacher_certifications_ai_version;
+CREATE TRIGGER teacher_certifications_ai_version AFTER INSERT ON teacher_certifications FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_certifications', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_certifications_au_version;
+CREATE TRIGGER teacher_certifications_au_version AFTER UPDATE ON teacher_certifications FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_certifications', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS teacher_certifications_ad_version;
+CREATE TRIGGER teacher_certifications_ad_version AFTER DELETE ON teacher_certifications FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('teacher_certifications', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS certification_types_ai_version;
+CREATE TRIGGER certification_types_ai_version AFTER INSERT ON certification_types FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('certification_types', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS certification_types_au_version;
+CREATE TRIGGER certification_types_au_version AFTER UPDATE ON certification_types FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('certification_types', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS certification_types_ad_version;
+CREATE TRIGGER certification_types_ad_version AFTER DELETE ON certification_types FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('certification_types', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS subject_areas_ai_version;
+CREATE TRIGGER subject_areas_ai_version AFTER INSERT ON subject_areas FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('subject_areas', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS subject_areas_au_version;
+CREATE TRIGGER subject_areas_au_version AFTER UPDATE ON subject_areas FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('subject_areas', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS subject_areas_ad_version;
+CREATE TRIGGER subject_areas_ad_version AFTER DELETE ON subject_areas FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('subject_areas', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+
+DROP TRIGGER IF EXISTS strands_ai_version;
+CREATE TRIGGER strands_ai_version AFTER INSERT ON strands FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('strands', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS strands_au_version;
+CREATE TRIGGER strands_au_version AFTER UPDATE ON strands FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('strands', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
+DROP TRIGGER IF EXISTS strands_ad_version;
+CREATE TRIGGER strands_ad_version AFTER DELETE ON strands FOR EACH ROW
+    INSERT INTO data_versions (table_name, version) VALUES ('strands', 1)
+    ON DUPLICATE KEY UPDATE version = version + 1;
@@ -0,0 +1,12 @@
+-- Per-teacher risk scores written by ml_models/teacher_risk_scores.py.
+-- One row per teacher, scored from their latest risk_assessment row with the weighted risk model.
+CREATE TABLE IF NOT EXISTS teacher_risk_scores (
+    teacher_key VARCHAR(50) PRIMARY KEY,
+    strand VARCHAR(50),
+    year INT,
+    risk_score DOUBLE NOT NULL,
+    risk_level VARCHAR(10) NOT NULL,
+    source_row_id INT,
+    scored_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    INDEX idx_teacher_risk_strand_score (strand, risk_score)
+);